@@ -0,0 +1,122 @@
+import json
+import time
+import logging
+import threading
+import requests
+
+# Client for the trade API's /stream Server-Sent Events channel. A background thread keeps
+# a merged copy of the /data payload (snapshot on connect, deltas after) and calls the on_update
+# listeners with the fields that changed; while the stream is down callers fall back to a plain
+# GET of /data over a keep-alive session.
+
+STREAM_CONNECT_TIMEOUT = 5.0
+STREAM_READ_TIMEOUT = 45.0  # the API sends a keepalive every 15s, so this means the link is dead
+STREAM_RECONNECT_MIN = 0.5
+STREAM_RECONNECT_MAX = 10.0
+
+class ApiStream:
+    def __init__(self, stream_url, data_url):
+        self.stream_url = stream_url
+        self.data_url = data_url
+        self.session = requests.Session()  # stream thread only
+        self.poll_session = requests.Session()  # fetch() from the caller's thread
+        self.data = None
+        self.connected = False
+        self.events = 0
+        self.reconnects = 0
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.thread = None
+        self.response = None
+        self.stopped = False
+
+    def on_update(self, callback):
+        """callback(changed_fields, data) runs on the stream thread after every snapshot or delta."""
+        self.listeners.append(callback)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="api-stream", daemon=True)
+            self.thread.start()
+        return self
+
+    def close(self):
+        self.stopped = True
+        if self.response is not None:
+            self.response.close()
+
+    def snapshot(self):
+        """Copy of the latest payload, or None until the first snapshot arrives or while disconnected."""
+        with self.lock:
+            if not self.connected or self.data is None:
+                return None
+            return dict(self.data)
+
+    def fetch(self, timeout=5.0):
+        response = self.poll_session.get(self.data_url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _apply(self, event, payload):
+        with self.lock:
+            previous = self.data or {}
+            changed = {k for k, v in payload.items() if k != "timestamp" and (k not in previous or previous[k] != v)}
+            if event == "snapshot":
+                self.data = payload
+            else:
+                self.data.update(payload)
+            self.events += 1
+            data = self.data
+        if changed:
+            for callback in self.listeners:
+                try:
+                    callback(changed, data)
+                except Exception as e:
+                    logging.error(f"🚨 Stream listener failed: {e}")
+
+    def _set_connected(self, connected):
+        with self.lock:
+            self.connected = connected
+
+    def _read(self, response):
+        event, data = "message", []
+        for line in response.iter_lines(decode_unicode=True):
+            if self.stopped:
+                return
+            if line == "":
+                if data:
+                    payload = json.loads("\n".join(data))
+                    if event == "snapshot" or self.data is not None:
+                        self._apply(event, payload)
+                event, data = "message", []
+            elif line.startswith(":"):
+                continue
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].lstrip())
+
+    def _run(self):
+        delay = STREAM_RECONNECT_MIN
+        while not self.stopped:
+            try:
+                with self.session.get(self.stream_url, stream=True, timeout=(STREAM_CONNECT_TIMEOUT, STREAM_READ_TIMEOUT),
+                                      headers={"Accept": "text/event-stream"}) as response:
+                    response.raise_for_status()
+                    self.response = response
+                    self._set_connected(True)
+                    logging.info(f"📡 Connected to API stream {self.stream_url}")
+                    delay = STREAM_RECONNECT_MIN
+                    self._read(response)
+            except Exception as e:
+                if not self.stopped:
+                    logging.warning(f"⚠️ API stream dropped, retrying in {delay:.1f}s: {e}")
+            finally:
+                self.response = None
+                if self.connected:
+                    self._set_connected(False)
+            if self.stopped:
+                break
+            self.reconnects += 1
+            time.sleep(delay)
+            delay = min(delay * 2, STREAM_RECONNECT_MAX)
@@ -1,23 +1,27 @@
 import os
 import time
+import asyncio
 import logging
-import subprocess
 import json
 import sys
-import random
 import shutil
-import requests
 from datetime import datetime, timedelta, timezone
 import numpy as np
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from pyfiglet import Figlet
 from termcolor import colored
 from solana.rpc.api import Client
-from solana.rpc.types import TokenAccountOpts
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
-from tenacity import retry, stop_after_attempt, wait_fixed, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
+from swap_worker import SwapWorker, SwapOutcomeUnknown
+from candles import bucket_start, candle_token_pair
+from db_pool import ConnectionPool
+from api_stream import ApiStream
+from wallet_state import WalletState
+from tx_confirm import ConfirmationTracker
+from rpc_router import RpcRouter, Endpoint
+from trade_events import TradeEvents, LatencyStats, stream_event_kinds, watch_accounts
 
 # Config
 POLICY_PATH = "/home/safe-pump/archon/mev/data/archon.pth"
@@ -26,7 +30,7 @@ OUTPUT_FILE = "/home/safe-pump/archon/output.json"
 CONSTANTS_FILE = "/home/safe-pump/archon/target_constants.json"
 RPC_ENDPOINT = "https://mainnet.helius-rpc.com/?api-key=479f2b3d-a5e4-4fa0-b7ac-163dc4b14133"
 WALLET_KEYPAIR_PATH = "/home/safe-pump/archon/wallet.json"
-SWAP_SCRIPT_PATH = "/home/safe-pump/archon/raydium/raydium_swap.ts"
+SWAP_WORKER_PATH = "/home/safe-pump/archon/raydium/swap_worker.ts"
 UPDATE_INTERVAL = 2.0
 SELL_COOLDOWN = 15.0
 BUY_COOLDOWN = 15.0
@@ -34,23 +38,34 @@ MIN_SWAP_SOL = 0.005
 FEE_PER_TRADE = 0.002
 NETWORK_FEE = 0.000005
 API_URL = "http://127.0.0.1:8000/data"
+API_STREAM_URL = "http://127.0.0.1:8000/stream"
+STREAM_IDLE_TIMEOUT = 30.0  # re-evaluate at least this often while no event arrives
+WS_ENDPOINT = RPC_ENDPOINT.replace("https://", "wss://", 1)
+# Request budgets per endpoint (requests/second); the router prefers the fastest healthy one
+RPC_ENDPOINTS = [
+    Endpoint(RPC_ENDPOINT, rate=25.0, name="helius"),
+    Endpoint("https://api.mainnet-beta.solana.com", rate=8.0, name="mainnet-beta")
+]
 SNIPER_PERCENTAGE = 0.67
 MIN_LIQUID_RESERVE = 0.0075
 PROFIT_THRESHOLD = 0.015
 TOKEN_SELL_THRESHOLD = 10.0
 SLIPPAGE_FACTOR = 0.005
-LATENCY_MIN = 0.05
-LATENCY_MAX = 0.2
 MIN_SOL_FOR_TRADE = 0.003
 SKIP_SNIPE = False
 DUMP_ON_BOOT = False
 TRADE_CONFIRMATION_DELAY = 2.0
+CONFIRMATION_COMMITMENT = "confirmed"
+CONFIRMATION_RECHECKS = 2  # further waits on a swap that timed out before its outcome counts as unknown
+CONFIRMATION_HISTORY = 100
 STOP_LOSS_THRESHOLD = -0.10
 FORCE_TRADE_INTERVAL = 300.0
 TREND_WINDOW = 300
 MOVING_AVERAGE_PERIOD = 10
 MINIMUM_SOL_REQUIRED = MIN_SOL_FOR_TRADE
 TREND_DURATION = TREND_WINDOW
+CANDLE_CLOSE_GRACE = 10.0
+DB_STATS_INTERVAL = 300.0
 
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -59,33 +74,44 @@ def color(text, color_name, bold=False):
     return colored(text, color_name, attrs=attrs)
 
 class SolanaClientManager:
-    def __init__(self, endpoint):
-        self.endpoint = endpoint
-        self.client = Client(self.endpoint)
-        logging.info(f"😺 Initialized Solana client with RPC: {self.endpoint}")
+    """Routes JSON-RPC calls across RPC_ENDPOINTS (see rpc_router); get_client() is for solana-py
+    calls and always targets the currently best-ranked endpoint."""
+
+    def __init__(self, endpoints):
+        self.router = RpcRouter(endpoints)
+        self.clients = {}
+        logging.info(f"😺 Initialized Solana RPC router: {', '.join(e.name for e in self.router.endpoints)}")
 
     def get_client(self):
-        return self.client
+        endpoint = self.get_current_endpoint()
+        if endpoint not in self.clients:
+            self.clients[endpoint] = Client(endpoint)
+        return self.clients[endpoint]
 
     def get_current_endpoint(self):
-        return self.endpoint
-
-solana_client_manager = SolanaClientManager(RPC_ENDPOINT)
-
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(
-            dbname="archon_data",
-            user="postgres",
-            password=os.getenv("PG_PASSWORD", "#!01$Archon$10!#"),
-            host="localhost",
-            port="5432"
-        )
-        logging.debug("🗄️ Database connection established")
-        return conn
-    except Exception as e:
-        logging.error(f"🚨 Failed to connect to database: {e}")
-        return None
+        return self.router.best().url
+
+solana_client_manager = SolanaClientManager(RPC_ENDPOINTS)
+swap_worker = SwapWorker(SWAP_WORKER_PATH)
+confirmation_tracker = ConfirmationTracker(RPC_ENDPOINT, commitment=CONFIRMATION_COMMITMENT, router=solana_client_manager.router)
+
+# Hot queries, PREPAREd once per pooled connection
+DB_STATEMENTS = {
+    "recent_candles": """
+        SELECT open, high, low, close, ma_10, ma_50, doji_type
+        FROM candles
+        WHERE token_pair = $1 AND timestamp >= $2
+        ORDER BY timestamp DESC
+        LIMIT $3
+    """,
+    "whale_classifications": """
+        SELECT classification, COUNT(*) as count
+        FROM whale_detector
+        WHERE token = $1 AND detected_time >= $2
+        GROUP BY classification
+    """
+}
+db = ConnectionPool(minconn=4, maxconn=4, statements=DB_STATEMENTS)
 
 def load_wallet():
     with open(WALLET_KEYPAIR_PATH, 'r') as f:
@@ -98,36 +124,36 @@ def load_wallet():
     retry=retry_if_exception_type(Exception)
 )
 def get_sol_balance(wallet: Keypair):
-    client = solana_client_manager.get_client()
     try:
-        balance = client.get_balance(wallet.pubkey()).value / 1_000_000_000
+        result = solana_client_manager.router.call("getBalance", [str(wallet.pubkey()), {"commitment": "confirmed"}], hedge=True)
+        balance = result["value"] / 1_000_000_000
         logging.info(f"💰 Fetched SOL balance: {balance} using {solana_client_manager.get_current_endpoint()}")
         return balance
     except Exception as e:
         logging.error(f"🚨 Failed to fetch SOL balance: {e}")
         raise
 
+wallet_states = {}
+
+def get_wallet_state(wallet: Keypair, token_mint: Pubkey):
+    key = (str(wallet.pubkey()), str(token_mint))
+    if key not in wallet_states:
+        wallet_states[key] = WalletState(RPC_ENDPOINT, wallet.pubkey(), token_mint, router=solana_client_manager.router)
+    return wallet_states[key]
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_fixed(1),
     retry=retry_if_exception_type(Exception)
 )
-def get_token_balance(wallet: Keypair, token_mint: Pubkey):
-    client = solana_client_manager.get_client()
+def get_balances(wallet: Keypair, token_mint: Pubkey, max_age=None):
+    """(SOL, tokens) from the wallet-state cache; max_age=0 forces one getMultipleAccounts refresh."""
     try:
-        opts = TokenAccountOpts(mint=token_mint, encoding="base64")
-        response = client.get_token_accounts_by_owner(wallet.pubkey(), opts)
-        if hasattr(response, 'value') and response.value and len(response.value) > 0:
-            token_account = response.value[0].pubkey
-            balance_response = client.get_token_account_balance(token_account, commitment="confirmed")
-            if hasattr(balance_response, 'value') and balance_response.value.ui_amount is not None:
-                balance = balance_response.value.ui_amount
-                logging.info(f"💰 Fetched token balance for mint {token_mint}: {balance} 🐱")
-                return balance
-            return 0.0
-        return 0.0
+        sol_balance, token_balance = get_wallet_state(wallet, token_mint).balances(max_age)
+        logging.debug(f"💰 Balances: SOL={sol_balance}, Tokens={token_balance} 🐱")
+        return sol_balance, token_balance
     except Exception as e:
-        logging.error(f"🚨 Failed to fetch token balance: {e}")
+        logging.error(f"🚨 Failed to fetch balances: {e}")
         raise
 
 class TradeTracker:
@@ -282,7 +308,9 @@ def load_state():
         "flip_count": 0,
         "cycle_start_time": time.time(),
         "last_cycle_pl": 0.0,
-        "last_price_update": time.time()
+        "last_price_update": time.time(),
+        "swap_confirmations": [],
+        "confirmation_latency": {}
     }
     try:
         if not os.path.exists(state_file) or os.path.getsize(state_file) == 0:
@@ -302,6 +330,8 @@ def load_state():
             state.setdefault("cycle_start_time", default_state["cycle_start_time"])
             state.setdefault("last_cycle_pl", default_state["last_cycle_pl"])
             state.setdefault("last_price_update", default_state["last_price_update"])
+            state.setdefault("swap_confirmations", default_state["swap_confirmations"])
+            state.setdefault("confirmation_latency", default_state["confirmation_latency"])
             logging.info(f"📝 Loaded state from {state_file}")
             return state
     except Exception as e:
@@ -331,33 +361,25 @@ def log_trade(trade):
     except Exception as e:
         logging.error(f"🚨 Failed to log trade: {e}")
 
+api_stream = ApiStream(API_STREAM_URL, API_URL)
+
 def fetch_data():
     try:
-        response = requests.get(API_URL)
-        response.raise_for_status()
-        data = response.json()
+        # Pushed state when the stream is up, otherwise one GET over the stream's keep-alive session
+        data = api_stream.snapshot()
+        if data is None:
+            data = api_stream.fetch()
         logging.debug(f"Raw candle_trend from API: {data.get('candle_trend')}")
         if not isinstance(data.get("candle_trend"), list) or not all(isinstance(c, dict) for c in data.get("candle_trend", [])):
             logging.warning("⚠️ Invalid candle_trend in API data, fetching from database")
-            conn = get_db_connection()
             candles = []
-            if conn:
-                try:
-                    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                        cur.execute("""
-                            SELECT open, high, low, close, ma_10, ma_50, doji_type
-                            FROM candles
-                            WHERE token_pair = %s
-                            AND timestamp >= %s
-                            ORDER BY timestamp DESC
-                            LIMIT 15
-                        """, ("JELLY/USD", (datetime.now(timezone.utc) - timedelta(minutes=15)).strftime("%Y-%m-%d %H:%M:00")))
-                        candles = cur.fetchall()
-                        logging.debug(f"Fetched {len(candles)} candles directly from database")
-                except Exception as e:
-                    logging.error(f"🚨 Failed to fetch candles from database: {e}")
-                finally:
-                    conn.close()
+            try:
+                with db.cursor(RealDictCursor) as cur:
+                    db.execute_prepared(cur, "recent_candles", ("JELLY/USD", (datetime.now(timezone.utc) - timedelta(minutes=15)).strftime("%Y-%m-%d %H:%M:00"), 15))
+                    candles = cur.fetchall()
+                    logging.debug(f"Fetched {len(candles)} candles directly from database")
+            except Exception as e:
+                logging.error(f"🚨 Failed to fetch candles from database: {e}")
             data["candle_trend"] = [
                 {
                     "open": float(c['open']),
@@ -396,22 +418,13 @@ def calculate_moving_averages(classifications):
     try:
         if not classifications:
             logging.debug("No classifications provided, fetching from whale_detector")
-            conn = get_db_connection()
-            if conn:
-                try:
-                    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                        cur.execute("""
-                            SELECT classification, COUNT(*) as count
-                            FROM whale_detector
-                            WHERE token = %s AND detected_time >= %s
-                            GROUP BY classification
-                        """, ('JELLY', (datetime.utcnow() - timedelta(minutes=60)).strftime("%Y-%m-%d %H:%M:00")))
-                        classifications = {row['classification']: row['count'] for row in cur.fetchall()}
-                except Exception as e:
-                    logging.error(f"🚨 Failed to fetch classifications from whale_detector: {e}")
-                    classifications = {}
-                finally:
-                    conn.close()
+            try:
+                with db.cursor(RealDictCursor) as cur:
+                    db.execute_prepared(cur, "whale_classifications", ('JELLY', (datetime.utcnow() - timedelta(minutes=60)).strftime("%Y-%m-%d %H:%M:00")))
+                    classifications = {row['classification']: row['count'] for row in cur.fetchall()}
+            except Exception as e:
+                logging.error(f"🚨 Failed to fetch classifications from whale_detector: {e}")
+                classifications = {}
         score = calculate_sea_life_score(classifications)
         logging.debug(f"Calculated moving averages score: {score:.2f} from classifications: {classifications}")
         return score
@@ -477,11 +490,57 @@ def calculate_dynamic_slippage(trends, default_slippage=SLIPPAGE_FACTOR):
     volatility = trends.get("price_volatility", 0.0)
     return min(default_slippage * (1 + volatility * 2), 0.02)
 
-@retry(
-    stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type(Exception)
-)
+def record_confirmation(state, confirmation, send_ms=None):
+    """Keep the last CONFIRMATION_HISTORY swap confirmations and submit->confirmed latency stats in the state file."""
+    history = state.setdefault("swap_confirmations", [])
+    history.append({
+        "txid": confirmation["txid"],
+        "status": confirmation["status"],
+        "slot": confirmation["slot"],
+        "send_ms": send_ms,
+        "latency_ms": confirmation["latency_ms"],
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    })
+    del history[:-CONFIRMATION_HISTORY]
+    latencies = sorted(h["latency_ms"] for h in history if h["status"] == "confirmed")
+    stats = {"count": len(latencies), "last_ms": confirmation["latency_ms"], "last_status": confirmation["status"]}
+    if latencies:
+        stats.update({
+            "p50_ms": latencies[len(latencies) // 2],
+            "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            "max_ms": latencies[-1]
+        })
+    state["confirmation_latency"] = stats
+
+def book_swap(amount, is_buy, price, txid, actual_amount_out, expected_amount_out, state, tracker):
+    if is_buy:
+        tracker.update_buy(amount, actual_amount_out, price, txid)
+    else:
+        tracker.update_sell(actual_amount_out, amount, price, txid)
+    logging.info(f"🖋️ Swap executed: TXID={txid or 'unknown'}, Amount={amount:.2f}, Price={price:.8f}, Expected Out={expected_amount_out:.6f}, Actual={actual_amount_out:.6f}")
+    tracker.save_to_state(state)
+    save_state(state)
+
+def settle_unknown_swap(amount, is_buy, price, txid, wallet, token_mint, state, tracker, sol_before, token_before):
+    """A swap that may have been sent without us seeing it land: book it if the wallet moved, never resend it."""
+    try:
+        sol_after, token_after = get_balances(wallet, token_mint, max_age=0)
+    except Exception as e:
+        logging.error(f"🚨 Swap outcome unknown (TXID={txid or 'not returned'}) and balances unavailable: {e}; not resending")
+        return txid or "", 0.0
+    sol_after = sol_after or sol_before
+    token_after = token_after or token_before
+    state["cached_sol_balance"] = sol_after
+    state["cached_token_balance"] = token_after
+    actual_amount_out = (token_after - token_before) if is_buy else (sol_after - sol_before)
+    if actual_amount_out > 0:
+        book_swap(amount, is_buy, price, txid, actual_amount_out, 0.0, state, tracker)
+        return txid or "", actual_amount_out
+    logging.error(f"🚨 Swap outcome unknown (TXID={txid or 'not returned'}) and the wallet has not moved; not resending, it may still land")
+    return txid or "", 0.0
+
+# Not retried as a whole: once a swap may have been sent, resending it could trade twice.
+# Attempts are only repeated when the previous one is known not to have been sent or landed.
 def execute_raydium_swap(amount: float, is_buy: bool, ticker: str, fallback_price: float, wallet: Keypair, token_mint: Pubkey, state: dict, tracker: TradeTracker) -> tuple[str, float]:
     max_attempts = 3
     sol_before = state["cached_sol_balance"]
@@ -490,60 +549,67 @@ def execute_raydium_swap(amount: float, is_buy: bool, ticker: str, fallback_pric
     for attempt in range(max_attempts):
         slippage = calculate_dynamic_slippage(state.get("market_trends", {})) * (1 + attempt * 0.2)
         logging.debug(f"🔄 Swap attempt {attempt + 1}/{max_attempts}, Slippage: {slippage:.6f}")
+        txid = None
+        price = fallback_price
         try:
-            is_buy_str = "1" if is_buy else "0"
-            token_mint_str = str(token_mint)
-            result = subprocess.run(
-                ["ts-node", SWAP_SCRIPT_PATH, "swap", str(amount), is_buy_str, token_mint_str, str(slippage)],
-                capture_output=True,
-                text=True
-            )
-            stdout_lines = result.stdout.strip().split('\n')
-            logging.debug(f"Swap stdout: {result.stdout}")
-            if result.stderr:
-                logging.debug(f"Swap stderr: {result.stderr}")
-                if "429" in result.stderr or "Too Many Requests" in result.stderr:
+            result = swap_worker.swap(amount, is_buy, token_mint, slippage, confirm=False)
+            submitted_at = time.time()
+            logging.debug(f"Swap result: {result}")
+            if not result.get("ok"):
+                error = result.get("error", "unknown error")
+                if "429" in error or "Too Many Requests" in error:
                     raise Exception("RPC rate limit, retrying")
-                if "Endpoint URL must start with" in result.stderr:
+                if "Endpoint URL must start with" in error:
                     raise ValueError("Invalid RPC endpoint")
+                logging.error(f"🚨 Swap failed: {error}")
+                raise Exception("Swap worker failed")
 
-            if result.returncode != 0:
-                logging.error(f"🚨 Swap failed: {result.stderr}")
-                raise Exception("Swap script failed")
-
-            txid = None
-            for line in stdout_lines:
-                if "Transaction ID:" in line:
-                    txid = line.split("Transaction ID:")[1].strip()
-                    break
-
-            pool_data_line = next((line for line in stdout_lines if "Pool info:" in line), "Pool info: {}")
-            pool_data = json.loads(pool_data_line.split("Pool info:")[1].strip())
-            price = pool_data.get("price", fallback_price)
+            txid = result.get("txid")
+            price = result.get("price") or fallback_price
             if price <= 0:
                 price = fallback_price
+            logging.debug(f"⏱️ Swap timings: {result.get('timings')}, pool age {result.get('pool_age_ms')}ms")
 
             expected_amount_out = (amount / price) * (1 - FEE_PER_TRADE) - NETWORK_FEE if is_buy else (amount * price) * (1 - FEE_PER_TRADE) - NETWORK_FEE
-            time.sleep(TRADE_CONFIRMATION_DELAY)
-            sol_after = get_sol_balance(wallet) or sol_before
-            token_after = get_token_balance(wallet, token_mint) or token_before
-            actual_amount_out = (token_after - token_before) if is_buy else (sol_after - sol_before)
+            confirmation = confirmation_tracker.confirm(txid, wallet.pubkey(), token_mint, submitted_at, result.get("last_valid_block_height"))
+            for _ in range(CONFIRMATION_RECHECKS):
+                if confirmation["status"] != "timeout":
+                    break
+                # Not seen yet is not proof it will not land; only an expired blockhash is
+                logging.warning(f"⏳ TXID={txid} unsettled after {confirmation['latency_ms']:.0f}ms, still tracking")
+                confirmation = confirmation_tracker.confirm(txid, wallet.pubkey(), token_mint, submitted_at, result.get("last_valid_block_height"))
+            record_confirmation(state, confirmation, result.get("timings", {}).get("send_ms"))
+            if confirmation["status"] == "failed":
+                logging.warning(f"⚠️ Swap attempt {attempt + 1} failed on-chain: TXID={txid}, error={confirmation['err']}")
+                continue
+            logging.debug(f"⏱️ TXID={txid} {confirmation['status']} in {confirmation['latency_ms']:.0f}ms (slot {confirmation['slot']})")
+            sol_after, token_after = get_balances(wallet, token_mint, max_age=0)
+            sol_after = sol_after or sol_before
+            token_after = token_after or token_before
             state["cached_sol_balance"] = sol_after
             state["cached_token_balance"] = token_after
-            
+            if confirmation["status"] == "confirmed" and confirmation["sol_delta"] is not None:
+                # Exact amounts from the transaction's own pre/post balances
+                actual_amount_out = confirmation["token_delta"] if is_buy else confirmation["sol_delta"]
+            else:
+                # Expired, still unsettled or unreadable: fall back to the wallet balance diff
+                actual_amount_out = (token_after - token_before) if is_buy else (sol_after - sol_before)
+
             if actual_amount_out > 0 or (not is_buy and token_after == 0 and sol_after > sol_before):
-                if is_buy:
-                    tracker.update_buy(amount, actual_amount_out, price, txid)
-                else:
-                    actual_amount_out = sol_after - sol_before
-                    tracker.update_sell(actual_amount_out, amount, price, txid)
-                logging.info(f"🖋️ Swap executed: TXID={txid or 'unknown'}, Amount={amount:.2f}, Price={price:.8f}, Expected Out={expected_amount_out:.6f}, Actual={actual_amount_out:.6f}")
-                tracker.save_to_state(state)
-                save_state(state)
+                book_swap(amount, is_buy, price, txid, actual_amount_out, expected_amount_out, state, tracker)
                 return txid, actual_amount_out
-            logging.warning(f"⚠️ Swap attempt {attempt + 1} failed: Amount Out={actual_amount_out:.2f}")
+            if confirmation["status"] != "expired":
+                # Landed or still unsettled, so a resend could trade twice
+                return settle_unknown_swap(amount, is_buy, price, txid, wallet, token_mint, state, tracker, sol_before, token_before)
+            logging.warning(f"⚠️ Swap attempt {attempt + 1} expired unlanded: TXID={txid}, Amount Out={actual_amount_out:.2f}")
+        except SwapOutcomeUnknown as e:
+            logging.error(f"🚨 Swap attempt {attempt + 1} got no answer from the worker: {e}")
+            return settle_unknown_swap(amount, is_buy, price, txid, wallet, token_mint, state, tracker, sol_before, token_before)
         except Exception as e:
             logging.error(f"🚨 Swap attempt {attempt + 1} error: {str(e)}")
+            if txid:
+                # Already sent, so another attempt could trade twice
+                return settle_unknown_swap(amount, is_buy, price, txid, wallet, token_mint, state, tracker, sol_before, token_before)
         time.sleep(1)
     
     logging.error(f"🚨 All swap attempts failed for {amount:.2f} {'BUY' if is_buy else 'SELL'}")
@@ -582,93 +648,51 @@ def get_recent_trades(trade_trend, current_time):
         logging.warning(f"Failed to filter recent trades: {e}")
         return trade_trend
 
-def fetch_1hr_candles(ticker, limit=10):
+# Closed candles per (token_pair, limit), refetched only once the interval has rolled over
+# (and price.py has had CANDLE_CLOSE_GRACE seconds to store the candle that just closed)
+candle_cache = {}
+
+def fetch_closed_candles(ticker, interval_minutes, limit):
+    token_pair = candle_token_pair(ticker, interval_minutes)
+    now = time.time()
+    current_bucket = bucket_start(now, interval_minutes)
+    cached = candle_cache.get((token_pair, limit))
+    if cached and cached[0] == current_bucket and cached[1]:
+        return cached[1]
+    settled = now - current_bucket >= CANDLE_CLOSE_GRACE
+
     try:
-        conn = get_db_connection()
-        if not conn:
-            logging.error("🚨 No database connection for fetching 1hr candles")
-            return []
-        
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                SELECT open, high, low, close, ma_10, ma_50, doji_type
-                FROM candles
-                WHERE token_pair = %s
-                AND timestamp >= %s
-                ORDER BY timestamp DESC
-                LIMIT %s
-            """, (f"{ticker}/USD_1h", (datetime.now(timezone.utc) - timedelta(hours=limit)).strftime("%Y-%m-%d %H:%M:00"), limit))
-            candles = cur.fetchall()
-            if len(candles) >= limit:
-                logging.debug(f"Fetched {len(candles)} 1-hour candles for {ticker}")
-                return candles
-            
-            # Fallback to 1-minute candles
-            cur.execute("""
-                SELECT open, high, low, close, ma_10, ma_50, doji_type
-                FROM candles
-                WHERE token_pair = %s
-                AND timestamp >= %s
-                ORDER BY timestamp DESC
-                LIMIT %s
-            """, (f"{ticker}/USD", (datetime.now(timezone.utc) - timedelta(minutes=60)).strftime("%Y-%m-%d %H:%M:00"), 60))
-            minute_candles = cur.fetchall()
-            if len(minute_candles) >= 1:
-                prices = [float(c['close']) for c in minute_candles]
-                candles = [{
-                    'open': prices[0],
-                    'high': max(prices),
-                    'low': min(prices),
-                    'close': prices[-1],
-                    'ma_10': np.mean(prices[-min(10, len(prices)):]) if len(prices) >= 1 else None,
-                    'ma_50': np.mean(prices[-min(50, len(prices)):]) if len(prices) >= 1 else None,
-                    'doji_type': 'None'
-                }]
-                logging.debug(f"Aggregated {len(minute_candles)} 1-min candles into 1-hour candle for {ticker}")
-            else:
-                logging.warning(f"Insufficient 1-min candle data ({len(minute_candles)} candles) for {ticker}")
-                return []
+        with db.cursor(RealDictCursor) as cur:
+            since = datetime.utcfromtimestamp(current_bucket - interval_minutes * 60 * limit).strftime("%Y-%m-%d %H:%M:00")
+            db.execute_prepared(cur, "recent_candles", (token_pair, since, limit))
+            candles = [
+                {
+                    "open": float(c['open']),
+                    "high": float(c['high']),
+                    "low": float(c['low']),
+                    "close": float(c['close']),
+                    "ma_10": float(c['ma_10']) if c['ma_10'] is not None else None,
+                    "ma_50": float(c['ma_50']) if c['ma_50'] is not None else None,
+                    "doji_type": c['doji_type']
+                } for c in cur.fetchall()
+            ]
+        candle_cache[(token_pair, limit)] = (current_bucket if settled else None, candles)
+        logging.debug(f"Fetched {len(candles)} {token_pair} candles from database")
         return candles
     except Exception as e:
-        logging.error(f"Failed to fetch 1hr candles: {e}")
-        return []
-    finally:
-        if conn:
-            conn.close()
+        logging.error(f"🚨 Failed to fetch {token_pair} candles: {e}")
+        return cached[1] if cached else []
 
-def detect_15min_trend(candles, current_price, avg_buy_price):
+def fetch_1hr_candles(ticker, limit=10):
+    candles = fetch_closed_candles(ticker, 60, limit)
+    if not candles:
+        logging.warning(f"No 1-hour candle data for {ticker}")
+    return candles
+
+def detect_15min_trend(candles, current_price, avg_buy_price, ticker):
     if not candles or not isinstance(candles, list) or not all(isinstance(c, dict) for c in candles):
-        conn = get_db_connection()
-        if conn:
-            try:
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute("""
-                        SELECT open, high, low, close, ma_10, ma_50, doji_type
-                        FROM candles
-                        WHERE token_pair = %s
-                        AND timestamp >= %s
-                        ORDER BY timestamp DESC
-                        LIMIT %s
-                    """, (f"JELLY/USD", (datetime.now(timezone.utc) - timedelta(minutes=15)).strftime("%Y-%m-%d %H:%M:00"), 15))
-                    minute_candles = cur.fetchall()
-                    if len(minute_candles) >= 1:
-                        prices = [float(c['close']) for c in minute_candles]
-                        candles = [{
-                            'open': prices[0],
-                            'high': max(prices),
-                            'low': min(prices),
-                            'close': prices[-1],
-                            'ma_10': np.mean(prices[-min(10, len(prices)):]) if len(prices) >= 1 else None,
-                            'ma_50': np.mean(prices[-min(50, len(prices)):]) if len(prices) >= 1 else None,
-                            'doji_type': 'None'
-                        }]
-                        logging.debug(f"Aggregated {len(minute_candles)} 1-min candles into 15-min trend")
-                    else:
-                        logging.warning(f"Insufficient 1-min candle data ({len(minute_candles)} candles)")
-            except Exception as e:
-                logging.error(f"Failed to fetch 1-min candles: {e}")
-            finally:
-                conn.close()
+        # Last closed 15-minute candle from price.py's candle engine
+        candles = fetch_closed_candles(ticker, 15, 1)
         if not candles or not isinstance(candles, list) or not all(isinstance(c, dict) for c in candles):
             logging.warning("Insufficient or invalid candle data for trend analysis")
             return "sideways", avg_buy_price * 1.01 if avg_buy_price > 0 else current_price * 1.01
@@ -695,8 +719,6 @@ def detect_15min_trend(candles, current_price, avg_buy_price):
 
 def trade_logic(tracker: TradeTracker, ticker: str, token_mint: Pubkey, wallet: Keypair, state: dict):
     current_time = time.time()
-    latency = random.uniform(LATENCY_MIN, LATENCY_MAX)
-    time.sleep(latency)
 
     # Fetch API data
     data = fetch_data()
@@ -747,8 +769,7 @@ def trade_logic(tracker: TradeTracker, ticker: str, token_mint: Pubkey, wallet:
 
     # Fetch wallet balances
     try:
-        wallet_balance = get_sol_balance(wallet)
-        token_balance = get_token_balance(wallet, token_mint)
+        wallet_balance, token_balance = get_balances(wallet, token_mint)
         state["cached_sol_balance"] = wallet_balance
         state["cached_token_balance"] = token_balance
         tracker.sync_with_wallet(wallet_balance, token_balance, force_sync=True)
@@ -776,43 +797,14 @@ def trade_logic(tracker: TradeTracker, ticker: str, token_mint: Pubkey, wallet:
     candles = data.get("candle_trend", [])
     if not candles or not isinstance(candles, list) or not all(isinstance(c, dict) for c in candles):
         logging.warning("⚠️ No valid candles from API, fetching from database")
-        conn = get_db_connection()
-        if conn:
-            try:
-                with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute("""
-                        SELECT open, high, low, close, ma_10, ma_50, doji_type
-                        FROM candles
-                        WHERE token_pair = %s
-                        AND timestamp >= %s
-                        ORDER BY timestamp DESC
-                        LIMIT 15
-                    """, (f"{ticker}/USD", (datetime.datetime.now(timezone.utc) - timedelta(minutes=15)).strftime("%Y-%m-%d %H:%M:00")))
-                    candles = cur.fetchall()
-                    candles = [
-                        {
-                            "open": float(c['open']),
-                            "high": float(c['high']),
-                            "low": float(c['low']),
-                            "close": float(c['close']),
-                            "ma_10": float(c['ma_10']) if c['ma_10'] is not None else None,
-                            "ma_50": float(c['ma_50']) if c['ma_50'] is not None else None,
-                            "doji_type": c['doji_type']
-                        } for c in candles
-                    ]
-                    logging.debug(f"Fetched {len(candles)} candles directly from database")
-            except Exception as e:
-                logging.error(f"🚨 Failed to fetch candles from database: {e}")
-                candles = []
-            finally:
-                conn.close()
+        candles = fetch_closed_candles(ticker, 1, 15)
         if not candles:
             logging.warning("⚠️ No candles available, using fallback")
             candles = [{"open": api_data["price"], "high": api_data["price"], "low": api_data["price"], "close": api_data["price"], "ma_10": None, "ma_50": None, "doji_type": "None"}]
 
     # Detect trend
     try:
-        trend, exit_target = detect_15min_trend(candles, api_data["price"], avg_buy_price)
+        trend, exit_target = detect_15min_trend(candles, api_data["price"], avg_buy_price, ticker)
         if exit_target > api_data["price"] * 100 or exit_target < api_data["price"]:
             logging.warning(f"⚠️ Invalid exit_target: ${exit_target:.8f}, setting to price * (1 + PROFIT_THRESHOLD)")
             exit_target = api_data["price"] * (1 + PROFIT_THRESHOLD)
@@ -882,8 +874,7 @@ def trade_logic(tracker: TradeTracker, ticker: str, token_mint: Pubkey, wallet:
                 action = color("BUY", "blue", bold=True)
                 logging.debug(f"📈 Buy attempt: SOL={buy_amount:.6f}, Expected Tokens={amount_out:.2f}, TXID={txid}")
                 if amount_out > 0:
-                    new_token_balance = get_token_balance(wallet, token_mint)
-                    new_sol_balance = get_sol_balance(wallet)
+                    new_sol_balance, new_token_balance = get_balances(wallet, token_mint)
                     actual_buy_price = buy_amount / amount_out if amount_out > 0 else api_data["price"]
                     tracker.sync_with_wallet(new_sol_balance, new_token_balance, force_sync=True)
                     tracker.avg_buy_price = actual_buy_price
@@ -920,8 +911,7 @@ def trade_logic(tracker: TradeTracker, ticker: str, token_mint: Pubkey, wallet:
                 action = color("BUY", "blue", bold=True)
                 logging.debug(f"📈 Buy attempt: SOL={buy_amount:.6f}, Expected Tokens={amount_out:.2f}, TXID={txid}")
                 if amount_out > 0:
-                    new_token_balance = get_token_balance(wallet, token_mint)
-                    new_sol_balance = get_sol_balance(wallet)
+                    new_sol_balance, new_token_balance = get_balances(wallet, token_mint)
                     actual_buy_price = buy_amount / amount_out if amount_out > 0 else api_data["price"]
                     tracker.sync_with_wallet(new_sol_balance, new_token_balance, force_sync=True)
                     total_cost = (tracker.token_amount * tracker.avg_buy_price) + (amount_out * actual_buy_price)
@@ -958,8 +948,7 @@ def trade_logic(tracker: TradeTracker, ticker: str, token_mint: Pubkey, wallet:
                 action = color("SELL", "red", bold=True)
                 logging.debug(f"📈 Sell attempt: Amount={sell_amount:.2f}, Expected={expected_sol:.6f}, TXID={txid}, Out={amount_out:.6f}")
                 if amount_out > 0 or (txid and len(txid) > 0):
-                    new_token_balance = get_token_balance(wallet, token_mint)
-                    new_sol_balance = get_sol_balance(wallet)
+                    new_sol_balance, new_token_balance = get_balances(wallet, token_mint)
                     tracker.sync_with_wallet(new_sol_balance, new_token_balance, force_sync=True)
                     state["cached_sol_balance"] = new_sol_balance
                     state["cached_token_balance"] = new_token_balance
@@ -1007,8 +996,9 @@ def dump_on_boot(tracker, ticker, token_mint, wallet, state):
     sol_balance = state["cached_sol_balance"]
     token_balance = state["cached_token_balance"]
     try:
-        sol_balance = get_sol_balance(wallet) or sol_balance
-        token_balance = get_token_balance(wallet, token_mint) or token_balance
+        fetched_sol, fetched_tokens = get_balances(wallet, token_mint, max_age=0)
+        sol_balance = fetched_sol or sol_balance
+        token_balance = fetched_tokens or token_balance
         state["cached_sol_balance"] = sol_balance
         state["cached_token_balance"] = token_balance
         logging.info(f"🛑 Dump on boot: Fetched balances - SOL={sol_balance:.6f}, Tokens={token_balance:.2f}")
@@ -1020,7 +1010,7 @@ def dump_on_boot(tracker, ticker, token_mint, wallet, state):
     if tracker.token_amount > 0:
         data = fetch_data()
         price = data.get("price", 0.03066045)
-        trend, exit_target = detect_15min_trend([], price, tracker.avg_buy_price)
+        trend, exit_target = detect_15min_trend([], price, tracker.avg_buy_price, ticker)
         logging.info(f"🛑 Dump on boot: Attempting to sell {tracker.token_amount:.2f} {ticker} @ ${price:.8f}")
         txid, sol_received = execute_sell_swap(tracker.token_amount, False, ticker, price, wallet, token_mint, state, tracker)
         if sol_received > 0:
@@ -1187,7 +1177,7 @@ def main():
         sys.exit(1)
 
     try:
-        initial_token_balance = get_token_balance(wallet, token_mint) or state["cached_token_balance"]
+        initial_token_balance = get_balances(wallet, token_mint, max_age=0)[1] or state["cached_token_balance"]
         state["cached_token_balance"] = initial_token_balance
         logging.info(f"💰 Initial token balance: {initial_token_balance} 🐱")
     except Exception as e:
@@ -1271,36 +1261,76 @@ def main():
                 f"Dump on boot failed: {str(e)}"
             )
 
-    while True:
-        try:
-            # Execute trade logic and get summary data
-            trade_result = trade_logic(tracker, ticker, token_mint, wallet, state)
-            state["initial_snipe_done"] = trade_result["initial_snipe_done"]
-            
-            # Print formatted trade summary
-            print_trade_summary(
-                ticker,
-                tracker,
-                state,
-                trade_result["api_data"],
-                trade_result["trend"],
-                trade_result["exit_target"],
-                trade_result["action"],
-                trade_result["reason"]
-            )
-        except Exception as e:
-            logging.error(f"🚨 Error in trade loop: {e}")
-            print_trade_summary(
-                ticker,
-                tracker,
-                state,
-                {"price": 0.0, "sea_life_score": 0.0, "buys": 0, "sells": 0, "doji_signal": None},
-                "none",
-                0.0,
-                color("ERROR", "red", bold=True),
-                f"Trade loop error: {str(e)}"
-            )
-        time.sleep(UPDATE_INTERVAL)
+    asyncio.run(run_trade_loop(tracker, ticker, token_mint, wallet, state))
+
+async def run_trade_loop(tracker: TradeTracker, ticker: str, token_mint: Pubkey, wallet: Keypair, state: dict):
+    # Wakes on pushed API changes (ticks, candles, whale trades) and wallet account changes,
+    # evaluates once per debounced batch, and falls back to a timer so cooldowns, stop-loss and
+    # FORCE_TRADE_INTERVAL still fire on a quiet market.
+    loop = asyncio.get_running_loop()
+    events = TradeEvents().bind(loop)
+    latency = LatencyStats()
+    api_stream.on_update(lambda changed, data: [events.post_threadsafe(kind) for kind in stream_event_kinds(changed)])
+    api_stream.start()
+
+    # Wallet and token account notifications update the balance cache in place, so trade_logic
+    # reads them without an RPC call; BALANCE_MAX_AGE bounds staleness if the socket drops
+    wallet_state = get_wallet_state(wallet, token_mint)
+
+    def on_balance(address, lamports, data):
+        wallet_state.apply_notification(address, lamports, data)
+        events.post("balance")
+
+    balance_watch = asyncio.create_task(watch_accounts(WS_ENDPOINT, wallet_state.watched_accounts(), on_balance))
+
+    last_db_stats = time.time()
+    decisions = 0
+    try:
+        while True:
+            batch = await events.next_batch(STREAM_IDLE_TIMEOUT if api_stream.connected else UPDATE_INTERVAL)
+            kinds = ",".join(sorted(batch)) or "timer"
+            try:
+                # trade_logic blocks on RPC and the swap worker; run it off the loop so events keep queueing
+                trade_result = await loop.run_in_executor(None, trade_logic, tracker, ticker, token_mint, wallet, state)
+                state["initial_snipe_done"] = trade_result["initial_snipe_done"]
+                if batch:
+                    elapsed = time.monotonic() - min(batch.values())
+                    latency.record(elapsed)
+                    logging.debug(f"⚡ Decision on {kinds} {elapsed * 1000:.1f}ms after the first event")
+                decisions += 1
+
+                # Print formatted trade summary
+                print_trade_summary(
+                    ticker,
+                    tracker,
+                    state,
+                    trade_result["api_data"],
+                    trade_result["trend"],
+                    trade_result["exit_target"],
+                    trade_result["action"],
+                    trade_result["reason"]
+                )
+            except Exception as e:
+                logging.error(f"🚨 Error in trade loop: {e}")
+                print_trade_summary(
+                    ticker,
+                    tracker,
+                    state,
+                    {"price": 0.0, "sea_life_score": 0.0, "buys": 0, "sells": 0, "doji_signal": None},
+                    "none",
+                    0.0,
+                    color("ERROR", "red", bold=True),
+                    f"Trade loop error: {str(e)}"
+                )
+            if time.time() - last_db_stats >= DB_STATS_INTERVAL:
+                logging.info(f"🗄️ DB pool: {db.stats_snapshot()}")
+                logging.info(f"💰 Wallet state: {wallet_state.stats_snapshot()}")
+                logging.info(f"😺 RPC router: {solana_client_manager.router.stats_snapshot()}")
+                logging.info(f"⚡ Event-to-decision latency: {latency.snapshot()}, {decisions} decisions, {events.posted} events ({events.coalesced} coalesced)")
+                last_db_stats = time.time()
+    finally:
+        balance_watch.cancel()
+        api_stream.close()
 
 if __name__ == "__main__":
     main()
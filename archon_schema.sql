@@ -16,6 +16,70 @@ SET xmloption = content;
 SET client_min_messages = warning;
 SET row_security = off;
 
+--
+-- Name: notify_archon_change(); Type: FUNCTION; Schema: public; Owner: postgres
+--
+
+CREATE FUNCTION public.notify_archon_change() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    -- Payload is '<table>:<token>'; identical payloads in one transaction are delivered once
+    IF TG_TABLE_NAME = 'candles' THEN
+        PERFORM pg_notify('archon_changes', TG_TABLE_NAME || ':' || NEW.token_pair);
+    ELSE
+        PERFORM pg_notify('archon_changes', TG_TABLE_NAME || ':' || NEW.token);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+
+ALTER FUNCTION public.notify_archon_change() OWNER TO postgres;
+
+--
+-- Name: trade_flow_1m_apply(); Type: FUNCTION; Schema: public; Owner: postgres
+--
+
+CREATE FUNCTION public.trade_flow_1m_apply() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO public.trade_flow_1m AS f (token, minute, trade_type, classification, trades, volume)
+        SELECT coalesce(token, ''), date_trunc('minute', detected_time), coalesce(trade_type, ''), coalesce(classification, ''),
+               -count(*), -coalesce(sum(amount), 0)
+        FROM old_rows
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (token, minute, trade_type, classification) DO UPDATE
+            SET trades = f.trades + EXCLUDED.trades, volume = f.volume + EXCLUDED.volume;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO public.trade_flow_1m AS f (token, minute, trade_type, classification, trades, volume)
+        SELECT coalesce(token, ''), date_trunc('minute', detected_time), coalesce(trade_type, ''), coalesce(classification, ''),
+               count(*), coalesce(sum(amount), 0)
+        FROM new_rows
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (token, minute, trade_type, classification) DO UPDATE
+            SET trades = f.trades + EXCLUDED.trades, volume = f.volume + EXCLUDED.volume;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM public.trade_flow_1m f
+        USING (SELECT DISTINCT coalesce(token, '') AS token, date_trunc('minute', detected_time) AS minute,
+                      coalesce(trade_type, '') AS trade_type, coalesce(classification, '') AS classification
+               FROM old_rows) o
+        WHERE f.token = o.token AND f.minute = o.minute AND f.trade_type = o.trade_type
+          AND f.classification = o.classification AND f.trades <= 0;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+
+ALTER FUNCTION public.trade_flow_1m_apply() OWNER TO postgres;
+
 SET default_tablespace = '';
 
 SET default_table_access_method = heap;
@@ -123,12 +187,41 @@ CREATE TABLE public.candles (
     ma_10 numeric(16,8),
     ma_50 numeric(16,8),
     doji_type character varying(20) DEFAULT 'None'::character varying NOT NULL,
-    CONSTRAINT candles_pkey PRIMARY KEY (id),
+    CONSTRAINT candles_pkey PRIMARY KEY (id, "timestamp"),
     CONSTRAINT unique_timestamp_token_pair UNIQUE ("timestamp", token_pair)
-);
+)
+PARTITION BY RANGE ("timestamp");
 
 ALTER TABLE public.candles OWNER TO postgres;
 
+--
+-- Name: candles_default; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.candles_default PARTITION OF public.candles DEFAULT;
+
+ALTER TABLE public.candles_default OWNER TO postgres;
+
+--
+-- Name: candles_history; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.candles_history (
+    id integer NOT NULL,
+    token_pair character varying(50) NOT NULL,
+    "timestamp" timestamp without time zone NOT NULL,
+    open numeric(16,8) NOT NULL,
+    high numeric(16,8) NOT NULL,
+    low numeric(16,8) NOT NULL,
+    close numeric(16,8) NOT NULL,
+    ma_10 numeric(16,8),
+    ma_50 numeric(16,8),
+    doji_type character varying(20) DEFAULT 'None'::character varying NOT NULL,
+    CONSTRAINT candles_history_timestamp_token_pair UNIQUE ("timestamp", token_pair)
+);
+
+ALTER TABLE public.candles_history OWNER TO postgres;
+
 --
 -- Name: candles_id_seq; Type: SEQUENCE; Schema: public; Owner: postgres
 --
@@ -149,6 +242,20 @@ ALTER TABLE public.candles_id_seq OWNER TO postgres;
 
 ALTER SEQUENCE public.candles_id_seq OWNED BY public.candles.id;
 
+--
+-- Name: ingest_cursor; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.ingest_cursor (
+    consumer text NOT NULL,
+    pair_address text NOT NULL,
+    slot bigint NOT NULL,
+    signature text NOT NULL,
+    updated_at timestamp without time zone DEFAULT now() NOT NULL
+);
+
+ALTER TABLE public.ingest_cursor OWNER TO postgres;
+
 --
 -- Name: learning_metrics; Type: TABLE; Schema: public; Owner: postgres
 --
@@ -196,11 +303,52 @@ CREATE TABLE public.validator (
     post_balance double precision,
     trade_type text,
     transaction_emoji text,
-    failed boolean DEFAULT false
-);
+    failed boolean DEFAULT false,
+    ingest_id bigint NOT NULL
+)
+PARTITION BY RANGE (block_time);
 
 ALTER TABLE public.validator OWNER TO postgres;
 
+--
+-- Name: validator_default; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.validator_default PARTITION OF public.validator DEFAULT;
+
+ALTER TABLE public.validator_default OWNER TO postgres;
+
+--
+-- Name: validator_ingest_id_seq; Type: SEQUENCE; Schema: public; Owner: postgres
+--
+
+CREATE SEQUENCE public.validator_ingest_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+ALTER TABLE public.validator_ingest_id_seq OWNER TO postgres;
+
+--
+-- Name: validator_ingest_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: postgres
+--
+
+ALTER SEQUENCE public.validator_ingest_id_seq OWNED BY public.validator.ingest_id;
+
+--
+-- Name: job_watermark; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.job_watermark (
+    job text NOT NULL,
+    watermark bigint NOT NULL,
+    updated_at timestamp without time zone DEFAULT now() NOT NULL
+);
+
+ALTER TABLE public.job_watermark OWNER TO postgres;
+
 --
 -- Name: whale_detector; Type: TABLE; Schema: public; Owner: postgres
 --
@@ -214,10 +362,34 @@ CREATE TABLE public.whale_detector (
     classification text,
     archon_notes text,
     transaction_hash text NOT NULL
-);
+)
+PARTITION BY RANGE (detected_time);
 
 ALTER TABLE public.whale_detector OWNER TO postgres;
 
+--
+-- Name: whale_detector_default; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.whale_detector_default PARTITION OF public.whale_detector DEFAULT;
+
+ALTER TABLE public.whale_detector_default OWNER TO postgres;
+
+--
+-- Name: trade_flow_1m; Type: TABLE; Schema: public; Owner: postgres
+--
+
+CREATE TABLE public.trade_flow_1m (
+    token text NOT NULL,
+    minute timestamp without time zone NOT NULL,
+    trade_type text NOT NULL,
+    classification text NOT NULL,
+    trades bigint NOT NULL,
+    volume numeric NOT NULL
+);
+
+ALTER TABLE public.trade_flow_1m OWNER TO postgres;
+
 --
 -- Name: archon_clients id; Type: DEFAULT; Schema: public; Owner: postgres
 --
@@ -242,6 +414,12 @@ ALTER TABLE ONLY public.candles ALTER COLUMN id SET DEFAULT nextval('public.cand
 
 ALTER TABLE ONLY public.learning_metrics ALTER COLUMN id SET DEFAULT nextval('public.learning_metrics_id_seq'::regclass);
 
+--
+-- Name: validator ingest_id; Type: DEFAULT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.validator ALTER COLUMN ingest_id SET DEFAULT nextval('public.validator_ingest_id_seq'::regclass);
+
 --
 -- Name: archon_clients archon_clients_api_key_key; Type: CONSTRAINT; Schema: public; Owner: postgres
 --
@@ -264,11 +442,18 @@ ALTER TABLE ONLY public.archon_tx
     ADD CONSTRAINT archon_tx_pkey PRIMARY KEY (id);
 
 --
--- Name: candles candles_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+-- Name: ingest_cursor ingest_cursor_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+--
+
+ALTER TABLE ONLY public.ingest_cursor
+    ADD CONSTRAINT ingest_cursor_pkey PRIMARY KEY (consumer, pair_address);
+
+--
+-- Name: job_watermark job_watermark_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.candles
-    ADD CONSTRAINT candles_pkey PRIMARY KEY (id);
+ALTER TABLE ONLY public.job_watermark
+    ADD CONSTRAINT job_watermark_pkey PRIMARY KEY (job);
 
 --
 -- Name: learning_metrics learning_metrics_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
@@ -278,25 +463,25 @@ ALTER TABLE ONLY public.learning_metrics
     ADD CONSTRAINT learning_metrics_pkey PRIMARY KEY (id);
 
 --
--- Name: candles unique_timestamp_token_pair; Type: CONSTRAINT; Schema: public; Owner: postgres
+-- Name: validator unique_transaction_hash; Type: CONSTRAINT; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.candles
-    ADD CONSTRAINT unique_timestamp_token_pair UNIQUE ("timestamp", token_pair);
+ALTER TABLE public.validator
+    ADD CONSTRAINT unique_transaction_hash UNIQUE (transaction_hash, block_time);
 
 --
--- Name: validator unique_transaction_hash; Type: CONSTRAINT; Schema: public; Owner: postgres
+-- Name: whale_detector whale_detector_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.validator
-    ADD CONSTRAINT unique_transaction_hash UNIQUE (transaction_hash);
+ALTER TABLE public.whale_detector
+    ADD CONSTRAINT whale_detector_pkey PRIMARY KEY (transaction_hash, detected_time);
 
 --
--- Name: whale_detector whale_detector_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
+-- Name: trade_flow_1m trade_flow_1m_pkey; Type: CONSTRAINT; Schema: public; Owner: postgres
 --
 
-ALTER TABLE ONLY public.whale_detector
-    ADD CONSTRAINT whale_detector_pkey PRIMARY KEY (transaction_hash);
+ALTER TABLE ONLY public.trade_flow_1m
+    ADD CONSTRAINT trade_flow_1m_pkey PRIMARY KEY (token, minute, trade_type, classification);
 
 --
 -- Name: idx_api_key; Type: INDEX; Schema: public; Owner: postgres
@@ -364,12 +549,6 @@ CREATE INDEX idx_learning_metrics_metric_type ON public.learning_metrics USING b
 
 CREATE INDEX idx_learning_metrics_timestamp ON public.learning_metrics USING btree ("timestamp");
 
---
--- Name: idx_token; Type: INDEX; Schema: public; Owner: postgres
---
-
-CREATE INDEX idx_token ON public.whale_detector USING btree (token);
-
 --
 -- Name: idx_token_timestamp; Type: INDEX; Schema: public; Owner: postgres
 --
@@ -400,12 +579,65 @@ CREATE INDEX idx_trade_token ON public.archon_clients USING btree (token);
 
 CREATE INDEX idx_trade_type ON public.archon_clients USING btree (trade_type);
 
+--
+-- Name: idx_validator_ingest_id; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX idx_validator_ingest_id ON public.validator USING btree (ingest_id);
+
+--
+-- Name: idx_validator_token_block_time; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX idx_validator_token_block_time ON public.validator USING btree (token_mint, block_time);
+
+--
+-- Name: idx_whale_detector_token_time; Type: INDEX; Schema: public; Owner: postgres
+--
+
+CREATE INDEX idx_whale_detector_token_time ON public.whale_detector USING btree (token, detected_time);
+
 --
 -- Name: idx_whale_wallet; Type: INDEX; Schema: public; Owner: postgres
 --
 
 CREATE INDEX idx_whale_wallet ON public.whale_detector USING btree (whale_wallet);
 
+--
+-- Name: candles candles_notify_change; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER candles_notify_change AFTER INSERT OR UPDATE ON public.candles FOR EACH ROW EXECUTE FUNCTION public.notify_archon_change();
+
+
+--
+-- Name: whale_detector whale_detector_notify_change; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER whale_detector_notify_change AFTER INSERT OR UPDATE ON public.whale_detector FOR EACH ROW EXECUTE FUNCTION public.notify_archon_change();
+
+
+--
+-- Name: whale_detector trade_flow_1m_insert; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER trade_flow_1m_insert AFTER INSERT ON public.whale_detector REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.trade_flow_1m_apply();
+
+
+--
+-- Name: whale_detector trade_flow_1m_update; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER trade_flow_1m_update AFTER UPDATE ON public.whale_detector REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION public.trade_flow_1m_apply();
+
+
+--
+-- Name: whale_detector trade_flow_1m_delete; Type: TRIGGER; Schema: public; Owner: postgres
+--
+
+CREATE TRIGGER trade_flow_1m_delete AFTER DELETE ON public.whale_detector REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION public.trade_flow_1m_apply();
+
+
 --
 -- PostgreSQL database dump complete
 --
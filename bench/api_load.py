@@ -0,0 +1,59 @@
+import time
+import asyncio
+import argparse
+import statistics
+import aiohttp
+
+# Many concurrent pollers against the trade API's /data endpoint for a fixed duration.
+# Reports requests/second and latency percentiles; --etag makes clients send If-None-Match
+# the way a well-behaved poller would, so unchanged data comes back as a bodyless 304.
+#
+#   python trade_api/api.py &
+#   python bench/api_load.py --clients 200 --duration 20
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+async def client(session, url, deadline, samples, statuses, use_etag):
+    etag = None
+    while time.perf_counter() < deadline:
+        headers = {"If-None-Match": etag} if use_etag and etag else {}
+        started = time.perf_counter()
+        try:
+            async with session.get(url, headers=headers) as resp:
+                await resp.read()
+                etag = resp.headers.get("ETag", etag)
+                statuses[resp.status] = statuses.get(resp.status, 0) + 1
+        except aiohttp.ClientError as e:
+            statuses[type(e).__name__] = statuses.get(type(e).__name__, 0) + 1
+            continue
+        samples.append(time.perf_counter() - started)
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000/data")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--etag", action="store_true", help="send If-None-Match with the last ETag")
+    args = parser.parse_args()
+
+    samples = []
+    statuses = {}
+    connector = aiohttp.TCPConnector(limit=args.clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(client(session, args.url, deadline, samples, statuses, args.etag) for _ in range(args.clients)))
+        elapsed = time.perf_counter() - started
+
+    if not samples:
+        print(f"No successful requests: {statuses}")
+        return
+    samples.sort()
+    print(f"{args.clients} clients, {elapsed:.1f}s, {len(samples)} requests, statuses {statuses}")
+    print(f"throughput: {len(samples) / elapsed:10.1f} req/s")
+    print(f"latency:    mean {statistics.mean(samples) * 1000:.2f}ms  p50 {percentile(samples, 0.50) * 1000:.2f}ms  "
+          f"p99 {percentile(samples, 0.99) * 1000:.2f}ms  max {samples[-1] * 1000:.2f}ms")
+
+if __name__ == "__main__":
+    asyncio.run(main())
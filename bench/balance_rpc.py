@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+import argparse
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from wallet_state import WalletState
+from mock_rpc import MockRpcServer, WALLET_ADDRESS, TOKEN_MINT
+
+# RPC requests and wall time per trade-loop iteration for the wallet balances: the old
+# getBalance + getTokenAccountsByOwner + getTokenAccountBalance sequence (done twice per
+# iteration that trades) versus WalletState, forced (max_age=0) and cached.
+#
+#   python bench/balance_rpc.py --iterations 200 --latency 0.03
+
+def old_balances(session, url):
+    def call(method, params):
+        return session.post(url, json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params}, timeout=5).json()["result"]
+    sol = call("getBalance", [WALLET_ADDRESS])["value"] / 1e9
+    accounts = call("getTokenAccountsByOwner", [WALLET_ADDRESS, {"mint": TOKEN_MINT}, {"encoding": "base64"}])["value"]
+    tokens = call("getTokenAccountBalance", [accounts[0]["pubkey"]])["value"]["uiAmount"] if accounts else 0.0
+    return sol, tokens
+
+def measure(name, server, iterations, fn):
+    before = server.requests
+    started = time.perf_counter()
+    for _ in range(iterations):
+        result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{name:<28} {(server.requests - before) / iterations:5.2f} RPC/iter  {elapsed / iterations * 1000:7.2f}ms/iter  -> {result}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated RPC round-trip in seconds")
+    args = parser.parse_args()
+
+    server = MockRpcServer(latency=args.latency).start()
+    session = requests.Session()
+    measure("old serial calls", server, args.iterations, lambda: old_balances(session, server.url))
+    state = WalletState(server.url, WALLET_ADDRESS, TOKEN_MINT)
+    measure("WalletState forced refresh", server, args.iterations, lambda: state.balances(max_age=0))
+    measure("WalletState cached (10s)", server, args.iterations, lambda: state.balances())
+    print(f"wallet state stats: {state.stats_snapshot()}")
+    server.shutdown()
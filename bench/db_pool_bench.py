@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from db_pool import DB_PARAMS, ConnectionPool
+
+# Latency of the bot's hot candle query three ways: a fresh connection per query (what
+# get_db_connection did), a pooled connection, and a pooled connection running the
+# PREPAREd statement. Needs the archon_data database.
+#
+#   PG_PASSWORD=... python bench/db_pool_bench.py --queries 2000 --pair JELLY/USD
+
+QUERY = """
+    SELECT timestamp, open, high, low, close
+    FROM public.candles
+    WHERE token_pair = $1 AND timestamp < NOW()
+    ORDER BY timestamp DESC
+    LIMIT $2
+"""
+
+def report(name, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:<22} mean {statistics.mean(samples) * 1000:8.3f}ms  p50 {statistics.median(samples) * 1000:8.3f}ms  p99 {p99 * 1000:8.3f}ms")
+
+def run(n, fn):
+    samples = []
+    for _ in range(n):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--pair", default="JELLY/USD")
+    parser.add_argument("--limit", type=int, default=15)
+    args = parser.parse_args()
+
+    plain_sql = QUERY.replace("$1", "%s").replace("$2", "%s")
+    params = (args.pair, args.limit)
+
+    def connect_per_query():
+        conn = psycopg2.connect(**DB_PARAMS, cursor_factory=RealDictCursor)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(plain_sql, params)
+                cur.fetchall()
+        finally:
+            conn.close()
+
+    pool = ConnectionPool(minconn=1, maxconn=1, statements={"bench_candles": QUERY})
+
+    def pooled():
+        with pool.cursor(RealDictCursor) as cur:
+            cur.execute(plain_sql, params)
+            cur.fetchall()
+
+    def pooled_prepared():
+        with pool.cursor(RealDictCursor) as cur:
+            pool.execute_prepared(cur, "bench_candles", params)
+            cur.fetchall()
+
+    print(f"{args.queries} queries for {args.pair} (LIMIT {args.limit})")
+    for name, fn in (("connect per query", connect_per_query), ("pooled", pooled), ("pooled + prepared", pooled_prepared)):
+        fn()  # warm up: first connect / PREPARE
+        report(name, run(args.queries, fn))
+    print(f"pool stats: {pool.stats_snapshot()}")
+    pool.close()
@@ -0,0 +1,292 @@
+import os
+import sys
+import json
+import time
+import base64
+import random
+import hashlib
+import struct
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pool_reserves import B58_ALPHABET, WSOL_MINT, AMM_V4_SIZE
+
+# Local stand-in for a Solana JSON-RPC endpoint, used by the benchmarks. Serves a synthetic
+# Raydium AMM v4 pool whose reserves drift a little on every read plus a signature history of
+# swaps against it, supports JSON-RPC batch arrays, and can inject latency, slow tails, errors,
+# 429s and outages.
+
+TOKEN_MINT = "A8C3xuqscfmyLrte3VmTqrAq8kgMASius9AFNANwpump"
+POOL_ADDRESS = "AB1eu2L1Jr3nfEft85AuD2zGksUbam1Kr8MR3uM2sjwt"
+BASE_VAULT = "BaseVau1t1111111111111111111111111111111111"
+QUOTE_VAULT = "QuoteVau1t111111111111111111111111111111111"
+WALLET_ADDRESS = "Wa11et1111111111111111111111111111111111111"
+WALLET_TOKEN_ACCOUNT = "Wa11etToken11111111111111111111111111111111"
+TOKEN_DECIMALS = 6
+RAYDIUM_AMM_PROGRAM = "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8"
+HISTORY_SIZE = 10_000
+HISTORY_SLOT_TIME = 0.4
+
+def b58encode(data):
+    n = int.from_bytes(data, "big")
+    out = ""
+    while n:
+        n, rem = divmod(n, 58)
+        out = B58_ALPHABET[rem] + out
+    return "1" * (len(data) - len(data.lstrip(b"\0"))) + out
+
+def b58decode(text):
+    n = 0
+    for ch in text:
+        n = n * 58 + B58_ALPHABET.index(ch)
+    return n.to_bytes(32, "big")
+
+def encode_amm_v4(base_vault, quote_vault, base_mint, quote_mint, base_decimal=9, quote_decimal=6):
+    data = bytearray(AMM_V4_SIZE)
+    struct.pack_into("<Q", data, 4 * 8, base_decimal)
+    struct.pack_into("<Q", data, 5 * 8, quote_decimal)
+    for offset, key in ((336, base_vault), (368, quote_vault), (400, base_mint), (432, quote_mint)):
+        data[offset:offset + 32] = b58decode(key)
+    return bytes(data)
+
+def encode_token_account(mint, amount):
+    data = bytearray(165)
+    data[0:32] = b58decode(mint)
+    struct.pack_into("<Q", data, 64, amount)
+    return bytes(data)
+
+def encode_mint(decimals, supply=10**15):
+    data = bytearray(82)
+    struct.pack_into("<Q", data, 36, supply)
+    data[44] = decimals
+    return bytes(data)
+
+def encode_ray_log_swap_base_in(amount_in, minimum_out, direction, user_source, pool_coin, pool_pc, out_amount):
+    """Raydium v4 SwapBaseIn ray_log (log_type 3); direction 1 = pc->coin, 2 = coin->pc."""
+    return base64.b64encode(struct.pack("<B7Q", 3, amount_in, minimum_out, direction, user_source, pool_coin, pool_pc, out_amount)).decode()
+
+class MockChain:
+    def __init__(self, base_reserve=5_000 * 10**9, quote_reserve=400_000_000 * 10**6, history_size=HISTORY_SIZE):
+        self.lock = threading.Lock()
+        self.base_reserve = base_reserve
+        self.quote_reserve = quote_reserve
+        self.amm = encode_amm_v4(BASE_VAULT, QUOTE_VAULT, WSOL_MINT, TOKEN_MINT)
+        self.wallet_lamports = 2 * 10**9
+        self.wallet_tokens = 1_234_567 * 10**TOKEN_DECIMALS
+        self.signatures = {}
+        self.started = time.time()
+        # Pool history, newest first: history[i] is i swaps before the latest one
+        self.history = [b58encode(hashlib.sha512(f"swap-{i}".encode()).digest()) for i in range(history_size)]
+        self.history_index = {sig: i for i, sig in enumerate(self.history)}
+        self.head = 0  # index of the newest swap served so far; lower it to let new swaps "arrive"
+
+    def signatures_for_address(self, address, limit=1000, before=None, until=None):
+        if address != POOL_ADDRESS:
+            return []
+        start = max(self.head, self.history_index[before] + 1 if before in self.history_index else 0)
+        stop = self.history_index.get(until, len(self.history))
+        return [{"signature": sig, "slot": 10**6 - i, "err": None, "memo": None,
+                 "blockTime": int(self.started - i * HISTORY_SLOT_TIME), "confirmationStatus": "finalized"}
+                for i, sig in enumerate(self.history[start:min(stop, start + limit)], start)]
+
+    def history_transaction(self, index):
+        """A deterministic Raydium swap (json encoding) for history signature `index`."""
+        rng = random.Random(index)
+        trader = b58encode(hashlib.sha256(f"trader-{rng.randrange(500)}".encode()).digest())
+        trader_tokens = b58encode(hashlib.sha256(f"trader-ata-{trader}".encode()).digest())
+        buy = rng.random() < 0.5
+        sol = int(rng.lognormvariate(-1.0, 1.5) * 10**9) + 1
+        tokens = sol * self.quote_reserve // self.base_reserve * 9975 // 10000
+        held = rng.randrange(tokens, tokens * 20)
+        pre, post = (held - tokens, held) if buy else (held, held - tokens)
+        amount_in, out_amount = (sol, tokens) if buy else (tokens, sol)
+        ray_log = encode_ray_log_swap_base_in(amount_in, out_amount * 99 // 100, 2 if buy else 1, held,
+                                              self.base_reserve, self.quote_reserve, out_amount)
+        token_balance = lambda amount: {"accountIndex": 1, "mint": TOKEN_MINT, "owner": trader, "programId": "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA",
+                                        "uiTokenAmount": {"amount": str(amount), "decimals": TOKEN_DECIMALS,
+                                                          "uiAmount": amount / 10**TOKEN_DECIMALS, "uiAmountString": str(amount / 10**TOKEN_DECIMALS)}}
+        lamports = 10 * 10**9
+        return {
+            "slot": 10**6 - index,
+            "blockTime": int(self.started - index * HISTORY_SLOT_TIME),
+            "transaction": {
+                "signatures": [self.history[index]],
+                "message": {"accountKeys": [trader, trader_tokens, POOL_ADDRESS, BASE_VAULT, QUOTE_VAULT, RAYDIUM_AMM_PROGRAM]}
+            },
+            "meta": {
+                "err": None,
+                "fee": 5000,
+                "preBalances": [lamports, 2039280, 6124800, 0, 0, 1141440],
+                "postBalances": [lamports - 5000 + (-sol if buy else sol), 2039280, 6124800, 0, 0, 1141440],
+                "preTokenBalances": [token_balance(pre)],
+                "postTokenBalances": [token_balance(post)],
+                "logMessages": [
+                    f"Program {RAYDIUM_AMM_PROGRAM} invoke [1]",
+                    f"Program log: ray_log: {ray_log}",
+                    "Program TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA invoke [2]",
+                    "Program TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA success",
+                    f"Program {RAYDIUM_AMM_PROGRAM} success"
+                ]
+            }
+        }
+
+    def block_height(self):
+        return int((time.time() - self.started) / 0.4)
+
+    def submit(self, signature, confirm_after=0.8, err=None, lamports_delta=0, token_delta=0, fee=5000):
+        """Register a sent transaction that reaches 'confirmed' after `confirm_after` seconds."""
+        with self.lock:
+            self.signatures[signature] = {"at": time.time(), "confirm_after": confirm_after, "err": err,
+                                          "lamports_delta": lamports_delta, "token_delta": token_delta, "fee": fee}
+
+    def signature_status(self, signature):
+        tx = self.signatures.get(signature)
+        if tx is None:
+            return None
+        age = time.time() - tx["at"]
+        if age < tx["confirm_after"] / 2:
+            return None
+        status = "processed" if age < tx["confirm_after"] else "confirmed"
+        return {"slot": 1000 + self.block_height(), "confirmations": None if status == "confirmed" else 0,
+                "err": tx["err"], "confirmationStatus": status}
+
+    def transaction(self, signature):
+        tx = self.signatures.get(signature)
+        if tx is None or self.signature_status(signature)["confirmationStatus"] == "processed":
+            return None
+        pre_lamports, pre_tokens = self.wallet_lamports, self.wallet_tokens
+        token_balance = lambda amount: {"accountIndex": 1, "mint": TOKEN_MINT, "owner": WALLET_ADDRESS,
+                                        "uiTokenAmount": {"amount": str(amount), "decimals": TOKEN_DECIMALS}}
+        return {
+            "slot": 1000,
+            "transaction": {"message": {"accountKeys": [{"pubkey": WALLET_ADDRESS}, {"pubkey": WALLET_TOKEN_ACCOUNT}]}},
+            "meta": {
+                "err": tx["err"],
+                "fee": tx["fee"],
+                "preBalances": [pre_lamports, 0],
+                "postBalances": [pre_lamports + tx["lamports_delta"], 0],
+                "preTokenBalances": [token_balance(pre_tokens)],
+                "postTokenBalances": [token_balance(pre_tokens + tx["token_delta"])]
+            }
+        }
+
+    def drift(self):
+        with self.lock:
+            self.base_reserve = int(self.base_reserve * (1 + random.uniform(-0.001, 0.001)))
+            return self.base_reserve, self.quote_reserve
+
+    def account(self, address):
+        if address == POOL_ADDRESS:
+            data = self.amm
+        elif address == BASE_VAULT:
+            data = encode_token_account(WSOL_MINT, self.drift()[0])
+        elif address == QUOTE_VAULT:
+            data = encode_token_account(TOKEN_MINT, self.quote_reserve)
+        elif address == TOKEN_MINT:
+            data = encode_mint(TOKEN_DECIMALS)
+        elif address == WALLET_TOKEN_ACCOUNT:
+            data = encode_token_account(TOKEN_MINT, self.wallet_tokens)
+        elif address == WALLET_ADDRESS:
+            return {"data": ["", "base64"], "owner": "11111111111111111111111111111111", "lamports": self.wallet_lamports, "executable": False}
+        else:
+            return None
+        return {"data": [base64.b64encode(data).decode(), "base64"], "owner": "", "lamports": 0, "executable": False}
+
+class MockRpcHandler(BaseHTTPRequestHandler):
+    server_version = "MockRpc/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def _call(self, request):
+        method = request.get("method")
+        params = request.get("params", [])
+        chain = self.server.chain
+        if method == "getMultipleAccounts":
+            result = {"context": {"slot": 1}, "value": [chain.account(a) for a in params[0]]}
+        elif method == "getAccountInfo":
+            result = {"context": {"slot": 1}, "value": chain.account(params[0])}
+        elif method == "getBalance":
+            result = {"context": {"slot": 1}, "value": chain.wallet_lamports if params[0] == WALLET_ADDRESS else 1_000_000_000}
+        elif method == "getTokenAccountsByOwner":
+            found = params[0] == WALLET_ADDRESS and params[1].get("mint") == TOKEN_MINT
+            result = {"context": {"slot": 1}, "value": [{"pubkey": WALLET_TOKEN_ACCOUNT, "account": chain.account(WALLET_TOKEN_ACCOUNT)}] if found else []}
+        elif method == "getTokenAccountBalance":
+            amount = chain.wallet_tokens if params[0] == WALLET_TOKEN_ACCOUNT else 0
+            result = {"context": {"slot": 1}, "value": {"amount": str(amount), "decimals": TOKEN_DECIMALS, "uiAmount": amount / 10**TOKEN_DECIMALS}}
+        elif method == "getSignatureStatuses":
+            result = {"context": {"slot": 1}, "value": [chain.signature_status(sig) for sig in params[0]]}
+        elif method == "getTransaction":
+            index = chain.history_index.get(params[0])
+            result = chain.history_transaction(index) if index is not None else chain.transaction(params[0])
+        elif method == "getSignaturesForAddress":
+            options = params[1] if len(params) > 1 else {}
+            result = chain.signatures_for_address(params[0], options.get("limit", 1000), options.get("before"), options.get("until"))
+        elif method == "getBlockHeight":
+            result = chain.block_height()
+        elif method == "getLatestBlockhash":
+            result = {"context": {"slot": 1}, "value": {"blockhash": "11111111111111111111111111111111", "lastValidBlockHeight": 1}}
+        else:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": f"Method not found: {method}"}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if server.slow_rate and random.random() < server.slow_rate:
+            time.sleep(server.slow_latency)
+        if server.down:
+            status, payload = 503, {"jsonrpc": "2.0", "error": {"code": -32000, "message": "Endpoint down"}}
+        elif random.random() < server.rate_limit_rate:
+            status, payload = 429, {"jsonrpc": "2.0", "error": {"code": 429, "message": "Too Many Requests"}}
+        elif random.random() < server.error_rate:
+            status, payload = 503, {"jsonrpc": "2.0", "error": {"code": -32000, "message": "Service Unavailable"}}
+        elif isinstance(body, list):
+            status, payload = 200, [self._call(r) for r in body]
+        else:
+            status, payload = 200, self._call(body)
+        raw = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+class MockRpcServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, rate_limit_rate=0.0, chain=None,
+                 slow_rate=0.0, slow_latency=0.0):
+        super().__init__((host, port), MockRpcHandler)
+        self.latency = latency
+        self.slow_rate = slow_rate  # fraction of requests that take an extra slow_latency (tail latency)
+        self.slow_latency = slow_latency
+        self.down = False  # answer everything with 503 while set
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.chain = chain or MockChain()
+        self.requests = 0
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = MockRpcServer(port=args.port, latency=args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate)
+    print(f"Mock RPC on {server.url} (pool {POOL_ADDRESS})")
+    server.serve_forever()
@@ -0,0 +1,177 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import datetime, timedelta
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from db_pool import DB_PARAMS
+import partitions
+
+# Latency of the hot time-window queries on 10M-row validator and whale_detector tables (and
+# a candles table a tenth that size) spread over --days of history: first as the plain heaps
+# archon_schema.sql used to define, then after partitions.migrate() has converted them to
+# daily partitions with the composite indexes. Runs in a scratch schema that is dropped at
+# the end. Needs archon_data and a few GB of free disk.
+#
+#   PG_PASSWORD=... python bench/partition_bench.py --rows 10000000 --days 60
+
+SCHEMA = "archon_bench"
+
+SETUP_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE SEQUENCE {SCHEMA}.validator_ingest_id_seq;
+CREATE SEQUENCE {SCHEMA}.candles_id_seq AS integer;
+CREATE TABLE {SCHEMA}.validator (
+    transaction_hash text,
+    wallet_address text NOT NULL,
+    block_time timestamp without time zone NOT NULL,
+    token_mint text,
+    pre_balance double precision,
+    post_balance double precision,
+    trade_type text,
+    transaction_emoji text,
+    failed boolean DEFAULT false,
+    ingest_id bigint NOT NULL DEFAULT nextval('{SCHEMA}.validator_ingest_id_seq'::regclass),
+    CONSTRAINT unique_transaction_hash UNIQUE (transaction_hash)
+);
+CREATE TABLE {SCHEMA}.whale_detector (
+    whale_wallet text NOT NULL,
+    detected_time timestamp without time zone NOT NULL,
+    amount numeric,
+    token text,
+    trade_type text,
+    classification text,
+    archon_notes text,
+    transaction_hash text NOT NULL,
+    CONSTRAINT whale_detector_pkey PRIMARY KEY (transaction_hash)
+);
+CREATE INDEX idx_classification ON {SCHEMA}.whale_detector USING btree (classification);
+CREATE INDEX idx_detected_time ON {SCHEMA}.whale_detector USING btree (detected_time);
+CREATE INDEX idx_token ON {SCHEMA}.whale_detector USING btree (token);
+CREATE INDEX idx_whale_wallet ON {SCHEMA}.whale_detector USING btree (whale_wallet);
+CREATE TABLE {SCHEMA}.candles (
+    id integer NOT NULL DEFAULT nextval('{SCHEMA}.candles_id_seq'::regclass),
+    token_pair character varying(50) NOT NULL,
+    "timestamp" timestamp without time zone NOT NULL,
+    open numeric(16,8) NOT NULL,
+    high numeric(16,8) NOT NULL,
+    low numeric(16,8) NOT NULL,
+    close numeric(16,8) NOT NULL,
+    ma_10 numeric(16,8),
+    ma_50 numeric(16,8),
+    doji_type character varying(20) DEFAULT 'None'::character varying NOT NULL,
+    CONSTRAINT candles_pkey PRIMARY KEY (id),
+    CONSTRAINT unique_timestamp_token_pair UNIQUE ("timestamp", token_pair)
+);
+CREATE INDEX idx_candles_pair ON {SCHEMA}.candles USING btree (token_pair);
+CREATE INDEX idx_candles_timestamp ON {SCHEMA}.candles USING btree ("timestamp");
+CREATE INDEX idx_token_timestamp ON {SCHEMA}.candles USING btree (token_pair, "timestamp");
+"""
+
+# Ten tokens so the token filter matters; rows are evenly spread up to now
+FILL_SQL = f"""
+INSERT INTO {SCHEMA}.validator (transaction_hash, wallet_address, block_time, token_mint, pre_balance, post_balance, trade_type, transaction_emoji)
+SELECT md5(i::text) || md5((i + 1)::text), 'wallet' || (i %% 50000), now()::timestamp - (%(n)s - i) * %(step)s * interval '1 second',
+       'TOKEN' || (i %% 10), 0.0, exp(random() * 20), CASE WHEN i %% 2 = 0 THEN 'buy' ELSE 'sell' END, '🐟'
+FROM generate_series(1, %(n)s) AS i;
+INSERT INTO {SCHEMA}.whale_detector (whale_wallet, detected_time, amount, token, trade_type, classification, transaction_hash)
+SELECT wallet_address, block_time, post_balance * 1000000, token_mint, trade_type,
+       (ARRAY['🐋', '🐳', '🦈', '🐟', '🦐', '🐚'])[1 + abs(hashtext(transaction_hash)) %% 6], transaction_hash
+FROM {SCHEMA}.validator;
+INSERT INTO {SCHEMA}.candles (token_pair, "timestamp", open, high, low, close)
+SELECT 'TOKEN' || (i %% 10) || '/USD', date_trunc('minute', now()::timestamp) - (i / 10) * interval '1 minute', 1, 1.1, 0.9, 1
+FROM generate_series(0, %(candles)s - 1) AS i;
+"""
+
+QUERIES = {
+    "sea life window": (f"""
+        SELECT transaction_hash, block_time, trade_type, post_balance
+        FROM {SCHEMA}.validator
+        WHERE token_mint = %(token)s AND block_time >= %(since_2m)s
+    """),
+    "trades by minute": (f"""
+        SELECT DATE_TRUNC('minute', detected_time) as minute, trade_type, COUNT(*) as count,
+               SUM(amount) as total_amount, classification
+        FROM {SCHEMA}.whale_detector
+        WHERE token = %(token)s AND detected_time >= %(since_15m)s
+        GROUP BY DATE_TRUNC('minute', detected_time), trade_type, classification
+        ORDER BY minute DESC
+    """),
+    "latest whale": (f"""
+        SELECT whale_wallet, token, trade_type, classification, amount, detected_time
+        FROM {SCHEMA}.whale_detector
+        WHERE token = %(token)s AND detected_time >= %(since_15m)s
+        AND classification IN ('🐋', '🐳', '🦈') AND trade_type IN ('buy', 'sell')
+        ORDER BY detected_time DESC
+        LIMIT 1
+    """),
+    "candles 15m": (f"""
+        SELECT id, token_pair, timestamp, open, high, low, close, ma_10, ma_50, doji_type
+        FROM {SCHEMA}.candles
+        WHERE token_pair = %(pair)s AND timestamp >= %(since_15m)s
+        ORDER BY timestamp DESC
+    """),
+}
+
+def report(name, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:<18} mean {statistics.mean(samples) * 1000:9.3f}ms  p50 {statistics.median(samples) * 1000:9.3f}ms  p99 {p99 * 1000:9.3f}ms")
+
+def run_queries(conn, repeats):
+    now = datetime.now()
+    params = {"token": "TOKEN3", "pair": "TOKEN3/USD", "since_2m": now - timedelta(minutes=2), "since_15m": now - timedelta(minutes=15)}
+    for name, query in QUERIES.items():
+        samples = []
+        with conn.cursor() as cur:
+            for _ in range(repeats):
+                started = time.perf_counter()
+                cur.execute(query, params)
+                cur.fetchall()
+                samples.append(time.perf_counter() - started)
+        conn.commit()
+        report(name, samples)
+
+def analyze(conn):
+    with conn.cursor() as cur:
+        for table in ("validator", "whale_detector", "candles"):
+            cur.execute(f"ANALYZE {SCHEMA}.{table}")
+    conn.commit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_PARAMS)
+    try:
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.execute(SETUP_SQL)
+            cur.execute(FILL_SQL, {"n": args.rows, "step": args.days * 86400 / args.rows, "candles": args.rows // 10})
+        conn.commit()
+        analyze(conn)
+        print(f"{args.rows} validator/whale_detector rows over {args.days} days built in {time.perf_counter() - started:.1f}s")
+
+        print("\nplain heaps:")
+        run_queries(conn, args.repeats)
+
+        for spec in partitions.TABLES:
+            # Keep every generated day so both runs query the same data
+            spec.retention_days = args.days + 1
+            partitions.migrate(conn, spec, SCHEMA)
+        analyze(conn)
+
+        print("\ndaily partitions:")
+        run_queries(conn, args.repeats)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import patterns
+
+# Pattern detection over a synthetic year of 1-minute candles: the vectorized patterns module
+# versus the per-row scalar Doji check price.py used, the pandas engulfing code from
+# price_analyzer.py (if pandas is installed), and the per-candle incremental path.
+#
+#   python bench/pattern_bench.py --candles 525600
+
+def synthetic_candles(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 1.0 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.roll(close, 1)
+    open_[0] = close[0]
+    # Some candles barely move so the Doji rules actually fire
+    flat = rng.random(n) < 0.1
+    close = np.where(flat, open_ * (1 + rng.normal(0, 0.0002, n)), close)
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.002, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.002, n)))
+    return open_, high, low, close
+
+def scalar_doji_type(o, h, l, c, po=None, pc=None, threshold=patterns.DOJI_THRESHOLD):
+    # price.detect_doji_type before the patterns module
+    body = abs(o - c)
+    rng = h - l
+    if rng == 0:
+        return 'None'
+    if body / c < threshold and body / rng < 0.1 and abs(h - max(o, c)) > body and abs(min(o, c) - l) > body:
+        if po is None:
+            return 'Neutral Doji'
+        return 'Bull Doji' if pc < po else 'Bear Doji' if pc > po else 'Neutral Doji'
+    return 'None'
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candles", type=int, default=365 * 24 * 60)
+    args = parser.parse_args()
+
+    o, h, l, c = synthetic_candles(args.candles)
+    n = len(o)
+    print(f"{n} synthetic 1-minute candles")
+
+    def scalar():
+        ol, hl, ll, cl = o.tolist(), h.tolist(), l.tolist(), c.tolist()
+        return [scalar_doji_type(ol[i], hl[i], ll[i], cl[i], ol[i - 1] if i else None, cl[i - 1] if i else None) for i in range(n)]
+
+    t_scalar, scalar_types = timed(scalar)
+    t_codes, codes = timed(lambda: patterns.doji_codes(o, h, l, c))
+    assert list(patterns.DOJI_NAMES[codes]) == scalar_types, "vectorized Doji differs from the scalar rule"
+    t_all, masks = timed(lambda: patterns.detect_all(o, h, l, c))
+    print(f"scalar doji_type loop:      {t_scalar:8.3f}s")
+    print(f"vectorized doji_codes:      {t_codes:8.3f}s ({t_scalar / t_codes:.0f}x)")
+    print(f"vectorized all {len(masks)} patterns: {t_all:8.3f}s")
+    for name, mask in masks.items():
+        print(f"  {name:<18} {int(mask.sum()):>8}")
+
+    try:
+        import pandas as pd
+        df = pd.DataFrame({'open': o, 'high': h, 'low': l, 'close': c})
+
+        def pandas_engulfing():
+            bull = ((df['close'] > df['open']) & (df['close'].shift(1) < df['open'].shift(1)) &
+                    (df['open'] < df['close'].shift(1)) & (df['close'] > df['open'].shift(1))).fillna(False)
+            bear = ((df['close'] < df['open']) & (df['close'].shift(1) > df['open'].shift(1)) &
+                    (df['open'] > df['close'].shift(1)) & (df['close'] < df['open'].shift(1))).fillna(False)
+            return bull.to_numpy(), bear.to_numpy()
+
+        t_pandas, (bull, bear) = timed(pandas_engulfing)
+        t_np, (nbull, nbear) = timed(lambda: (patterns.bullish_engulfing(o, h, l, c), patterns.bearish_engulfing(o, h, l, c)))
+        assert (bull == nbull).all() and (bear == nbear).all(), "engulfing differs from price_analyzer.py"
+        print(f"pandas engulfing:           {t_pandas:8.3f}s")
+        print(f"numpy engulfing:            {t_np:8.3f}s ({t_pandas / t_np:.1f}x)")
+    except ImportError:
+        print("pandas not installed, skipping the price_analyzer.py comparison")
+
+    window = 10000
+    t_last, _ = timed(lambda: [patterns.classify_last(o[:i], h[:i], l[:i], c[:i]) for i in range(2, window + 2)])
+    print(f"classify_last per candle:   {t_last / window * 1e6:8.1f}us")
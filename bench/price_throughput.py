@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pool_reserves import PoolReserveReader
+from mock_rpc import MockRpcServer, POOL_ADDRESS
+
+# Samples/second of the old ts-node get_price.ts path versus the pool reserve decoder.
+# Defaults to the local mock RPC; pass --rpc/--pool to measure against a real endpoint.
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def bench_decoder(rpc_url, pool, seconds):
+    reader = PoolReserveReader(rpc_url, pool)
+    reader.load_keys()
+    samples = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        if reader.sample() > 0:
+            samples += 1
+    return samples / (time.perf_counter() - started)
+
+def bench_ts_node(runs):
+    started = time.perf_counter()
+    for _ in range(runs):
+        subprocess.run(["ts-node", os.path.join("raydium", "get_price.ts")], cwd=ROOT, capture_output=True, check=True)
+    return runs / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rpc", help="RPC URL (default: local mock)")
+    parser.add_argument("--pool", default=POOL_ADDRESS)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.0, help="mock RPC latency per request (s)")
+    parser.add_argument("--ts-node-runs", type=int, default=3)
+    args = parser.parse_args()
+
+    rpc_url = args.rpc
+    if not rpc_url:
+        rpc_url = MockRpcServer(latency=args.latency).start().url
+
+    print(f"old loop (4s UPDATE_INTERVAL): ceiling {1 / 4:.2f} samples/s")
+    if shutil.which("ts-node") and args.rpc:
+        print(f"ts-node get_price.ts back-to-back: {bench_ts_node(args.ts_node_runs):.2f} samples/s")
+    else:
+        print("ts-node get_price.ts: skipped (needs ts-node and a real --rpc)")
+    print(f"pool reserve decoder back-to-back: {bench_decoder(rpc_url, args.pool, args.seconds):.1f} samples/s")
+
+if __name__ == "__main__":
+    main()
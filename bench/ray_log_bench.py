@@ -0,0 +1,75 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ray_log import RAY_LOG_PREFIX, SwapPool, swap_events, decode_swaps
+from pool_reserves import decode_amm_v4
+from mock_rpc import MockChain, TOKEN_MINT
+
+# Trade extraction cost per transaction on a corpus of getTransaction results: the old
+# balance-diff path (keyword scan of every log line, TOKEN_MINT in str(tx), per-wallet
+# pre/post token balance dicts) against the ray_log decoder, per transaction and vectorised.
+# Without --corpus the corpus is the mock RPC's swap history; --record writes it out as JSONL
+# (one getTransaction result per line) and --corpus replays such a file.
+#
+#   python bench/ray_log_bench.py --transactions 20000
+
+KEYWORDS = ["Swap", "ray_log", "Transfer", "TransferChecked", "Burn", "Mint"]
+
+def balance_diff(tx, mint):
+    """sig_loop.process_transaction's extraction before the decoder, without the prints."""
+    meta = tx["meta"]
+    logs = meta.get("logMessages", [])
+    if not (any(any(k in log for k in KEYWORDS) for log in logs) or mint in str(tx)):
+        return []
+    keys = tx["transaction"]["message"]["accountKeys"]
+    wallets = {}
+    for side, balances in (("pre", meta.get("preTokenBalances", [])), ("post", meta.get("postTokenBalances", []))):
+        for b in balances:
+            if b.get("mint") == mint:
+                wallets.setdefault(keys[b["accountIndex"]], {"pre": 0, "post": 0})[side] = b["uiTokenAmount"]["uiAmount"] or 0
+    return [("buy" if v["post"] > v["pre"] else "sell", abs(v["post"] - v["pre"])) for v in wallets.values() if v["post"] != v["pre"]]
+
+def ray_log_trades(tx, pool):
+    return [pool.trade(event)[:2] for event in swap_events(tx["meta"].get("logMessages", []))]
+
+def timed(label, count, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22} {count / elapsed:12,.0f} tx/s  {elapsed / count * 1e6:7.2f} us/tx")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=20_000)
+    parser.add_argument("--corpus", help="JSONL of recorded getTransaction results")
+    parser.add_argument("--record", help="write the synthetic corpus to this JSONL file")
+    parser.add_argument("--mint", default=TOKEN_MINT)
+    args = parser.parse_args()
+
+    chain = MockChain(history_size=args.transactions)
+    if args.corpus:
+        with open(args.corpus) as f:
+            corpus = [json.loads(line) for line in f if line.strip()]
+    else:
+        corpus = [chain.history_transaction(i) for i in range(args.transactions)]
+    if args.record:
+        with open(args.record, "w") as f:
+            for tx in corpus:
+                f.write(json.dumps(tx) + "\n")
+    pool = SwapPool(decode_amm_v4(chain.amm), args.mint)
+    n = len(corpus)
+    print(f"{n} transactions")
+
+    old = timed("balance diff", n, lambda: [balance_diff(tx, args.mint) for tx in corpus])
+    new = timed("ray_log per tx", n, lambda: [ray_log_trades(tx, pool) for tx in corpus])
+    payloads = [log[len(RAY_LOG_PREFIX):] for tx in corpus for log in tx["meta"].get("logMessages", []) if log.startswith(RAY_LOG_PREFIX)]
+    batch = timed("ray_log NumPy batch", n, lambda: decode_swaps(payloads))
+
+    # Both paths should agree on direction and (to display precision) size
+    mismatches = sum(1 for a, b in zip(old, new) if len(a) != len(b) or any(x[0] != y[0] or abs(x[1] - y[1]) > 1e-6 for x, y in zip(a, b)))
+    print(f"mismatches between balance diff and ray_log: {mismatches}, swaps in batch: {len(batch['index'])}")
@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+import base64
+import random
+import asyncio
+import argparse
+import websockets
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pool_reserves import PoolReserveReader, WSOL_MINT
+from mock_rpc import MockRpcServer, MockChain, POOL_ADDRESS, BASE_VAULT, QUOTE_VAULT, TOKEN_MINT, encode_token_account
+
+# Stand-in Solana websocket endpoint that replays recorded accountNotification messages, so the
+# accountSubscribe price path in price.py can run offline.
+#
+# Recording format (JSONL): {"account": <address>, "delay": <seconds since previous>, "slot": n, "data": <base64>}
+#
+#   python bench/replay_ws.py record --ws wss://... --rpc https://... --pool <pair_address> --out rec.jsonl
+#   python bench/replay_ws.py synthesize --out bench/data/pool_notifications.jsonl
+#   python bench/replay_ws.py serve --recording bench/data/pool_notifications.jsonl
+#
+# In serve mode a mock JSON-RPC server is started too (for the initial getMultipleAccounts seed).
+
+DEFAULT_RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pool_notifications.jsonl")
+
+def load_recording(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+async def record(ws_url, rpc_url, pool, out, seconds):
+    amm = PoolReserveReader(rpc_url, pool).load_keys()
+    accounts = [pool, amm["base_vault"], amm["quote_vault"]]
+    async with websockets.connect(ws_url) as ws:
+        for i, address in enumerate(accounts, start=1):
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": i, "method": "accountSubscribe",
+                                      "params": [address, {"encoding": "base64", "commitment": "confirmed"}]}))
+        subscriptions = {}
+        last = time.time()
+        deadline = last + seconds
+        with open(out, "w") as f:
+            while time.time() < deadline:
+                try:
+                    msg = json.loads(await asyncio.wait_for(ws.recv(), timeout=deadline - time.time()))
+                except asyncio.TimeoutError:
+                    break
+                if "id" in msg:
+                    subscriptions[msg["result"]] = accounts[msg["id"] - 1]
+                    continue
+                now = time.time()
+                result = msg["params"]["result"]
+                f.write(json.dumps({"account": subscriptions[msg["params"]["subscription"]], "delay": round(now - last, 4),
+                                    "slot": result["context"]["slot"], "data": result["value"]["data"][0]}) + "\n")
+                last = now
+
+def synthesize(out, count):
+    chain = MockChain()
+    base, quote = chain.base_reserve, chain.quote_reserve
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        for slot in range(1, count + 1):
+            # A swap moves both vaults in opposite directions
+            sol_in = random.randint(-50 * 10**9, 50 * 10**9) // 100
+            tokens_out = sol_in * quote // max(base, 1)
+            base, quote = base + sol_in, quote - tokens_out
+            delay = round(random.expovariate(4), 4)
+            f.write(json.dumps({"account": BASE_VAULT, "delay": delay, "slot": slot,
+                                "data": base64.b64encode(encode_token_account(WSOL_MINT, base)).decode()}) + "\n")
+            f.write(json.dumps({"account": QUOTE_VAULT, "delay": 0.0, "slot": slot,
+                                "data": base64.b64encode(encode_token_account(TOKEN_MINT, quote)).decode()}) + "\n")
+
+async def serve(recording, host, port, speed, loop_forever):
+    entries = load_recording(recording)
+
+    async def handler(ws, path=None):
+        subscriptions = {}
+        next_id = 1
+
+        async def replay():
+            while True:
+                for entry in entries:
+                    await asyncio.sleep(entry["delay"] / speed)
+                    sub = subscriptions.get(entry["account"])
+                    if sub is None:
+                        continue
+                    await ws.send(json.dumps({
+                        "jsonrpc": "2.0",
+                        "method": "accountNotification",
+                        "params": {
+                            "subscription": sub,
+                            "result": {"context": {"slot": entry["slot"]},
+                                       "value": {"data": [entry["data"], "base64"], "owner": "", "lamports": 0, "executable": False}}
+                        }
+                    }))
+                if not loop_forever:
+                    return
+
+        replay_task = None
+        try:
+            async for message in ws:
+                msg = json.loads(message)
+                if msg.get("method") == "accountSubscribe":
+                    subscriptions[msg["params"][0]] = next_id
+                    await ws.send(json.dumps({"jsonrpc": "2.0", "id": msg["id"], "result": next_id}))
+                    next_id += 1
+                    if replay_task is None:
+                        replay_task = asyncio.create_task(replay())
+                else:
+                    await ws.send(json.dumps({"jsonrpc": "2.0", "id": msg.get("id"), "error": {"code": -32601, "message": "Method not found"}}))
+        finally:
+            if replay_task:
+                replay_task.cancel()
+
+    async with websockets.serve(handler, host, port):
+        await asyncio.Future()
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="mode", required=True)
+    rec = sub.add_parser("record")
+    rec.add_argument("--ws", required=True)
+    rec.add_argument("--rpc", required=True)
+    rec.add_argument("--pool", required=True)
+    rec.add_argument("--out", default=DEFAULT_RECORDING)
+    rec.add_argument("--seconds", type=float, default=60)
+    syn = sub.add_parser("synthesize")
+    syn.add_argument("--out", default=DEFAULT_RECORDING)
+    syn.add_argument("--count", type=int, default=200)
+    srv = sub.add_parser("serve")
+    srv.add_argument("--recording", default=DEFAULT_RECORDING)
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8900)
+    srv.add_argument("--rpc-port", type=int, default=8899)
+    srv.add_argument("--speed", type=float, default=1.0)
+    srv.add_argument("--once", action="store_true", help="stop after one pass over the recording")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        asyncio.run(record(args.ws, args.rpc, args.pool, args.out, args.seconds))
+    elif args.mode == "synthesize":
+        synthesize(args.out, args.count)
+    else:
+        rpc = MockRpcServer(port=args.rpc_port).start()
+        print(f"Replaying {args.recording} on ws://{args.host}:{args.port} (mock RPC {rpc.url}, pool {POOL_ADDRESS})")
+        asyncio.run(serve(args.recording, args.host, args.port, args.speed, not args.once))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rpc_router import RpcRouter, Endpoint, RpcError
+from mock_rpc import MockRpcServer, WALLET_ADDRESS
+
+# Exercises rpc_router against three local fake RPC endpoints: a fast one with a slow tail,
+# a steady slower one, and one that rate-limits. Runs getBalance calls plain and hedged,
+# with and without an outage, and reports latency percentiles, failures
+# and where the calls went. The outage run takes down whichever endpoint is preferred at the
+# halfway point.
+#
+#   python bench/rpc_failover.py --calls 400
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct))] * 1000
+
+def run(router, calls, hedge, servers=None):
+    samples, failures, outage = [], 0, None
+    for i in range(calls):
+        if servers is not None and i == calls // 2:
+            outage = servers[router.best().name]
+            outage.down = True
+            print(f"    taking {router.best().name} down after {i} calls")
+        started = time.perf_counter()
+        try:
+            router.call("getBalance", [WALLET_ADDRESS], hedge=hedge)
+            samples.append(time.perf_counter() - started)
+        except RpcError:
+            failures += 1
+    if outage is not None:
+        outage.down = False
+    return samples, failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=400)
+    args = parser.parse_args()
+
+    servers = {
+        "fast": MockRpcServer(latency=0.005, slow_rate=0.1, slow_latency=0.25).start(),
+        "steady": MockRpcServer(latency=0.02).start(),
+        "limited": MockRpcServer(latency=0.004, rate_limit_rate=0.3).start(),
+    }
+
+    def fresh_router():
+        return RpcRouter([Endpoint(s.url, rate=200.0, name=name) for name, s in servers.items()])
+
+    for label, hedge, outage in (("plain", False, False), ("hedged", True, False), ("plain + outage", False, True), ("hedged + outage", True, True)):
+        router = fresh_router()
+        samples, failures = run(router, args.calls, hedge, servers if outage else None)
+        print(f"{label:<16} p50 {percentile(samples, 0.5):7.1f}ms  p99 {percentile(samples, 0.99):7.1f}ms  "
+              f"failures {failures}  hedges {router.hedges}")
+        for name, stats in router.stats_snapshot()["endpoints"].items():
+            print(f"    {name:<8} {stats}")
+    for server in servers.values():
+        server.shutdown()
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from solana_rpc import SolanaRpc
+from mock_rpc import MockRpcServer, POOL_ADDRESS
+
+# Transactions fetched per second for a signature backlog (10k by default) against the local
+# mock RPC: the old ingester pattern (a new aiohttp session per getTransaction, one call at a
+# time), the shared client making single calls, and the shared client with batch arrays.
+# Signatures are paged in with getSignaturesForAddress first, as an ingester would.
+#
+#   python bench/sig_backlog.py --signatures 10000 --latency 0.002
+
+async def per_call_session(url, signatures):
+    # What sig_loop.fetch_transaction_details did before the shared client
+    fetched = 0
+    for signature in signatures:
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "getTransaction",
+                   "params": [signature, {"encoding": "json", "maxSupportedTransactionVersion": 0}]}
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json=payload) as resp:
+                fetched += (await resp.json()).get("result") is not None
+    return fetched
+
+async def shared_single(client, signatures):
+    results = await asyncio.gather(*(client.get_transaction(sig) for sig in signatures), return_exceptions=True)
+    return sum(r is not None and not isinstance(r, Exception) for r in results)
+
+async def shared_batched(client, signatures):
+    return sum(r is not None for r in await client.get_transactions(signatures))
+
+async def page_signatures(client, count):
+    signatures, before = [], None
+    while len(signatures) < count:
+        page = await client.get_signatures(POOL_ADDRESS, min(1000, count - len(signatures)), before=before)
+        if not page:
+            break
+        signatures.extend(s["signature"] for s in page)
+        before = page[-1]["signature"]
+    return signatures
+
+async def main(args):
+    server = MockRpcServer(latency=args.latency, rate_limit_rate=args.rate_limit_rate).start()
+    client = SolanaRpc(server.url, rate=args.rate, batch_size=args.batch_size, connections=args.connections)
+    started = time.perf_counter()
+    signatures = await page_signatures(client, args.signatures)
+    print(f"paged {len(signatures)} signatures in {time.perf_counter() - started:.2f}s")
+
+    baseline = signatures[:args.baseline]
+    runs = (
+        ("per-call session", lambda: per_call_session(server.url, baseline), len(baseline)),
+        ("shared, single", lambda: shared_single(client, signatures), len(signatures)),
+        ("shared, batched", lambda: shared_batched(client, signatures), len(signatures)),
+    )
+    for label, run, count in runs:
+        requests_before = server.requests
+        stats_before = client.stats_snapshot()
+        started = time.perf_counter()
+        fetched = await run()
+        elapsed = time.perf_counter() - started
+        stats = client.stats_snapshot()
+        print(f"{label:<17} {fetched:6d}/{count:<6d} tx in {elapsed:6.2f}s  {fetched / elapsed:8.0f} tx/s  "
+              f"http requests {server.requests - requests_before:6d}  "
+              f"retries {stats['retries'] - stats_before['retries']}")
+    await client.close()
+    server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--signatures", type=int, default=10_000)
+    parser.add_argument("--baseline", type=int, default=1_000, help="signatures for the slow per-call-session run")
+    parser.add_argument("--latency", type=float, default=0.002, help="mock RPC latency per HTTP request")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--rate", type=float, default=100_000.0, help="client token-bucket rate (calls/s)")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
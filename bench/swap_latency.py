@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import json
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from swap_worker import SwapWorker
+
+# Compares per-swap overhead of the old path (fresh ts-node process per trade: TS compile,
+# Raydium.load, pool fetch) against a warm swap_worker.ts. Uses the "quote" op, which runs the
+# same pool fetch + transaction build as a real swap but never signs or sends.
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "raydium", "swap_worker.ts")
+CONSTANTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "target_constants.json")
+
+def summarize(name, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:>6}: n={len(samples)} mean={statistics.mean(samples):8.1f}ms p50={statistics.median(samples):8.1f}ms p95={p95:8.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="cold-start runs (each spawns ts-node)")
+    parser.add_argument("--warm-runs", type=int, default=50)
+    parser.add_argument("--amount", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with open(CONSTANTS) as f:
+        mint = json.load(f)["target_token"]["mint_address"]
+
+    cold = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        worker = SwapWorker(SCRIPT)
+        result = worker.quote(args.amount, True, mint, 0.005)
+        cold.append((time.perf_counter() - started) * 1000)
+        worker.close()
+        if not result.get("ok"):
+            print(f"cold quote failed: {result.get('error')}")
+
+    worker = SwapWorker(SCRIPT)
+    worker.start()
+    warm = []
+    for _ in range(args.warm_runs):
+        started = time.perf_counter()
+        result = worker.quote(args.amount, True, mint, 0.005)
+        warm.append((time.perf_counter() - started) * 1000)
+        if not result.get("ok"):
+            print(f"warm quote failed: {result.get('error')}")
+    worker.close()
+
+    summarize("cold", cold)
+    summarize("warm", warm)
+    print(f"speedup (p50): {statistics.median(cold) / statistics.median(warm):.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from candles import CandleBuilder, TickCheckpoint
+
+# Per-tick cost of the old price.json round-trip (load + append + dump, then cleanup load + dump,
+# all with indent=4) versus the incremental candles + JSONL checkpoint,
+# as the retained history grows.
+#
+#   python bench/tick_cost.py --history 0 900 1800 7200 14400 --ticks 200
+
+def legacy_tick(path, ticker, price, ts):
+    # What save_price_to_json + cleanup_price_json did on every tick
+    with open(path, 'r') as f:
+        price_data = json.load(f)
+    key = datetime.datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d %H:%M:00")
+    price_data.setdefault(key, []).append({
+        "token_pair": f"{ticker}/USD",
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts)),
+        "price": price
+    })
+    with open(path, 'w') as f:
+        json.dump(price_data, f, indent=4)
+    with open(path, 'r') as f:
+        price_data = json.load(f)
+    cutoff = datetime.datetime.utcfromtimestamp(ts - 7200).strftime("%Y-%m-%d %H:%M:00")
+    price_data = {k: v for k, v in price_data.items() if k >= cutoff}
+    with open(path, 'w') as f:
+        json.dump(price_data, f, indent=4)
+
+def seed_legacy(path, history, start):
+    price_data = {}
+    for i in range(history):
+        ts = start + i
+        key = datetime.datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d %H:%M:00")
+        price_data.setdefault(key, []).append({"token_pair": "BENCH/USD", "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts)), "price": 1.0})
+    with open(path, 'w') as f:
+        json.dump(price_data, f, indent=4)
+
+def run(history, ticks, checkpoint_interval):
+    start = time.time() - history
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "price.json")
+        seed_legacy(legacy_path, history, start)
+        began = time.perf_counter()
+        for i in range(ticks):
+            legacy_tick(legacy_path, "BENCH", random.uniform(0.9, 1.1), start + history + i)
+        legacy = (time.perf_counter() - began) / ticks
+
+        builder = CandleBuilder([1, 60])
+        checkpoint = TickCheckpoint(os.path.join(tmp, "price_ticks.jsonl"), checkpoint_interval, 7200)
+        for i in range(history):
+            builder.add_tick(start + i, 1.0)
+        began = time.perf_counter()
+        for i in range(ticks):
+            ts, price = start + history + i, random.uniform(0.9, 1.1)
+            checkpoint.record("BENCH/USD", ts, price)
+            builder.add_tick(ts, price)
+        checkpoint.flush()
+        incremental = (time.perf_counter() - began) / ticks
+    return legacy, incremental
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, nargs="+", default=[0, 900, 1800, 7200, 14400], help="retained ticks before measuring")
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--checkpoint-interval", type=float, default=30)
+    args = parser.parse_args()
+    print(f"{'history':>8} {'price.json us/tick':>20} {'candles us/tick':>16} {'speedup':>9}")
+    for history in args.history:
+        legacy, incremental = run(history, args.ticks, args.checkpoint_interval)
+        print(f"{history:>8} {legacy * 1e6:>20.1f} {incremental * 1e6:>16.2f} {legacy / incremental:>8.0f}x")
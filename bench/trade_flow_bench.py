@@ -0,0 +1,173 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import datetime, timedelta
+import pandas as pd
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from db_pool import DB_PARAMS
+import trade_flow
+
+# Cost of one /data trade refresh for a busy token (--per-minute trades a minute over the last
+# --hours, default 2000/min for 2h) plus background tokens: the old GROUP BY over whale_detector
+# with the pandas re-grouping, against the trade_flow_1m read with summarize_trade_flow. Also
+# times 1000-row merges into whale_detector with and without the rollup triggers. Runs in a
+# scratch schema that is dropped at the end. Needs archon_data.
+#
+#   PG_PASSWORD=... python bench/trade_flow_bench.py --per-minute 2000 --hours 2
+
+SCHEMA = "archon_bench"
+TOKEN = "BUSY"
+
+SETUP_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE TABLE {SCHEMA}.whale_detector (
+    whale_wallet text NOT NULL,
+    detected_time timestamp without time zone NOT NULL,
+    amount numeric,
+    token text,
+    trade_type text,
+    classification text,
+    archon_notes text,
+    transaction_hash text NOT NULL,
+    CONSTRAINT whale_detector_pkey PRIMARY KEY (transaction_hash, detected_time)
+);
+CREATE INDEX idx_whale_detector_token_time ON {SCHEMA}.whale_detector USING btree (token, detected_time);
+"""
+
+# The busy token gets `per_minute` trades a minute; ten quiet tokens a tenth of that between them
+FILL_SQL = f"""
+INSERT INTO {SCHEMA}.whale_detector (whale_wallet, detected_time, amount, token, trade_type, classification, transaction_hash)
+SELECT 'wallet' || (i %% 5000), now()::timestamp - (%(n)s - i) * %(step)s * interval '1 second',
+       (random() - 0.5) * 2e9, CASE WHEN i %% 11 < 10 THEN %(token)s ELSE 'QUIET' || (i %% 10) END,
+       (ARRAY['buy', 'sell', 'hold'])[1 + i %% 3], (ARRAY['🐋', '🦈', '🐟', '🐙', '🦀', '🦐', '🐚'])[1 + i %% 7],
+       %(salt)s || md5(i::text)
+FROM generate_series(1, %(n)s) AS i
+"""
+
+OLD_SQL = f"""
+SELECT DATE_TRUNC('minute', detected_time) as minute, trade_type, COUNT(*) as count,
+       SUM(amount) as total_amount, classification
+FROM {SCHEMA}.whale_detector
+WHERE token = %s AND detected_time >= %s
+GROUP BY DATE_TRUNC('minute', detected_time), trade_type, classification
+ORDER BY minute DESC
+"""
+
+NEW_SQL = f"""
+SELECT minute, trade_type, trades as count, volume as total_amount, classification
+FROM {SCHEMA}.trade_flow_1m
+WHERE token = %s AND minute >= DATE_TRUNC('minute', %s::timestamp)
+ORDER BY minute DESC
+"""
+
+def old_summary(rows):
+    """fetch_recent_trades' aggregation before trade_flow_1m."""
+    buys = sells = holds = 0
+    classifications = {}
+    total_volume = 0.0
+    trade_trend = []
+    if rows:
+        df_trades = pd.DataFrame(rows)
+        for minute, group in df_trades.groupby('minute'):
+            trade_trend.append({
+                "minute": minute.isoformat(),
+                "buys": int(group[group['trade_type'] == 'buy']['count'].sum()),
+                "sells": int(group[group['trade_type'] == 'sell']['count'].sum()),
+                "holds": int(group[group['trade_type'] == 'hold']['count'].sum())
+            })
+        for row in rows:
+            count = row['count']
+            amount = float(row['total_amount']) / 1_000_000_000
+            if row['trade_type'] == 'buy':
+                buys += count
+                total_volume += amount
+            elif row['trade_type'] == 'sell':
+                sells += count
+                total_volume += amount
+            elif row['trade_type'] == 'hold':
+                holds += count
+            if row['classification']:
+                classifications[row['classification']] = classifications.get(row['classification'], 0) + count
+    return buys, sells, holds, classifications, total_volume, trade_trend
+
+def report(name, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:<26} mean {statistics.mean(samples) * 1000:9.3f}ms  p50 {statistics.median(samples) * 1000:9.3f}ms  p99 {p99 * 1000:9.3f}ms")
+
+def refresh(conn, sql, summarize, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(sql, (TOKEN, datetime.now() - timedelta(minutes=15)))
+            rows = cur.fetchall()
+        conn.commit()
+        summary = summarize(rows)
+        samples.append(time.perf_counter() - started)
+    return samples, len(rows), summary
+
+def merge_batches(conn, batches, salt):
+    """Upsert `batches` 1000-row batches of new trades the way whale_detector's job does."""
+    samples = []
+    for b in range(batches):
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.execute(
+                FILL_SQL.rstrip() + " ON CONFLICT (transaction_hash, detected_time) DO NOTHING",
+                {"n": 1000, "step": 0.06, "token": TOKEN, "salt": f"{salt}{b}-"}
+            )
+        conn.commit()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--per-minute", type=int, default=2000)
+    parser.add_argument("--hours", type=float, default=2)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--batches", type=int, default=50)
+    args = parser.parse_args()
+
+    minutes = args.hours * 60
+    total = int(args.per_minute * minutes * 1.1)
+    conn = psycopg2.connect(**DB_PARAMS)
+    try:
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.execute(SETUP_SQL)
+            cur.execute(FILL_SQL, {"n": total, "step": minutes * 60 / total, "token": TOKEN, "salt": "h"})
+            cur.execute(f"ANALYZE {SCHEMA}.whale_detector")
+        conn.commit()
+        print(f"{total} whale_detector rows over {args.hours}h built in {time.perf_counter() - started:.1f}s")
+
+        samples = merge_batches(conn, args.batches, "plain")
+        report("merge 1000, no triggers", samples)
+
+        rows = trade_flow.ensure_rollup(conn, SCHEMA)
+        with conn.cursor() as cur:
+            cur.execute(f"ANALYZE {SCHEMA}.trade_flow_1m")
+        conn.commit()
+        print(f"trade_flow_1m rebuilt: {rows} rows")
+
+        samples = merge_batches(conn, args.batches, "rollup")
+        report("merge 1000, rollup", samples)
+
+        old, old_rows, old_result = refresh(conn, OLD_SQL, old_summary, args.repeats)
+        new, new_rows, new_result = refresh(conn, NEW_SQL, trade_flow.summarize_trade_flow, args.repeats)
+        print(f"\n/data refresh for {TOKEN}, last 15 minutes ({old_rows} group rows vs {new_rows} rollup rows):")
+        report("GROUP BY + pandas", old)
+        report("trade_flow_1m", new)
+        # Totals differ only by the rollup's first bucket, which is the whole minute the window starts in
+        print(f"old totals {old_result[:3]}, rollup totals {new_result[:3]}")
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import random
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from db_pool import DB_PARAMS
+from trade_writer import TableSpec, TradeWriter, VALIDATOR
+
+# Rows/second storing synthetic validator trades (100k by default) three ways: one
+# INSERT ... ON CONFLICT per row committed per batch (what the ingesters did), TradeWriter with
+# execute_values pages, and TradeWriter's COPY into a staging table plus one merge. Each run
+# writes into a fresh temp copy of validator, so the real table is untouched; a second pass of
+# the same rows measures the re-upsert (all conflicts, nothing changed). Needs archon_data.
+#
+#   PG_PASSWORD=... python bench/trade_ingest_bench.py --rows 100000 --batch 1000
+
+BENCH_TABLE = "bench_validator"
+
+def synthetic_trades(n, seed=7):
+    rng = random.Random(seed)
+    wallets = [hashlib.sha256(f"wallet{i}".encode()).hexdigest()[:44] for i in range(2000)]
+    start = datetime(2026, 1, 1)
+    return [
+        (hashlib.sha512(f"tx{i}".encode()).hexdigest()[:88], rng.choice(wallets), start + timedelta(milliseconds=400 * i),
+         "JELLY", 0.0, round(rng.lognormvariate(6, 2), 6), rng.choice(("buy", "sell")), "🐟")
+        for i in range(n)
+    ]
+
+def per_row(conn, spec, rows, batch):
+    sql = spec.merge_sql(f"VALUES ({', '.join(['%s'] * len(spec.columns))})")
+    for i in range(0, len(rows), batch):
+        with conn.cursor() as cur:
+            for row in rows[i:i + batch]:
+                cur.execute(sql, row)
+        conn.commit()
+
+def writer_run(method, page_size):
+    def run(conn, spec, rows, batch):
+        writer = TradeWriter(conn, spec, method=method, flush_rows=batch, page_size=page_size)
+        for row in rows:
+            writer.add(row)
+            if len(writer.buffer) >= writer.flush_rows:
+                writer.flush()
+        writer.flush()
+    return run
+
+def reset_table(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        cur.execute(f"CREATE TEMP TABLE {BENCH_TABLE} (LIKE public.validator INCLUDING ALL)")
+    conn.commit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=1000, help="rows per flush/commit")
+    parser.add_argument("--page-size", type=int, default=500, help="execute_values page size")
+    parser.add_argument("--per-row-rows", type=int, default=20_000, help="rows for the slow per-row run")
+    args = parser.parse_args()
+
+    rows = synthetic_trades(args.rows)
+    spec = TableSpec(BENCH_TABLE, VALIDATOR.columns, VALIDATOR.key, bump=VALIDATOR.bump)
+    conn = psycopg2.connect(**DB_PARAMS)
+    runs = (
+        ("per-row INSERT", per_row, rows[:args.per_row_rows]),
+        ("execute_values", writer_run("values", args.page_size), rows),
+        ("COPY + merge", writer_run("copy", args.page_size), rows),
+    )
+    print(f"{args.rows} synthetic trades, {args.batch} rows per flush")
+    for label, run, data in runs:
+        reset_table(conn)
+        for phase in ("insert", "re-upsert"):
+            started = time.perf_counter()
+            run(conn, spec, data, args.batch)
+            elapsed = time.perf_counter() - started
+            print(f"{label:<16} {phase:<10} {len(data):8d} rows in {elapsed:7.2f}s  {len(data) / elapsed:10,.0f} rows/s")
+    conn.close()
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+import psycopg2
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "mev", "data"))
+from db_pool import DB_PARAMS
+import whale_detector
+
+# Full whale_detector backfill over a large synthetic validator table (2M rows by default,
+# 30 days of trades) with the worker counts given, then the old whole-table INSERT ... SELECT
+# run as one statement for comparison, then an incremental pass after 10k new rows. Everything
+# lives in a scratch schema that is dropped at the end; its whale_detector has no NOTIFY
+# trigger, so this measures the classification itself. Needs archon_data.
+#
+#   PG_PASSWORD=... python bench/whale_backfill_bench.py --rows 2000000 --workers 1 4 8
+
+SCHEMA = "archon_bench"
+
+SETUP_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE TABLE {SCHEMA}.validator (
+    transaction_hash text,
+    wallet_address text NOT NULL,
+    block_time timestamp without time zone NOT NULL,
+    token_mint text,
+    pre_balance double precision,
+    post_balance double precision,
+    trade_type text,
+    transaction_emoji text,
+    failed boolean DEFAULT false,
+    CONSTRAINT bench_unique_transaction_hash UNIQUE (transaction_hash)
+);
+CREATE TABLE {SCHEMA}.whale_detector (LIKE public.whale_detector INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES);
+"""
+
+FILL_SQL = f"""
+INSERT INTO {SCHEMA}.validator (transaction_hash, wallet_address, block_time, token_mint, pre_balance, post_balance, trade_type, transaction_emoji)
+SELECT md5(%(salt)s || i::text) || md5(i::text), 'wallet' || (i %% 5000), %(start)s + (i * %(step)s) * interval '1 second',
+       'JELLY', 0.0, exp(random() * 20), CASE WHEN i %% 2 = 0 THEN 'buy' ELSE 'sell' END, '🐟'
+FROM generate_series(%(first)s, %(last)s) AS i
+"""
+
+def fill(conn, first, count, days, total, salt="v"):
+    with conn.cursor() as cur:
+        cur.execute(FILL_SQL, {"salt": salt, "start": datetime(2026, 1, 1), "step": days * 86400 / total, "first": first, "last": first + count - 1})
+    conn.commit()
+
+def truncate_whales(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"TRUNCATE {SCHEMA}.whale_detector; DELETE FROM {SCHEMA}.job_watermark")
+    conn.commit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--chunk-hours", type=float, default=6)
+    args = parser.parse_args()
+
+    whale_detector.db_params.update(DB_PARAMS)
+    conn = psycopg2.connect(**DB_PARAMS)
+    with conn.cursor() as cur:
+        cur.execute(SETUP_SQL)
+    conn.commit()
+    started = time.perf_counter()
+    fill(conn, 0, args.rows, args.days, args.rows)
+    whale_detector.ensure_schema(conn, SCHEMA)
+    with conn.cursor() as cur:
+        cur.execute(f"ANALYZE {SCHEMA}.validator")
+    conn.commit()
+    print(f"{args.rows} synthetic validator rows over {args.days} days built in {time.perf_counter() - started:.1f}s")
+
+    try:
+        for workers in args.workers:
+            truncate_whales(conn)
+            written, elapsed = whale_detector.backfill(conn, workers=workers, chunk=timedelta(hours=args.chunk_hours), schema=SCHEMA)
+            print(f"backfill, {workers:2d} workers   {elapsed:8.2f}s  {args.rows / elapsed:12,.0f} rows/s  {written} written")
+
+        truncate_whales(conn)
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            written = whale_detector.classify_range(cur, "TRUE", {}, SCHEMA)
+        conn.commit()
+        elapsed = time.perf_counter() - started
+        print(f"one statement, 1 worker  {elapsed:8.2f}s  {args.rows / elapsed:12,.0f} rows/s  {written} written")
+
+        # Incremental run after new ingestion: only the new ids are read
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT max(ingest_id) FROM {SCHEMA}.validator")
+            high = cur.fetchone()[0]
+            whale_detector.save_watermark(cur, high, SCHEMA)
+        conn.commit()
+        fill(conn, args.rows, 10_000, args.days, args.rows, salt="n")
+        started = time.perf_counter()
+        written = whale_detector.classify_and_store_critter_transactions(conn, SCHEMA)
+        print(f"incremental, 10000 new   {time.perf_counter() - started:8.2f}s  {written} written")
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
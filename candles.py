@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import logging
+import datetime
+
+# Incremental OHLC candles. Every interval keeps one open OHLC accumulator that is updated in
+# O(1) per tick, and the optional checkpoint file is an append-only JSONL log of recent ticks
+# used only for crash recovery.
+
+CANDLE_KEY_FORMAT = "%Y-%m-%d %H:%M:00"
+CANDLE_INTERVALS = [1, 5, 15, 60, 240]  # minutes
+
+def interval_label(interval_minutes):
+    return f"{interval_minutes // 60}h" if interval_minutes % 60 == 0 else f"{interval_minutes}m"
+
+def candle_token_pair(ticker, interval_minutes):
+    """Pair name used in the candles table: 'JELLY/USD' for 1m, 'JELLY/USD_5m', 'JELLY/USD_1h', ..."""
+    if interval_minutes == 1:
+        return f"{ticker}/USD"
+    return f"{ticker}/USD_{interval_label(interval_minutes)}"
+
+def bucket_start(ts, interval_minutes):
+    seconds = interval_minutes * 60
+    return int(ts) - int(ts) % seconds
+
+def candle_key(start):
+    return datetime.datetime.utcfromtimestamp(start).strftime(CANDLE_KEY_FORMAT)
+
+class OHLC:
+    __slots__ = ("start", "open", "high", "low", "close", "count")
+
+    def __init__(self, start, price):
+        self.start = start
+        self.open = self.high = self.low = self.close = price
+        self.count = 1
+
+    def update(self, price):
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.count += 1
+
+    @property
+    def key(self):
+        return candle_key(self.start)
+
+    def as_dict(self):
+        return {
+            'timestamp': datetime.datetime.utcfromtimestamp(self.start),
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close
+        }
+
+class CandleBuilder:
+    """One open OHLC accumulator per interval, all fed from the same tick stream.
+
+    add_tick() returns the (interval, candle) pairs its tick closed, oldest interval first, and
+    passes the same list to every on_close() listener, so a boundary that closes several
+    intervals at once (e.g. 1m, 5m, 15m and 1h on the hour) arrives as one batch.
+    """
+
+    def __init__(self, intervals_minutes=CANDLE_INTERVALS):
+        self.intervals = sorted(intervals_minutes)
+        self.open = {}
+        self.listeners = []
+
+    def on_close(self, callback):
+        self.listeners.append(callback)
+
+    def current(self, interval_minutes):
+        return self.open.get(interval_minutes)
+
+    def add_tick(self, ts, price):
+        closed = []
+        for interval in self.intervals:
+            start = bucket_start(ts, interval)
+            candle = self.open.get(interval)
+            if candle is None or start > candle.start:
+                if candle is not None:
+                    closed.append((interval, candle))
+                self.open[interval] = OHLC(start, price)
+            else:
+                candle.update(price)
+        if closed:
+            for callback in self.listeners:
+                callback(closed)
+        return closed
+
+class TickCheckpoint:
+    """Append-only JSONL tick log, flushed every `interval` seconds and compacted to `retention`."""
+
+    def __init__(self, path, interval, retention, compact_interval=3600):
+        self.path = path
+        self.interval = interval
+        self.retention = retention
+        self.compact_interval = compact_interval
+        self.pending = []
+        self.last_flush = time.time()
+        self.last_compact = time.time()
+
+    def record(self, token_pair, ts, price):
+        self.pending.append(json.dumps({
+            "token_pair": token_pair,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts)),
+            "ts": ts,
+            "price": price
+        }))
+        if time.time() - self.last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.time()
+        if not self.pending:
+            return
+        try:
+            with open(self.path, 'a') as f:
+                f.write("\n".join(self.pending) + "\n")
+            self.pending = []
+        except OSError as e:
+            logging.error(f"Failed to append price checkpoint {self.path}: {e}")
+        if self.last_flush - self.last_compact >= self.compact_interval:
+            self.compact()
+
+    def load(self):
+        """Ticks still inside the retention window, oldest first; unreadable lines are skipped."""
+        if not os.path.exists(self.path):
+            return []
+        cutoff = time.time() - self.retention
+        ticks = []
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    tick = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if tick.get("ts", 0) >= cutoff and tick.get("price", 0) > 0:
+                    ticks.append(tick)
+        return ticks
+
+    def compact(self):
+        self.last_compact = time.time()
+        try:
+            ticks = self.load()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.writelines(json.dumps(t) + "\n" for t in ticks)
+            os.replace(tmp_path, self.path)
+            logging.debug(f"Compacted {self.path} to {len(ticks)} ticks")
+        except OSError as e:
+            logging.error(f"Failed to compact price checkpoint {self.path}: {e}")
+
+def read_last_tick(path):
+    """Last complete line of a checkpoint file without reading the whole file."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        lines = f.read().splitlines()
+    for line in reversed(lines):
+        try:
+            return json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+    return None
@@ -0,0 +1,26 @@
+--
+-- One-off migration for databases created before archon_schema.sql carried the change feed:
+-- installs the NOTIFY function and triggers that trade_api/api.py LISTENs to. Idempotent; run
+-- it as the schema owner while the ingesters are quiet (the triggers take exclusive locks).
+--
+--   psql -U postgres -d archon_data -f change_feed.sql
+--
+
+CREATE OR REPLACE FUNCTION public.notify_archon_change() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    -- Payload is '<table>:<token>'; identical payloads in one transaction are delivered once
+    IF TG_TABLE_NAME = 'candles' THEN
+        PERFORM pg_notify('archon_changes', TG_TABLE_NAME || ':' || NEW.token_pair);
+    ELSE
+        PERFORM pg_notify('archon_changes', TG_TABLE_NAME || ':' || NEW.token);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS candles_notify_change ON public.candles;
+CREATE TRIGGER candles_notify_change AFTER INSERT OR UPDATE ON public.candles FOR EACH ROW EXECUTE FUNCTION public.notify_archon_change();
+DROP TRIGGER IF EXISTS whale_detector_notify_change ON public.whale_detector;
+CREATE TRIGGER whale_detector_notify_change AFTER INSERT OR UPDATE ON public.whale_detector FOR EACH ROW EXECUTE FUNCTION public.notify_archon_change();
@@ -0,0 +1,190 @@
+import os
+import time
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+# Shared Postgres connection pool: a threaded psycopg2 pool for the bot and the API jobs (their
+# asyncio loops hand DB work to executor threads). Connections are health-checked on checkout
+# after sitting idle, hot queries are PREPAREd once per connection, and the pool keeps
+# counters that stats_snapshot() returns. psycopg2 closes any connection returned above
+# minconn, so the pool is sized fixed (minconn == maxconn) to keep connections and their
+# prepared statements alive.
+
+DB_PARAMS = {
+    "dbname": "archon_data",
+    "user": "postgres",
+    "password": os.getenv("PG_PASSWORD", "#!01$Archon$10!#"),
+    "host": "localhost",
+    "port": "5432"
+}
+POOL_MIN = 8
+POOL_MAX = 8
+POOL_TIMEOUT = 10.0  # seconds to wait for a free connection
+HEALTH_CHECK_IDLE = 30.0  # ping connections idle longer than this before handing them out
+
+class PoolTimeout(Exception):
+    pass
+
+class PoolStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.acquired = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self.health_checks = 0
+        self.discarded = 0
+        self.errors = 0
+        self.prepared = 0
+        self.prepared_executions = 0
+
+    def checkout(self, waited):
+        with self.lock:
+            self.acquired += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def checkin(self):
+        with self.lock:
+            self.in_use -= 1
+
+    def incr(self, name, n=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "acquired": self.acquired,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "avg_wait_ms": round(self.wait_time / self.acquired * 1000, 3) if self.acquired else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "timeouts": self.timeouts,
+                "health_checks": self.health_checks,
+                "discarded": self.discarded,
+                "errors": self.errors,
+                "prepared": self.prepared,
+                "prepared_executions": self.prepared_executions
+            }
+
+class ConnectionPool:
+    """Threaded psycopg2 pool.
+
+    `statements` maps a name to SQL using $1, $2... placeholders; execute_prepared() PREPAREs
+    it the first time a connection runs it and EXECUTEs it afterwards.
+    """
+
+    def __init__(self, minconn=POOL_MIN, maxconn=POOL_MAX, statements=None, timeout=POOL_TIMEOUT, **params):
+        self.params = {**DB_PARAMS, **params}
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.statements = dict(statements or {})
+        self.stats = PoolStats()
+        self._pool = None
+        self._init_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        # Keyed by the connection itself: a closed connection's id() can be reused by a new one
+        self._last_used = weakref.WeakKeyDictionary()  # conn -> time returned to the pool
+        self._prepared = weakref.WeakKeyDictionary()  # conn -> set of prepared statement names
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._init_lock:
+                if self._pool is None:
+                    self._pool = pg_pool.ThreadedConnectionPool(self.minconn, self.maxconn, **self.params)
+                    logging.info(f"🗄️ Database pool ready ({self.minconn}-{self.maxconn} connections to {self.params['dbname']})")
+        return self._pool
+
+    def _discard(self, pool, conn):
+        self._last_used.pop(conn, None)
+        self._prepared.pop(conn, None)
+        self.stats.incr("discarded")
+        pool.putconn(conn, close=True)
+
+    def _checkout(self, pool):
+        for _ in range(2):
+            conn = pool.getconn()
+            idle_since = self._last_used.get(conn)
+            if conn.closed:
+                self._discard(pool, conn)
+                continue
+            if idle_since is not None and time.time() - idle_since > HEALTH_CHECK_IDLE:
+                self.stats.incr("health_checks")
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1")
+                    conn.rollback()
+                except psycopg2.Error:
+                    self._discard(pool, conn)
+                    continue
+            return conn
+        return pool.getconn()
+
+    @contextmanager
+    def connection(self):
+        started = time.time()
+        if not self._slots.acquire(timeout=self.timeout):
+            self.stats.incr("timeouts")
+            raise PoolTimeout(f"No free database connection within {self.timeout}s")
+        pool = None
+        conn = None
+        try:
+            pool = self._get_pool()
+            conn = self._checkout(pool)
+            self.stats.checkout(time.time() - started)
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                self.stats.incr("errors")
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                self.stats.checkin()
+        finally:
+            if conn is not None:
+                if conn.closed:
+                    self._discard(pool, conn)
+                else:
+                    self._last_used[conn] = time.time()
+                    pool.putconn(conn)
+            self._slots.release()
+
+    @contextmanager
+    def cursor(self, cursor_factory=None):
+        with self.connection() as conn:
+            with conn.cursor(cursor_factory=cursor_factory) as cur:
+                yield cur
+
+    def execute_prepared(self, cur, name, params=()):
+        prepared = self._prepared.setdefault(cur.connection, set())
+        if name not in prepared:
+            cur.execute(f"PREPARE {name} AS {self.statements[name]}")
+            prepared.add(name)
+            self.stats.incr("prepared")
+        self.stats.incr("prepared_executions")
+        if params:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cur.execute(f"EXECUTE {name}")
+
+    def stats_snapshot(self):
+        return {"min": self.minconn, "max": self.maxconn, **self.stats.snapshot()}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
+            self._last_used.clear()
+            self._prepared.clear()
@@ -0,0 +1,106 @@
+from collections import deque
+
+# Rolling indicators updated once per closed candle in O(1): fixed-size ring buffers with
+# running sums (SMA, VWAP) and a recursive EMA. State is seeded once from stored candles.
+
+class RollingMean:
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, value):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        self.updates += 1
+        # Re-sum once per window so float error from add/subtract cannot accumulate
+        if self.updates % self.window == 0:
+            self.total = sum(self.values)
+
+    @property
+    def value(self):
+        return self.total / self.window if len(self.values) == self.window else None
+
+class EMA:
+    """Exponential moving average; seeded with the SMA of the first `period` values."""
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.seed = RollingMean(period)
+        self.current = None
+
+    def update(self, value):
+        if self.current is None:
+            self.seed.update(value)
+            self.current = self.seed.value
+        else:
+            self.current += self.alpha * (value - self.current)
+
+    @property
+    def value(self):
+        return self.current
+
+class RollingVWAP:
+    """Volume-weighted average price over the last `window` candles (typical price * volume)."""
+
+    def __init__(self, window):
+        self.window = window
+        self.pv = RollingMean(window)
+        self.volume = RollingMean(window)
+
+    def update(self, price, volume):
+        self.pv.update(price * volume)
+        self.volume.update(volume)
+
+    @property
+    def value(self):
+        if self.volume.value is None or self.volume.value == 0:
+            return None
+        return self.pv.value / self.volume.value
+
+def make_indicator(kind, window):
+    if kind == "sma":
+        return RollingMean(window)
+    if kind == "ema":
+        return EMA(window)
+    if kind == "vwap":
+        return RollingVWAP(window)
+    raise ValueError(f"Unknown indicator: {kind}")
+
+class IndicatorState:
+    """Indicators for one candle series, e.g. {"ma_10": ("sma", 10), "ema_20": ("ema", 20)}.
+
+    snapshot() is read before update() with the new candle, so values cover the candles before
+    it, as the old query for the last stored candles did.
+    """
+
+    def __init__(self, specs):
+        self.specs = dict(specs)
+        self.indicators = {name: make_indicator(kind, window) for name, (kind, window) in self.specs.items()}
+
+    @property
+    def lookback(self):
+        return max(window for _, window in self.specs.values())
+
+    def seed(self, candles):
+        """Replay stored candles (oldest first, dicts with close and optional volume)."""
+        for candle in candles:
+            self.update(candle)
+
+    def update(self, candle):
+        close = float(candle['close'])
+        for name, indicator in self.indicators.items():
+            if isinstance(indicator, RollingVWAP):
+                volume = candle.get('volume')
+                if volume is not None:
+                    typical = (float(candle['high']) + float(candle['low']) + close) / 3
+                    indicator.update(typical, float(volume))
+            else:
+                indicator.update(close)
+
+    def snapshot(self):
+        return {name: indicator.value for name, indicator in self.indicators.items()}
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+
+# Durable resume point for the signature ingesters. Each (consumer, pair) keeps the slot and
+# signature of the newest transaction it has fully stored, written in the same transaction as
+# the trades themselves, so a restart resumes exactly where the last commit left off. The
+# in-memory dedupe set is a bounded LRU: the cursor already stops re-reads across restarts,
+# so it only has to cover signatures seen again within a run.
+
+DEDUPE_SIZE = 50_000  # ~ a day of a busy pair's signatures; memory stays constant
+
+CURSOR_SQL = """
+CREATE TABLE IF NOT EXISTS public.ingest_cursor (
+    consumer text NOT NULL,
+    pair_address text NOT NULL,
+    slot bigint NOT NULL,
+    signature text NOT NULL,
+    updated_at timestamp without time zone DEFAULT now() NOT NULL,
+    PRIMARY KEY (consumer, pair_address)
+);
+"""
+
+class IngestCursor:
+    def __init__(self, conn, consumer, pair_address):
+        self.conn = conn
+        self.consumer = consumer
+        self.pair_address = pair_address
+        self.slot = None
+        self.signature = None
+
+    @staticmethod
+    def ensure_table(conn):
+        with conn.cursor() as cur:
+            cur.execute(CURSOR_SQL)
+        conn.commit()
+
+    def load(self):
+        """(slot, signature) of the last stored transaction for this pair, (None, None) on a first run."""
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "SELECT slot, signature FROM public.ingest_cursor WHERE consumer = %s AND pair_address = %s",
+                (self.consumer, self.pair_address)
+            )
+            row = cur.fetchone()
+        self.conn.commit()
+        self.slot, self.signature = row if row else (None, None)
+        return self.slot, self.signature
+
+    def save(self, cur, slot, signature):
+        """Stage the new position on `cur`; it becomes durable with the caller's commit (then call `moved`)."""
+        cur.execute(
+            """
+            INSERT INTO public.ingest_cursor (consumer, pair_address, slot, signature, updated_at)
+            VALUES (%s, %s, %s, %s, now())
+            ON CONFLICT (consumer, pair_address) DO UPDATE SET
+                slot = EXCLUDED.slot,
+                signature = EXCLUDED.signature,
+                updated_at = EXCLUDED.updated_at
+            """,
+            (self.consumer, self.pair_address, slot, signature)
+        )
+
+    def moved(self, slot, signature):
+        self.slot, self.signature = slot, signature
+
+class RecentSet:
+    """Set of the `maxsize` most recently added or seen keys."""
+
+    def __init__(self, maxsize=DEDUPE_SIZE):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+
+    def __contains__(self, key):
+        if key in self.items:
+            self.items.move_to_end(key)
+            return True
+        return False
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, key):
+        self.items[key] = None
+        self.items.move_to_end(key)
+        if len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
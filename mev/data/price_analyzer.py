@@ -1,8 +1,13 @@
+import os
+import sys
 import pandas as pd
 import psycopg2
 from datetime import datetime
 from decimal import Decimal
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from patterns import ohlc_arrays, simple_doji, bullish_engulfing, bearish_engulfing
+
 TOKEN_PAIR = "BjZKz1z4UMjJPvPfKwTwjPErVBWnewnJFvcZB6minymy"
 
 
@@ -44,30 +49,15 @@ def identify_doji(data, threshold=0.1):
     print(f"Data types: {data.dtypes}")
     
     # Now perform the calculation for Doji
-    data['doji'] = (abs(data['open'] - data['close']) / (data['high'] - data['low']) < threshold)
-    data['doji'] = data['doji'].fillna(False)
+    data['doji'] = simple_doji(*ohlc_arrays(data), body_range=threshold)
     return data
 
 # Function to identify engulfing pattern
 def identify_engulfing(data):
     """Identify bullish and bearish engulfing patterns."""
-    data['bullish_engulfing'] = (
-        (data['close'] > data['open']) &
-        (data['close'].shift(1) < data['open'].shift(1)) &
-        (data['open'] < data['close'].shift(1)) &
-        (data['close'] > data['open'].shift(1))
-    )
-
-    data['bearish_engulfing'] = (
-        (data['close'] < data['open']) &
-        (data['close'].shift(1) > data['open'].shift(1)) &
-        (data['open'] > data['close'].shift(1)) &
-        (data['close'] < data['open'].shift(1))
-    )
-
-    # Ensure no NaN values in boolean columns
-    data['bullish_engulfing'] = data['bullish_engulfing'].fillna(False)
-    data['bearish_engulfing'] = data['bearish_engulfing'].fillna(False)
+    arrays = ohlc_arrays(data)
+    data['bullish_engulfing'] = bullish_engulfing(*arrays)
+    data['bearish_engulfing'] = bearish_engulfing(*arrays)
     return data
 
 # Function to insert data into the database
@@ -1,15 +1,19 @@
 import json
 import time
-import requests
 import psycopg2
 from datetime import datetime, timedelta
 import os
+import sys
 import traceback
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from solana_rpc import SolanaRpc, RpcThread, RpcError
+
 # Constants
 TARGET_CONSTANTS_FILE = "/home/joshua/archon/mev/data/target_constants.json"
 MIN_TRADE_AMOUNT = 0.5
 RPC_URL = "http://localhost:8899"
+RPC_RATE = 200  # local validator, no provider limit
 
 def load_target_constants():
     with open(TARGET_CONSTANTS_FILE, 'r') as f:
@@ -25,6 +29,8 @@ TRADE_OUTPUT_DIR = f"json_data/trades/{TICKER}_trade_loop/"
 SEA_LIFE_FILE = f"json_data/{TICKER}_sea_life.json"
 INTERVAL = 2  # Polling interval in seconds
 
+rpc = RpcThread(SolanaRpc(RPC_URL, rate=RPC_RATE, max_retries=3))
+
 db_params = {
     'dbname': 'archon_data',
     'user': 'postgres',
@@ -34,46 +40,22 @@ db_params = {
 }
 
 def fetch_transaction_details(signature):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getTransaction",
-        "params": [signature, {"encoding": "json", "maxSupportedTransactionVersion": 0}]
-    }
-    retries = 3
-    for attempt in range(retries):
-        try:
-            response = requests.post(RPC_URL, json=payload, headers={"Content-Type": "application/json"})
-            response.raise_for_status()
-            return response.json().get("result")
-        except requests.RequestException as e:
-            if response.status_code == 503:
-                print(f"503 Service Unavailable for {signature}, retrying ({attempt + 1}/{retries})...")
-                time.sleep(0.2 * (2 ** attempt))
-            else:
-                print(f"Error fetching transaction details for {signature}: {e}")
-                return None
-    print(f"Failed to fetch transaction details for {signature} after {retries} retries")
-    return None
+    try:
+        return rpc.get_transaction(signature)
+    except RpcError as e:
+        print(f"Error fetching transaction details for {signature}: {e}")
+        return None
 
 def fetch_recent_signatures():
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getSignaturesForAddress",
-        "params": [TOKEN_MINT, {"limit": 10, "commitment": "finalized"}]
-    }
     try:
-        response = requests.post(RPC_URL, json=payload, headers={"Content-Type": "application/json"})
-        response.raise_for_status()
-        return [sig["signature"] for sig in response.json().get("result", [])]
-    except requests.RequestException as e:
+        return [sig["signature"] for sig in rpc.get_signatures(TOKEN_MINT, 10, commitment="finalized")]
+    except RpcError as e:
         print(f"Error fetching signatures: {e}")
         return []
 
-def process_trade(signature, output_file, trade_output_dir):
+def process_trade(signature, output_file, trade_output_dir, full_tx=None):
     global TICKER, TOKEN_MINT
-    full_tx = fetch_transaction_details(signature)
+    full_tx = full_tx or fetch_transaction_details(signature)
     if not full_tx:
         print(f"Failed to fetch transaction details for {signature}")
         return None
@@ -197,9 +179,8 @@ def validate_trades(trades, conn):
                     """
                     INSERT INTO validator (transaction_hash, wallet_address, block_time, token_mint, pre_balance, post_balance, trade_type, transaction_emoji)
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (transaction_hash) DO UPDATE SET
+                    ON CONFLICT (transaction_hash, block_time) DO UPDATE SET
                         wallet_address = EXCLUDED.wallet_address,
-                        block_time = EXCLUDED.block_time,
                         token_mint = EXCLUDED.token_mint,
                         pre_balance = EXCLUDED.pre_balance,
                         post_balance = EXCLUDED.post_balance,
@@ -262,9 +243,8 @@ class SeaLifeProcessor:
                         """
                         INSERT INTO whale_detector (whale_wallet, detected_time, amount, token, trade_type, classification, transaction_hash)
                         VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (transaction_hash) DO UPDATE SET
+                        ON CONFLICT (transaction_hash, detected_time) DO UPDATE SET
                             whale_wallet = EXCLUDED.whale_wallet,
-                            detected_time = EXCLUDED.detected_time,
                             amount = EXCLUDED.amount,
                             token = EXCLUDED.token,
                             trade_type = EXCLUDED.trade_type,
@@ -326,8 +306,14 @@ def main_loop(token_address, output_file, trade_output_dir, interval=2):
             if new_signatures:
                 print(f"Found {len(new_signatures)} new signatures: {new_signatures}")
                 all_trades = []
+                # One batch round-trip for all new signatures; process_trade refetches any that came back empty
+                try:
+                    details = dict(zip(new_signatures, rpc.get_transactions(list(new_signatures))))
+                except RpcError as e:
+                    print(f"Error fetching transaction batch: {e}")
+                    details = {}
                 for signature in new_signatures:
-                    trades = process_trade(signature, output_file, trade_output_dir)
+                    trades = process_trade(signature, output_file, trade_output_dir, details.get(signature))
                     if trades:
                         all_trades.extend(trades)
                 if all_trades:
@@ -246,9 +246,8 @@ async def validate_trades(validator_queue, conn):
                             """
                             INSERT INTO validator (transaction_hash, wallet_address, block_time, token_mint, pre_balance, post_balance, trade_type, transaction_emoji)
                             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (transaction_hash) DO UPDATE SET
+                            ON CONFLICT (transaction_hash, block_time) DO UPDATE SET
                                 wallet_address = EXCLUDED.wallet_address,
-                                block_time = EXCLUDED.block_time,
                                 token_mint = EXCLUDED.token_mint,
                                 pre_balance = EXCLUDED.pre_balance,
                                 post_balance = EXCLUDED.post_balance,
@@ -316,9 +315,8 @@ class SeaLifeProcessor:
                         """
                         INSERT INTO whale_detector (whale_wallet, detected_time, amount, token, trade_type, classification, transaction_hash)
                         VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (transaction_hash) DO UPDATE SET
+                        ON CONFLICT (transaction_hash, detected_time) DO UPDATE SET
                             whale_wallet = EXCLUDED.whale_wallet,
-                            detected_time = EXCLUDED.detected_time,
                             amount = EXCLUDED.amount,
                             token = EXCLUDED.token,
                             trade_type = EXCLUDED.trade_type,
@@ -2,13 +2,20 @@
 import asyncio
 import websockets
 import json
-import aiohttp
+import base64
 import time
 import psycopg2
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
+import sys
 import traceback
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from solana_rpc import SolanaRpc, RpcError
+from ray_log import RAY_LOG_PREFIX, SWAP_LOG_TYPES, swap_events, fetch_pool
+from trade_writer import TradeWriter, VALIDATOR, validator_row
+from sea_life import SeaLifeProcessor
+
 TARGET_CONSTANTS_FILE = "/home/joshua/archon/mev/data/target_constants.json"
 MIN_TRADE_AMOUNT = 0.001
 PROCESS_ID = "sig_loop3"
@@ -39,6 +46,11 @@ TRADE_OUTPUT_DIR = f"json_data/trades/{TICKER}_{PROCESS_ID}_trade_loop/"
 SEA_LIFE_FILE = f"json_data/{TICKER}_{PROCESS_ID}_sea_life.json"
 INTERVAL = 5
 RAYDIUM_PROGRAM = "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8"  # Raydium
+HELIUS_RPC_URL = "https://mainnet.helius-rpc.com/?api-key=18e23183-7cc1-4373-8ccb-26ab8ea875ac"
+HELIUS_WS_URL = "wss://mainnet.helius-rpc.com/?api-key=18e23183-7cc1-4373-8ccb-26ab8ea875ac"
+HELIUS_RPC_RATE = 25
+
+rpc = SolanaRpc(HELIUS_RPC_URL, rate=HELIUS_RPC_RATE, max_retries=3)
 
 db_params = {
     'dbname': 'archon_data',
@@ -49,34 +61,70 @@ db_params = {
 }
 
 async def fetch_transaction_details(signature):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getTransaction",
-        "params": [signature, {"encoding": "json", "maxSupportedTransactionVersion": 0}]
-    }
-    retries = 3
-    async with aiohttp.ClientSession() as session:
-        for attempt in range(retries):
-            try:
-                async with session.post("https://mainnet.helius-rpc.com/?api-key=18e23183-7cc1-4373-8ccb-26ab8ea875ac", 
-                                      json=payload, headers={"Content-Type": "application/json"}) as response:
-                    response.raise_for_status()
-                    return (await response.json()).get("result")
-            except aiohttp.ClientError as e:
-                if response.status == 503:
-                    print(f"[{PROCESS_ID}] 503 for {signature}, retrying ({attempt + 1}/{retries})...")
-                    await asyncio.sleep(0.2 * (2 ** attempt))
-                else:
-                    print(f"[{PROCESS_ID}] Error fetching {signature}: {e}")
-                    return None
-        print(f"[{PROCESS_ID}] Failed to fetch {signature} after {retries} retries")
+    try:
+        return await rpc.get_transaction(signature)
+    except RpcError as e:
+        print(f"[{PROCESS_ID}] Error fetching {signature}: {e}")
         return None
 
+# Pre-filter: the subscription only mentions our pool, and a notification's own logs decide
+# whether it is worth a getTransaction. Raydium writes one "ray_log" per instruction whose
+# first byte is the event type; only swaps (3 = SwapBaseIn, 4 = SwapBaseOut) move the price.
+def ray_log_types(logs):
+    """Event type byte of every ray_log line (the first 4 base64 chars decode to the first 3 bytes)."""
+    types = []
+    for log in logs:
+        if log.startswith(RAY_LOG_PREFIX):
+            try:
+                types.append(base64.b64decode(log[len(RAY_LOG_PREFIX):len(RAY_LOG_PREFIX) + 4])[0])
+            except (ValueError, IndexError):
+                continue
+    return types
+
+def prefilter(value):
+    """None if the notification is a swap candidate, otherwise the reason to drop it."""
+    if value.get("err") is not None:
+        return "failed"
+    logs = value.get("logs") or []
+    if not any(RAYDIUM_PROGRAM in log for log in logs):
+        return "not_raydium"
+    types = ray_log_types(logs)
+    if not types:
+        return "no_ray_log"
+    if not any(t in SWAP_LOG_TYPES for t in types):
+        return "not_swap"
+    return None
+
+class PrefilterStats:
+    def __init__(self):
+        self.notifications = 0
+        self.candidates = 0
+        self.dropped = {}
+
+    def record(self, reason):
+        self.notifications += 1
+        if reason is None:
+            self.candidates += 1
+        else:
+            self.dropped[reason] = self.dropped.get(reason, 0) + 1
+
+    def summary(self):
+        saved = self.notifications - self.candidates  # each drop is a getTransaction not made
+        ratio = saved / self.notifications if self.notifications else 0.0
+        reasons = ', '.join(f"{k}: {v}" for k, v in sorted(self.dropped.items()))
+        return f"{self.notifications} notifications, {self.candidates} fetched, drop ratio {ratio:.1%}, RPC calls saved {saved} ({reasons})"
+
+prefilter_stats = PrefilterStats()
+
 async def listen_trades(output_file, trade_output_dir, validator_queue):
-    uri = "wss://mainnet.helius-rpc.com/?api-key=18e23183-7cc1-4373-8ccb-26ab8ea875ac"
+    uri = HELIUS_WS_URL
     message_count = 0
     start_time = time.time()
+    try:
+        pool = await fetch_pool(rpc, pair_address, TOKEN_MINT)
+    except (RpcError, ValueError) as e:
+        print(f"[{PROCESS_ID}] Could not load pool {pair_address}, using balance diffs: {e}")
+        pool = None
     while True:
         try:
             print(f"[{PROCESS_ID}] Connecting to WebSocket: {uri}")
@@ -85,7 +133,7 @@ async def listen_trades(output_file, trade_output_dir, validator_queue):
                     "jsonrpc": "2.0",
                     "id": 1,
                     "method": "logsSubscribe",
-                    "params": [{"mentions": [RAYDIUM_PROGRAM]}, {"commitment": "confirmed"}]
+                    "params": [{"mentions": [pair_address]}, {"commitment": "confirmed"}]
                 }
                 print(f"[{PROCESS_ID}] Sending subscription: {json.dumps(sub_request)}")
                 await ws.send(json.dumps(sub_request))
@@ -97,7 +145,7 @@ async def listen_trades(output_file, trade_output_dir, validator_queue):
                     trade_data = json.loads(response)
                     elapsed = time.time() - start_time
                     print(f"[{PROCESS_ID}] Message #{message_count} at {datetime.now().strftime('%H:%M:%S')}, rate: {message_count/elapsed:.2f} msg/s: {trade_data}")
-                    processed_trades = await process_realtime_trade(trade_data, output_file, trade_output_dir)
+                    processed_trades = await process_realtime_trade(trade_data, output_file, trade_output_dir, pool)
                     if processed_trades:
                         print(f"[{PROCESS_ID}] Queuing {len(processed_trades)} trades, queue size: {validator_queue.qsize()}")
                         await validator_queue.put(processed_trades)
@@ -109,32 +157,8 @@ async def listen_trades(output_file, trade_output_dir, validator_queue):
             print(f"[{PROCESS_ID}] Reconnecting in 2 seconds...")
             await asyncio.sleep(2)
 
-async def process_realtime_trade(trade_data, output_file, trade_output_dir):
-    global TICKER, TOKEN_MINT
-    if not isinstance(trade_data, dict) or ('id' in trade_data and 'method' not in trade_data):
-        print(f"[{PROCESS_ID}] Skipping subscription confirmation")
-        return None
-    if trade_data.get('method') != 'logsNotification' or 'params' not in trade_data:
-        print(f"[{PROCESS_ID}] Unexpected message format: {trade_data}")
-        return None
-    
-    params = trade_data['params']
-    result = params.get('result', {})
-    value = result.get('value', {})
-    transaction_hash = value.get('signature', 'N/A')
-    slot = result.get('context', {}).get('slot', None)
-
-    if not transaction_hash or not slot:
-        print(f"[{PROCESS_ID}] Invalid trade data: hash={transaction_hash}, slot={slot}")
-        return None
-
-    full_tx = await fetch_transaction_details(transaction_hash)
-    if not full_tx:
-        print(f"[{PROCESS_ID}] Failed to fetch transaction details for {transaction_hash}")
-        return None
-
-    block_time = full_tx.get("blockTime", int(time.time()))
-    timestamp = datetime.fromtimestamp(block_time).isoformat()
+def balance_diff_trades(transaction_hash, timestamp, block_time, full_tx):
+    """Trades from per-wallet token balance changes, for transactions without a single pool swap."""
     meta = full_tx.get("meta", {})
     pre_token_balances = meta.get("preTokenBalances", [])
     post_token_balances = meta.get("postTokenBalances", [])
@@ -154,10 +178,10 @@ async def process_realtime_trade(trade_data, output_file, trade_output_dir):
         any(program in log for program in dex_programs) or 
         any(keyword in log for keyword in trade_keywords)
         for log in logs
-    ) or TOKEN_MINT in str(full_tx)
+    ) or any(b.get("mint") == TOKEN_MINT for b in pre_token_balances + post_token_balances)
     if not has_trade:
-        print(f"[{PROCESS_ID}] No trade activity in {transaction_hash}: logs={logs}, token_mention={TOKEN_MINT in str(full_tx)}")
-        return None
+        print(f"[{PROCESS_ID}] No trade activity in {transaction_hash}: logs={logs}")
+        return []
 
     trades = []
     processed_wallets = set()
@@ -166,12 +190,13 @@ async def process_realtime_trade(trade_data, output_file, trade_output_dir):
     wallet_balances = {}
     for pre in pre_token_balances + [{}]:
         if pre.get("mint") == TOKEN_MINT:
-            wallet = account_keys[pre.get("accountIndex")] if pre.get("accountIndex") < len(account_keys) else f"Unknown_{transaction_hash}"
+            # The balance's owner, i.e. the trader, as the ray_log path records the signer
+            wallet = pre.get("owner") or (account_keys[pre.get("accountIndex")] if pre.get("accountIndex") < len(account_keys) else f"Unknown_{transaction_hash}")
             wallet_balances[wallet] = wallet_balances.get(wallet, {'pre': 0, 'post': 0})
             wallet_balances[wallet]['pre'] = pre.get("uiTokenAmount", {}).get("uiAmount", 0) or 0
     for post in post_token_balances + [{}]:
         if post.get("mint") == TOKEN_MINT:
-            wallet = account_keys[post.get("accountIndex")] if post.get("accountIndex") < len(account_keys) else f"Unknown_{transaction_hash}"
+            wallet = post.get("owner") or (account_keys[post.get("accountIndex")] if post.get("accountIndex") < len(account_keys) else f"Unknown_{transaction_hash}")
             wallet_balances[wallet] = wallet_balances.get(wallet, {'pre': 0, 'post': 0})
             wallet_balances[wallet]['post'] = post.get("uiTokenAmount", {}).get("uiAmount", 0) or 0
 
@@ -201,6 +226,60 @@ async def process_realtime_trade(trade_data, output_file, trade_output_dir):
             'block_time': block_time
         })
 
+    return trades
+
+async def process_realtime_trade(trade_data, output_file, trade_output_dir, pool=None):
+    global TICKER, TOKEN_MINT
+    if not isinstance(trade_data, dict) or ('id' in trade_data and 'method' not in trade_data):
+        print(f"[{PROCESS_ID}] Skipping subscription confirmation")
+        return None
+    if trade_data.get('method') != 'logsNotification' or 'params' not in trade_data:
+        print(f"[{PROCESS_ID}] Unexpected message format: {trade_data}")
+        return None
+    
+    params = trade_data['params']
+    result = params.get('result', {})
+    value = result.get('value', {})
+    transaction_hash = value.get('signature', 'N/A')
+    slot = result.get('context', {}).get('slot', None)
+
+    if not transaction_hash or not slot:
+        print(f"[{PROCESS_ID}] Invalid trade data: hash={transaction_hash}, slot={slot}")
+        return None
+
+    reason = prefilter(value)
+    prefilter_stats.record(reason)
+    if reason is not None:
+        print(f"[{PROCESS_ID}] Dropped {transaction_hash} before fetching: {reason}")
+        return None
+
+    full_tx = await fetch_transaction_details(transaction_hash)
+    if not full_tx:
+        print(f"[{PROCESS_ID}] Failed to fetch transaction details for {transaction_hash}")
+        return None
+
+    block_time = full_tx.get("blockTime", int(time.time()))
+    timestamp = datetime.fromtimestamp(block_time).isoformat()
+    account_keys = full_tx.get("transaction", {}).get("message", {}).get("accountKeys", [])
+
+    events = swap_events(value.get("logs") or []) if pool is not None else []
+    if len(events) == 1 and account_keys:
+        # Exact amounts from the swap's ray_log; the signer is the trader
+        trade_type, amount, sol_amount, price = pool.trade(events[0])
+        trades = [{
+            'transaction_id': transaction_hash,
+            'timestamp': timestamp,
+            'wallet_address': account_keys[0],
+            'amount': amount,
+            'trade_type': trade_type,
+            'emoji': '🟢' if trade_type == "buy" else '🔴',
+            'block_time': block_time,
+            'sol_amount': sol_amount,
+            'price': price
+        }] if amount >= MIN_TRADE_AMOUNT else []
+    else:
+        trades = balance_diff_trades(transaction_hash, timestamp, block_time, full_tx)
+
     if not trades:
         print(f"[{PROCESS_ID}] No valid buy/sell activity in {transaction_hash}")
         return None
@@ -241,127 +320,51 @@ def save_to_json_file(data, output_file, append=False):
     except Exception as e:
         print(f"[{PROCESS_ID}] Error saving data: {e}")
 
-async def validate_trades(validator_queue, conn):
+async def validate_trades(validator_queue, conn, sea_life_processor):
     print(f"[{PROCESS_ID}] Starting trade validation task")
+    # Batches are buffered and written once FLUSH_ROWS trades are waiting or the oldest has
+    # waited FLUSH_INTERVAL, instead of one transaction per notification; stored trades are
+    # then classified once for the sea life window
+    writer = TradeWriter(conn, VALIDATOR)
+    pending = []
     while True:
         try:
-            trades = await validator_queue.get()
-            if not trades:
-                print(f"[{PROCESS_ID}] Received empty trade batch from validator queue")
+            try:
+                trades = await asyncio.wait_for(validator_queue.get(), writer.time_left())
+            except asyncio.TimeoutError:
+                trades = None
+            else:
                 validator_queue.task_done()
-                continue
-            with conn.cursor() as cur:
+                if trades:
+                    writer.extend(validator_row(trade, TICKER) for trade in trades)
+                    pending.extend(trades)
+                else:
+                    print(f"[{PROCESS_ID}] Received empty trade batch from validator queue")
+            if writer.buffer and writer.due():
                 try:
-                    for trade in trades:
-                        timestamp = datetime.fromisoformat(trade['timestamp'])
-                        cur.execute(
-                            """
-                            INSERT INTO validator (transaction_hash, wallet_address, block_time, token_mint, pre_balance, post_balance, trade_type, transaction_emoji)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (transaction_hash) DO UPDATE SET
-                                wallet_address = EXCLUDED.wallet_address,
-                                block_time = EXCLUDED.block_time,
-                                token_mint = EXCLUDED.token_mint,
-                                pre_balance = EXCLUDED.pre_balance,
-                                post_balance = EXCLUDED.post_balance,
-                                trade_type = EXCLUDED.trade_type,
-                                transaction_emoji = EXCLUDED.transaction_emoji
-                            """,
-                            (trade['transaction_id'], trade['wallet_address'], timestamp, TICKER, 0.0, trade['amount'], 
-                             trade['trade_type'], trade['emoji'])
-                        )
-                    conn.commit()
-                    print(f"[{PROCESS_ID}] Validated and stored {len(trades)} trades in validator table")
+                    stored = writer.flush()
+                    print(f"[{PROCESS_ID}] Validated and stored {stored} trades in validator table")
+                    sea_life_processor.ingest(pending)
+                    pending = []
                 except psycopg2.Error as e:
+                    # The writer keeps the rows and retries them with the next flush; so does pending
                     print(f"[{PROCESS_ID}] Validation error: {e}")
-                    conn.rollback()
-            validator_queue.task_done()
+                    await asyncio.sleep(writer.flush_interval)
         except Exception as e:
             print(f"[{PROCESS_ID}] Validation task error: {e}")
             traceback.print_exc()
-            validator_queue.task_done()
-
-class SeaLifeProcessor:
-    def __init__(self, conn):
-        self.conn = conn
-        self.sea_life_classes = [
-            ('🐋', 1000000000), ('🐳', 1000000), ('🦈', 100000), ('🐙', 50000), ('🐬', 10000),
-            ('🦑', 5000), ('🐟', 1000), ('🐡', 500), ('🦭', 250), ('🦞', 100),
-            ('🦀', 50), ('🐢', 25), ('🦐', 10), ('🐚', 5), ('🦪', 1),
-            ('🪸', 0.5), ('🐠', 0.1), ('🐌', 0.01), ('🌊', 0)
-        ]
-        self.sea_life_counts = {'buy': {emoji: 0 for emoji, _ in self.sea_life_classes}, 
-                              'sell': {emoji: 0 for emoji, _ in self.sea_life_classes}}
-        self.total_trades = {'buy': 0, 'sell': 0}
-
-    async def process_cycle(self, cycle_start):
-        with self.conn.cursor() as cur:
-            try:
-                window_start = cycle_start - timedelta(seconds=120)
-                print(f"[{PROCESS_ID}] Querying validator table from {window_start} to {cycle_start + timedelta(seconds=INTERVAL)}")
-                cur.execute(
-                    """
-                    SELECT post_balance, trade_type, wallet_address, block_time, transaction_hash
-                    FROM validator
-                    WHERE block_time >= %s AND block_time < %s
-                    """,
-                    (window_start, cycle_start + timedelta(seconds=INTERVAL))
-                )
-                trades = cur.fetchall()
-                self.sea_life_counts = {'buy': {emoji: 0 for emoji, _ in self.sea_life_classes}, 
-                                      'sell': {emoji: 0 for emoji, _ in self.sea_life_classes}}
-                self.total_trades = {'buy': 0, 'sell': 0}
-                processed_hashes = set()
-
-                for post_balance, trade_type, wallet_address, block_time, transaction_hash in trades:
-                    if transaction_hash in processed_hashes or trade_type not in ['buy', 'sell']:
-                        continue
-                    processed_hashes.add(transaction_hash)
-                    self.total_trades[trade_type] += 1
-                    print(f"[{PROCESS_ID}] Processing trade {transaction_hash}: type={trade_type}, amount={post_balance}, time={block_time}")
-                    classification = next((emoji for emoji, thresh in self.sea_life_classes if post_balance >= thresh), '🌊')
-                    if classification != '🌊':
-                        self.sea_life_counts[trade_type][classification] += 1
-                    
-                    amount_lamports = post_balance * 1000000
-                    cur.execute(
-                        """
-                        INSERT INTO whale_detector (whale_wallet, detected_time, amount, token, trade_type, classification, transaction_hash)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (transaction_hash) DO UPDATE SET
-                            whale_wallet = EXCLUDED.whale_wallet,
-                            detected_time = EXCLUDED.detected_time,
-                            amount = EXCLUDED.amount,
-                            token = EXCLUDED.token,
-                            trade_type = EXCLUDED.trade_type,
-                            classification = EXCLUDED.classification
-                        """,
-                        (wallet_address, block_time, amount_lamports, TICKER, trade_type, classification, transaction_hash)
-                    )
-                
-                self.conn.commit()
-                with open(SEA_LIFE_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(self.sea_life_counts, f, indent=4, ensure_ascii=False)
-                buy_display = ', '.join(f"{k}: {v}" for k, v in self.sea_life_counts['buy'].items())
-                sell_display = ', '.join(f"{k}: {v}" for k, v in self.sea_life_counts['sell'].items())
-                print(f"[{PROCESS_ID}] Sea Life Counts: {{buy: {{{buy_display}}}, sell: {{{sell_display}}}}}")
-                print(f"[{PROCESS_ID}] Total Trades Processed: Buys: {self.total_trades['buy']}, Sells: {self.total_trades['sell']}")
-                if trades:
-                    print(f"[{PROCESS_ID}] Inserted {len(processed_hashes)} trades into whale_detector")
-            except psycopg2.Error as e:
-                print(f"[{PROCESS_ID}] Sea life processing error: {e}")
-                self.conn.rollback()
 
 async def main_loop(token_address, output_file, trade_output_dir, interval=5):
     global market_address, pair_address, TICKER, TOKEN_MINT, OUTPUT_FILE, TRADE_OUTPUT_DIR, SEA_LIFE_FILE
     
     validator_queue = asyncio.Queue(maxsize=1000)
     conn = psycopg2.connect(**db_params)
-    sea_life_processor = SeaLifeProcessor(conn)
+    sea_life_processor = SeaLifeProcessor(conn, log_prefix=f"[{PROCESS_ID}] ")
+    sea_life_processor.seed(TICKER, SEA_LIFE_FILE)
 
     print(f"[{PROCESS_ID}] Scheduling tasks")
     trade_task = asyncio.create_task(listen_trades(output_file, trade_output_dir, validator_queue))
-    asyncio.create_task(validate_trades(validator_queue, conn))
+    asyncio.create_task(validate_trades(validator_queue, conn, sea_life_processor))
 
     await asyncio.sleep(1)
 
@@ -387,6 +390,7 @@ async def main_loop(token_address, output_file, trade_output_dir, interval=5):
                 OUTPUT_FILE = new_OUTPUT_FILE
                 TRADE_OUTPUT_DIR = new_TRADE_OUTPUT_DIR
                 SEA_LIFE_FILE = new_SEA_LIFE_FILE
+                sea_life_processor.seed(TICKER, SEA_LIFE_FILE)
                 
                 trade_task.cancel()
                 try:
@@ -410,6 +414,7 @@ async def main_loop(token_address, output_file, trade_output_dir, interval=5):
             buy_display = ', '.join(f'{k}: {v}' for k, v in sea_life_processor.sea_life_counts['buy'].items())
             sell_display = ', '.join(f'{k}: {v}' for k, v in sea_life_processor.sea_life_counts['sell'].items())
             print(f"[{PROCESS_ID}] Sea Life Counts: {{buy: {{{buy_display}}}, sell: {{{sell_display}}}}}")
+            print(f"[{PROCESS_ID}] Pre-filter: {prefilter_stats.summary()}")
             
             print(f"[{PROCESS_ID}] Cycle completed")
         except Exception as e:
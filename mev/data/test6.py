@@ -32,7 +32,7 @@ def insert_into_db(data):
         query = """
             INSERT INTO validator (transaction_hash, block_time, wallet_address, token_mint, pre_balance, post_balance, trade_type)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (transaction_hash) DO NOTHING;
+            ON CONFLICT (transaction_hash, block_time) DO NOTHING;
         """
         
         # Debugging log to check data
@@ -2,11 +2,16 @@ import os
 import json
 import psycopg2
 from datetime import datetime
-import requests
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from solana_rpc import SolanaRpc, RpcThread, RpcError
+
 TARGET_CONSTANTS_FILE = "/home/joshua/archon/mev/data/target_constants.json"
 HELIUS_RPC_URL = "https://mainnet.helius-rpc.com/?api-key=18e23183-7cc1-4373-8ccb-26ab8ea875ac"
+HELIUS_RPC_RATE = 25  # calls per second on the Helius plan
+
+rpc = RpcThread(SolanaRpc(HELIUS_RPC_URL, rate=HELIUS_RPC_RATE))
 
 def load_target_constants():
     try:
@@ -46,8 +51,8 @@ def insert_into_db(data):
                         transaction_hash, block_time, wallet_address, token_mint, pre_balance, post_balance, trade_type
                     )
                     VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (wallet_address, block_time) DO UPDATE SET
-                        transaction_hash = EXCLUDED.transaction_hash,
+                    ON CONFLICT (transaction_hash, block_time) DO UPDATE SET
+                        wallet_address = EXCLUDED.wallet_address,
                         token_mint = EXCLUDED.token_mint,
                         pre_balance = EXCLUDED.pre_balance,
                         post_balance = EXCLUDED.post_balance,
@@ -70,20 +75,13 @@ def insert_into_db(data):
         print(f"Database error for {data.get('transaction_hash', 'unknown')}: {e}")
         return False
 
-def fetch_transaction_details(signature):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getTransaction",
-        "params": [signature, {"encoding": "json", "maxSupportedTransactionVersion": 0}]
-    }
+def fetch_transaction_batch(signatures):
+    """Full transactions for `signatures`, in order, fetched as batch arrays over one session."""
     try:
-        response = requests.post(HELIUS_RPC_URL, json=payload, headers={"Content-Type": "application/json"})
-        response.raise_for_status()
-        return response.json().get("result")
-    except Exception as e:
-        print(f"Error fetching transaction details for {signature}: {e}")
-        return None
+        return rpc.get_transactions(signatures)
+    except RpcError as e:
+        print(f"Error fetching transaction details: {e}")
+        return [None] * len(signatures)
 
 def check_existing_transactions(transaction_hashes):
     try:
@@ -185,12 +183,15 @@ def process_transaction_file(file_path):
         
         print(f"Found {len(transactions)} transactions, {len(new_transactions)} new")
         
+        signatures = []
         for tx in new_transactions:
             signature = tx.get("transaction_id")
             if not signature:
                 print(f"Skipping transaction with no ID in {file_path}")
                 continue
-            full_transaction = fetch_transaction_details(signature)
+            signatures.append(signature)
+
+        for signature, full_transaction in zip(signatures, fetch_transaction_batch(signatures)):
             if full_transaction:
                 parse_transaction(full_transaction, file_path)
             else:
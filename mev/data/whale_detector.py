@@ -1,6 +1,14 @@
-import psycopg2
-from psycopg2 import sql
+import os
+import sys
+import time
+import argparse
 import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from sea_life import WHALE_AMOUNT_SCALE, classification_sql
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -18,6 +26,66 @@ db_params = {
 # Raydium pool address constant
 RAYDIUM_POOL_ADDRESS = 'Cqt1J8ET5rxEiHEAjRGGBjgbceouMs4uDnnE634xnmK3'
 
+# Incremental job: each run classifies only validator rows whose ingest_id (a sequence value
+# assigned on insert and on any real change) is above the stored watermark, in batches that
+# commit together with the new watermark. The last WATERMARK_OVERLAP ids are read again so
+# rows from transactions that committed out of sequence order are not skipped; re-reading
+# them is a no-op. The job only fills in whale_detector rows the ingesters have not written
+# (SeaLifeProcessor owns those), with the same amount scale and sea_life classes, so /data and
+# trade_flow_1m see one unit system. Backfill mode splits validator's block_time range into
+# chunks classified by parallel workers, one connection each.
+JOB_NAME = "whale_detector"
+JOB_INTERVAL = 30  # seconds between incremental runs
+INCREMENTAL_BATCH = 50_000  # ingest_ids per transaction
+WATERMARK_OVERLAP = 1_000
+BACKFILL_WORKERS = 4
+BACKFILL_CHUNK = timedelta(hours=6)
+
+SCHEMA_SQL = """
+CREATE SEQUENCE IF NOT EXISTS {schema}.validator_ingest_id_seq;
+ALTER TABLE {schema}.validator ADD COLUMN IF NOT EXISTS ingest_id bigint NOT NULL DEFAULT nextval('{schema}.validator_ingest_id_seq'::regclass);
+ALTER SEQUENCE {schema}.validator_ingest_id_seq OWNED BY {schema}.validator.ingest_id;
+CREATE INDEX IF NOT EXISTS idx_validator_ingest_id ON {schema}.validator USING btree (ingest_id);
+CREATE TABLE IF NOT EXISTS {schema}.job_watermark (
+    job text PRIMARY KEY,
+    watermark bigint NOT NULL,
+    updated_at timestamp without time zone DEFAULT now() NOT NULL
+);
+"""
+
+CLASSIFY_SQL = """
+INSERT INTO {schema}.whale_detector (
+    whale_wallet,
+    detected_time,
+    amount,
+    token,
+    trade_type,
+    classification,
+    archon_notes,
+    transaction_hash
+)
+SELECT
+    v.wallet_address AS whale_wallet,  -- Wallet address
+    v.block_time AS detected_time,
+    (v.post_balance - v.pre_balance) * {scale} AS amount,  -- same scale as the ingesters' rows
+    v.token_mint AS token,
+    v.trade_type,
+    {classification} AS classification,  -- sea_life.classify() thresholds
+    CASE
+        WHEN v.wallet_address = %(pool)s THEN 'Raydium Pool Activity'  -- Raydium pool activity
+        ELSE ''  -- No specific note
+    END AS archon_notes,  -- Placeholder for AI-generated notes
+    v.transaction_hash
+FROM {schema}.validator v
+WHERE ABS(v.post_balance - v.pre_balance) > 500  -- Threshold for transaction size to consider
+  AND v.transaction_hash IS NOT NULL
+  AND {range}
+ON CONFLICT (transaction_hash, detected_time)  -- whale_detector_pkey (includes the partition column)
+DO NOTHING  -- rows the ingesters already wrote are theirs
+"""
+ID_RANGE = "v.ingest_id > %(low)s AND v.ingest_id <= %(high)s"
+TIME_RANGE = "v.block_time >= %(start)s AND v.block_time < %(end)s"
+
 # Connect to the PostgreSQL database
 def connect_db():
     try:
@@ -28,81 +96,147 @@ def connect_db():
         logger.error(f"Unable to connect to the database: {e}")
         return None
 
-# Function to execute SQL query
-def execute_sql(conn, query):
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(query)
-            conn.commit()
-            logger.info("SQL query executed successfully.")
-    except Exception as e:
-        logger.error(f"Error executing SQL query: {e}")
-
-def classify_and_store_critter_transactions(conn):
-    query = f"""
-    INSERT INTO public.whale_detector (
-        whale_wallet, 
-        detected_time, 
-        amount, 
-        token, 
-        trade_type, 
-        classification, 
-        archon_notes
+def ensure_schema(conn, schema="public"):
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_SQL.format(schema=schema))
+    conn.commit()
+
+def load_watermark(conn, schema="public"):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT watermark FROM {schema}.job_watermark WHERE job = %s", (JOB_NAME,))
+        row = cur.fetchone()
+    conn.commit()
+    return row[0] if row else 0
+
+def save_watermark(cur, watermark, schema="public"):
+    cur.execute(
+        f"""
+        INSERT INTO {schema}.job_watermark (job, watermark, updated_at)
+        VALUES (%s, %s, now())
+        ON CONFLICT (job) DO UPDATE SET
+            watermark = GREATEST({schema}.job_watermark.watermark, EXCLUDED.watermark),
+            updated_at = EXCLUDED.updated_at
+        """,
+        (JOB_NAME, watermark)
     )
-    SELECT 
-        v.wallet_address AS whale_wallet,  -- Wallet address
-        v.block_time AS detected_time,
-        v.post_balance - v.pre_balance AS amount,
-        v.token_mint AS token,
-        v.trade_type,
-        CASE
-            WHEN ABS(v.post_balance - v.pre_balance) > 1000000000 THEN '🐋'  -- Whale (1 Billion)
-            WHEN ABS(v.post_balance - v.pre_balance) > 100000000 THEN '🦈'  -- Shark (100 Million)
-            WHEN ABS(v.post_balance - v.pre_balance) > 10000000 THEN '🐟'   -- Fish (10 Million)
-            WHEN ABS(v.post_balance - v.pre_balance) > 1000000 THEN '🐙'   -- Octopus (1 Million)
-            WHEN ABS(v.post_balance - v.pre_balance) > 500000 THEN '🦀'    -- Crab (500,000)
-            WHEN ABS(v.post_balance - v.pre_balance) > 100000 THEN '🦐'    -- Shrimp (100,000)
-            ELSE '🐚'  -- Shell (below 100,000)
-        END AS classification,
-        CASE
-            WHEN v.wallet_address = '{RAYDIUM_POOL_ADDRESS}' THEN 'Raydium Pool Activity'  -- Raydium pool activity
-            ELSE ''  -- No specific note
-        END AS archon_notes  -- Placeholder for AI-generated notes
-    FROM public.validator v
-    WHERE ABS(v.post_balance - v.pre_balance) > 500  -- Threshold for transaction size to consider
-    ON CONFLICT (whale_wallet, detected_time)  -- Handle duplicates based on primary key
-    DO UPDATE 
-        SET 
-            amount = EXCLUDED.amount,
-            token = EXCLUDED.token,
-            trade_type = EXCLUDED.trade_type,
-            classification = EXCLUDED.classification,
-            archon_notes = EXCLUDED.archon_notes;  -- Update all fields if duplicate
-    """
+
+def classify_range(cur, range_sql, params, schema="public"):
+    """Classify the validator rows matching `range_sql`; returns the rows inserted."""
+    sql = CLASSIFY_SQL.format(schema=schema, range=range_sql, scale=WHALE_AMOUNT_SCALE,
+                              classification=classification_sql("ABS(v.post_balance - v.pre_balance)"))
+    cur.execute(sql, {"pool": RAYDIUM_POOL_ADDRESS, **params})
+    return cur.rowcount
+
+def classify_and_store_critter_transactions(conn, schema="public"):
+    """One incremental run: everything ingested since the watermark. Returns rows written."""
+    watermark = load_watermark(conn, schema)
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT max(ingest_id) FROM {schema}.validator")
+        high = cur.fetchone()[0] or 0
+    conn.commit()
+    if high <= watermark:
+        return 0
+    written = 0
+    low = max(0, watermark - WATERMARK_OVERLAP)
+    while low < high:
+        step = min(high, low + INCREMENTAL_BATCH)
+        try:
+            with conn.cursor() as cur:
+                written += classify_range(cur, ID_RANGE, {"low": low, "high": step}, schema)
+                save_watermark(cur, step, schema)
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+        low = step
+    logger.info(f"🐋 Classified ingest_ids {watermark}..{high}: {written} whale_detector rows written")
+    return written
+
+def _backfill_chunk(start, end, schema):
+    conn = psycopg2.connect(**db_params)
     try:
-        execute_sql(conn, query)
-        print("Transaction classification and storage completed successfully.")
-    except Exception as e:
-        print(f"Error during classification and storage: {e}")
+        with conn.cursor() as cur:
+            written = classify_range(cur, TIME_RANGE, {"start": start, "end": end}, schema)
+        conn.commit()
+        return written
+    finally:
+        conn.close()
 
+def backfill(conn, start=None, end=None, workers=BACKFILL_WORKERS, chunk=BACKFILL_CHUNK, schema="public"):
+    """Classify validator history in [start, end) (default: all of it) with parallel workers.
 
+    Advances the watermark to the newest ingest_id seen before starting when the whole table
+    was covered, so the incremental job carries on from there. Returns (rows written, seconds).
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT min(block_time), max(block_time), max(ingest_id), count(*) FROM {schema}.validator")
+        first, last, high, total = cur.fetchone()
+    conn.commit()
+    if first is None:
+        logger.info("validator is empty, nothing to backfill")
+        return 0, 0.0
+    full = start is None and end is None
+    start = start or first
+    end = end or last + timedelta(microseconds=1)
+    chunks = []
+    while start < end:
+        chunks.append((start, min(end, start + chunk)))
+        start += chunk
+    logger.info(f"🧱 Backfilling {total} validator rows in {len(chunks)} chunks with {workers} workers")
+
+    started = time.perf_counter()
+    written = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_backfill_chunk, a, b, schema): (a, b) for a, b in chunks}
+        for done, future in enumerate(as_completed(futures), 1):
+            written += future.result()
+            if done % max(1, len(chunks) // 10) == 0 or done == len(chunks):
+                logger.info(f"🧱 {done}/{len(chunks)} chunks, {written} rows written")
+    elapsed = time.perf_counter() - started
 
+    if full and high is not None:
+        with conn.cursor() as cur:
+            save_watermark(cur, high, schema)
+        conn.commit()
+    logger.info(f"✅ Backfill scanned {total} rows in {elapsed:.2f}s ({total / elapsed:,.0f} rows/s), {written} rows written")
+    return written, elapsed
 
 # Main function to interact with the database and run the process
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backfill", action="store_true", help="classify history in parallel chunks, then exit")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="backfill from this block_time")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="backfill up to this block_time")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--chunk-hours", type=float, default=BACKFILL_CHUNK.total_seconds() / 3600)
+    parser.add_argument("--once", action="store_true", help="run one incremental pass and exit")
+    args = parser.parse_args()
+
     # Connect to the database
     conn = connect_db()
     if conn is None:
         logger.error("Exiting script due to failed database connection.")
         return
-    
-    # Call the function to classify and store transactions
-    logger.info("Classifying and storing critter transactions...")
-    classify_and_store_critter_transactions(conn)
-
-    # Close the connection
-    conn.close()
-    logger.info("Database connection closed.")
+    ensure_schema(conn)
+
+    try:
+        if args.backfill:
+            backfill(conn, args.start, args.end, args.workers, timedelta(hours=args.chunk_hours))
+            return
+        logger.info("Classifying and storing critter transactions...")
+        while True:
+            started = time.perf_counter()
+            try:
+                classify_and_store_critter_transactions(conn)
+            except psycopg2.Error as e:
+                logger.error(f"Error during classification and storage: {e}")
+            if args.once:
+                break
+            time.sleep(max(0, JOB_INTERVAL - (time.perf_counter() - started)))
+    finally:
+        # Close the connection
+        conn.close()
+        logger.info("Database connection closed.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,283 @@
+import re
+import time
+import logging
+import argparse
+from datetime import datetime, timedelta
+import psycopg2
+from db_pool import DB_PARAMS
+from candles import CANDLE_INTERVALS, interval_label
+
+# Daily range partitions for the time-series tables. Every hot query reads the last minutes to
+# hours, so partitions let the planner prune to one or two small tables and let retention drop
+# a whole day instead of DELETEing rows. The maintenance job keeps a partition for every day in
+# the retention window plus PREMAKE_DAYS ahead, drops days that aged out (candles first copy
+# their hourly-and-up rows into candles_history), and purges old rows that landed in the
+# DEFAULT partition. Unique keys include the partition column, so ON CONFLICT targets must too.
+#
+# Deployment order: the ingesters and whale_detector upsert on (transaction_hash, <partition
+# column>), which a plain heap only accepts once it has a matching unique index. Run --prepare
+# (builds those indexes CONCURRENTLY, no write lock) or --migrate before rolling them out.
+#
+#   python partitions.py --prepare   # before deploying the writers: composite unique indexes on the heaps
+#   python partitions.py --migrate   # one-off: convert the existing heaps (keeps <table>_unpartitioned)
+#   python partitions.py             # maintenance loop
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PREMAKE_DAYS = 3
+MAINTENANCE_INTERVAL = 3600  # seconds between maintenance runs
+HISTORY_PAIR_PATTERNS = [f"%\\_{interval_label(m)}" for m in CANDLE_INTERVALS if m >= 60]
+
+class PartitionedTable:
+    def __init__(self, table, column, retention_days, keys, indexes, sequences=(), history=None, rollups=(), conflict_indexes=()):
+        self.table = table
+        self.column = column
+        self.retention_days = retention_days
+        self.keys = keys  # (constraint name, definition)
+        self.indexes = indexes  # (index name, column list)
+        self.sequences = sequences  # (column, sequence) pairs owned by the table
+        self.history = history  # table that keeps the long-interval candles of dropped days
+        self.rollups = rollups  # (table, time column) aggregates trimmed to the same retention
+        self.conflict_indexes = conflict_indexes  # (index name, column list) the writers' ON CONFLICT targets need before migration
+
+    def partition_name(self, day):
+        return f"{self.table}_p{day:%Y%m%d}"
+
+TABLES = [
+    PartitionedTable(
+        "validator", "block_time", 14,
+        keys=[("unique_transaction_hash", "UNIQUE (transaction_hash, block_time)")],
+        indexes=[("idx_validator_token_block_time", "(token_mint, block_time)"), ("idx_validator_ingest_id", "(ingest_id)")],
+        sequences=[("ingest_id", "validator_ingest_id_seq")],
+        conflict_indexes=[("validator_hash_time_key", "(transaction_hash, block_time)")]
+    ),
+    PartitionedTable(
+        "whale_detector", "detected_time", 30,
+        keys=[("whale_detector_pkey", "PRIMARY KEY (transaction_hash, detected_time)")],
+        indexes=[("idx_whale_detector_token_time", "(token, detected_time)"), ("idx_detected_time", "(detected_time)"),
+                 ("idx_classification", "(classification)"), ("idx_whale_wallet", "(whale_wallet)")],
+        rollups=[("trade_flow_1m", "minute")],
+        conflict_indexes=[("whale_detector_hash_time_key", "(transaction_hash, detected_time)")]
+    ),
+    PartitionedTable(
+        "candles", '"timestamp"', 30,
+        keys=[("candles_pkey", 'PRIMARY KEY (id, "timestamp")'), ("unique_timestamp_token_pair", 'UNIQUE ("timestamp", token_pair)')],
+        indexes=[("idx_token_timestamp", '(token_pair, "timestamp")'), ("idx_candles_timestamp", '("timestamp")'), ("idx_candles_pair", "(token_pair)")],
+        sequences=[("id", "candles_id_seq")],
+        history="candles_history"
+    ),
+]
+
+def is_partitioned(cur, spec, schema="public"):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (f"{schema}.{spec.table}",))
+    row = cur.fetchone()
+    return row is not None and row[0] == "p"
+
+def existing_partitions(cur, spec, schema="public"):
+    """{day: partition name} of the daily partitions attached to the table."""
+    cur.execute(
+        """
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        """,
+        (f"{schema}.{spec.table}",)
+    )
+    pattern = re.compile(rf"^{spec.table}_p(\d{{8}})$")
+    days = {}
+    for (name,) in cur.fetchall():
+        match = pattern.match(name)
+        if match:
+            days[datetime.strptime(match.group(1), "%Y%m%d").date()] = name
+    return days
+
+def create_partition(cur, spec, day, schema="public"):
+    """Create and attach `day`'s partition, moving any rows for it out of the DEFAULT partition."""
+    name = spec.partition_name(day)
+    low, high = day.isoformat(), (day + timedelta(days=1)).isoformat()
+    cur.execute(f"CREATE TABLE {schema}.{name} (LIKE {schema}.{spec.table} INCLUDING DEFAULTS)")
+    cur.execute(
+        f"""
+        WITH moved AS (
+            DELETE FROM {schema}.{spec.table}_default WHERE {spec.column} >= %s AND {spec.column} < %s RETURNING *
+        )
+        INSERT INTO {schema}.{name} SELECT * FROM moved
+        """,
+        (low, high)
+    )
+    cur.execute(f"ALTER TABLE {schema}.{spec.table} ATTACH PARTITION {schema}.{name} FOR VALUES FROM (%s) TO (%s)", (low, high))
+    return name
+
+def prepare(conn, spec, schema="public"):
+    """Add the unique indexes the writers' ON CONFLICT targets need to a not yet partitioned table.
+
+    Built CONCURRENTLY, so writes continue; an invalid index left by an interrupted build is
+    dropped and rebuilt. migrate() later replaces them with the partitioned table's keys.
+    """
+    with conn.cursor() as cur:
+        partitioned = is_partitioned(cur, spec, schema)
+    conn.commit()
+    if partitioned or not spec.conflict_indexes:
+        return
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for name, columns in spec.conflict_indexes:
+                cur.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", (f"{schema}.{name}",))
+                row = cur.fetchone()
+                if row is not None and row[0]:
+                    continue
+                if row is not None:
+                    cur.execute(f"DROP INDEX CONCURRENTLY {schema}.{name}")
+                started = time.perf_counter()
+                cur.execute(f"CREATE UNIQUE INDEX CONCURRENTLY {name} ON {schema}.{spec.table} USING btree {columns}")
+                logging.info(f"🔑 Built {schema}.{name} in {time.perf_counter() - started:.1f}s")
+    finally:
+        conn.autocommit = autocommit
+
+def migrate(conn, spec, schema="public", today=None):
+    """Convert `spec.table` from a plain heap to a daily-partitioned table in one transaction.
+
+    The old heap is kept as <table>_unpartitioned (its indexes get the same suffix); drop it
+    once the new table has been checked.
+    """
+    today = today or datetime.now().date()
+    old = f"{spec.table}_unpartitioned"
+    with conn.cursor() as cur:
+        if is_partitioned(cur, spec, schema):
+            logging.info(f"{schema}.{spec.table} is already partitioned")
+            return
+        started = time.perf_counter()
+        cur.execute(
+            "SELECT pg_get_triggerdef(oid), tgname FROM pg_trigger WHERE tgrelid = to_regclass(%s) AND NOT tgisinternal",
+            (f"{schema}.{spec.table}",)
+        )
+        triggers = cur.fetchall()
+        cur.execute(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE i.indrelid = to_regclass(%s)",
+            (f"{schema}.{spec.table}",)
+        )
+        old_indexes = [name for (name,) in cur.fetchall()]
+        cur.execute(f"SELECT min({spec.column})::date, max({spec.column})::date FROM {schema}.{spec.table}")
+        first, last = cur.fetchone()
+
+        cur.execute(f"ALTER TABLE {schema}.{spec.table} RENAME TO {old}")
+        for name in old_indexes:
+            cur.execute(f"ALTER INDEX {schema}.{name} RENAME TO {name}_unpartitioned")
+        for _, name in triggers:
+            cur.execute(f"DROP TRIGGER {name} ON {schema}.{old}")
+
+        cur.execute(f"CREATE TABLE {schema}.{spec.table} (LIKE {schema}.{old} INCLUDING DEFAULTS INCLUDING STORAGE) PARTITION BY RANGE ({spec.column})")
+        for name, definition in spec.keys:
+            cur.execute(f"ALTER TABLE {schema}.{spec.table} ADD CONSTRAINT {name} {definition}")
+        for name, columns in spec.indexes:
+            cur.execute(f"CREATE INDEX {name} ON {schema}.{spec.table} USING btree {columns}")
+        for column, sequence in spec.sequences:
+            cur.execute(f"ALTER SEQUENCE {schema}.{sequence} OWNED BY {schema}.{spec.table}.{column}")
+        cur.execute(f"CREATE TABLE {schema}.{spec.table}_default PARTITION OF {schema}.{spec.table} DEFAULT")
+        if spec.history:
+            cur.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {schema}.{spec.history} (
+                    LIKE {schema}.{old} INCLUDING DEFAULTS,
+                    CONSTRAINT {spec.history}_timestamp_token_pair UNIQUE ("timestamp", token_pair)
+                )
+                """
+            )
+
+        day = min(first or today, today - timedelta(days=spec.retention_days))
+        end = max(last or today, today + timedelta(days=PREMAKE_DAYS))
+        while day <= end:
+            create_partition(cur, spec, day, schema)
+            day += timedelta(days=1)
+        cur.execute(f"INSERT INTO {schema}.{spec.table} SELECT * FROM {schema}.{old}")
+        copied = cur.rowcount
+        # Triggers go back on after the copy so NOTIFY listeners and rollups don't see old rows again
+        for definition, _ in triggers:
+            cur.execute(definition)
+    conn.commit()
+    logging.info(f"🧱 Partitioned {schema}.{spec.table}: {copied} rows copied in {time.perf_counter() - started:.1f}s, "
+                 f"old heap kept as {schema}.{old}")
+
+def maintain(conn, spec, schema="public", today=None):
+    """Create upcoming partitions and apply retention. Returns (created, dropped) partition counts."""
+    today = today or datetime.now().date()
+    cutoff = today - timedelta(days=spec.retention_days)
+    created, dropped = 0, 0
+    with conn.cursor() as cur:
+        if not is_partitioned(cur, spec, schema):
+            logging.warning(f"⚠️ {schema}.{spec.table} is not partitioned yet, run with --migrate")
+            conn.commit()
+            return created, dropped
+        partitions = existing_partitions(cur, spec, schema)
+    conn.commit()
+
+    day = cutoff
+    while day <= today + timedelta(days=PREMAKE_DAYS):
+        if day not in partitions:
+            with conn.cursor() as cur:
+                create_partition(cur, spec, day, schema)
+            conn.commit()
+            created += 1
+        day += timedelta(days=1)
+
+    for day, name in sorted(partitions.items()):
+        if day >= cutoff:
+            continue
+        with conn.cursor() as cur:
+            if spec.history:
+                cur.execute(
+                    f"""
+                    INSERT INTO {schema}.{spec.history} SELECT * FROM {schema}.{name}
+                    WHERE token_pair LIKE ANY(%s)
+                    ON CONFLICT DO NOTHING
+                    """,
+                    (HISTORY_PAIR_PATTERNS,)
+                )
+            cur.execute(f"ALTER TABLE {schema}.{spec.table} DETACH PARTITION {schema}.{name}")
+            cur.execute(f"DROP TABLE {schema}.{name}")
+        conn.commit()
+        dropped += 1
+
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {schema}.{spec.table}_default WHERE {spec.column} < %s", (cutoff.isoformat(),))
+        purged = cur.rowcount
+        for rollup, column in spec.rollups:
+            cur.execute(f"DELETE FROM {schema}.{rollup} WHERE {column} < %s", (cutoff.isoformat(),))
+    conn.commit()
+    if created or dropped or purged:
+        logging.info(f"🗂️ {schema}.{spec.table}: {created} partitions created, {dropped} dropped, {purged} default rows purged")
+    return created, dropped
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prepare", action="store_true", help="add the writers' ON CONFLICT unique indexes to the plain tables, then exit")
+    parser.add_argument("--migrate", action="store_true", help="convert the plain tables to partitioned ones, then exit")
+    parser.add_argument("--once", action="store_true", help="run maintenance once and exit")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_PARAMS)
+    try:
+        if args.prepare:
+            for spec in TABLES:
+                prepare(conn, spec)
+            return
+        if args.migrate:
+            for spec in TABLES:
+                migrate(conn, spec)
+            return
+        while True:
+            for spec in TABLES:
+                try:
+                    maintain(conn, spec)
+                except psycopg2.Error as e:
+                    logging.error(f"🚨 Partition maintenance failed for {spec.table}: {e}")
+                    conn.rollback()
+            if args.once:
+                break
+            time.sleep(MAINTENANCE_INTERVAL)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
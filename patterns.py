@@ -0,0 +1,116 @@
+import numpy as np
+
+# Candlestick patterns over contiguous OHLC arrays. Every detector takes float64 arrays
+# (oldest first) and returns a boolean mask of the same length, so the same code serves a
+# backfill over millions of candles and the newest candle (pass the last few rows, see
+# classify_last). Two-candle patterns are False on the first row.
+
+DOJI_THRESHOLD = 0.002  # body / close, price.py's Doji rule
+DOJI_BODY_RANGE = 0.1  # body / range
+SHADOW_RATIO = 2.0  # hammer / shooting star: long shadow >= 2x body
+SMALL_SHADOW = 0.1  # "no shadow" side, as a fraction of the range
+
+DOJI_NAMES = np.array(['None', 'Neutral Doji', 'Bull Doji', 'Bear Doji'])
+
+def ohlc_arrays(candles):
+    """Contiguous float64 (open, high, low, close) from a list of dicts or a DataFrame."""
+    if hasattr(candles, 'columns'):
+        return tuple(np.ascontiguousarray(candles[col].to_numpy(dtype=np.float64)) for col in ('open', 'high', 'low', 'close'))
+    data = np.array([(c['open'], c['high'], c['low'], c['close']) for c in candles], dtype=np.float64).reshape(-1, 4)
+    return tuple(np.ascontiguousarray(data[:, i]) for i in range(4))
+
+def _parts(o, h, l, c):
+    body = np.abs(c - o)
+    rng = h - l
+    upper = h - np.maximum(o, c)
+    lower = np.minimum(o, c) - l
+    return body, rng, upper, lower
+
+def _ratio(num, den):
+    out = np.full(num.shape, np.inf)
+    np.divide(num, den, out=out, where=den != 0)
+    return out
+
+def _prev(mask):
+    out = np.zeros_like(mask)
+    out[1:] = mask[:-1]
+    return out
+
+def doji(o, h, l, c, threshold=DOJI_THRESHOLD, body_range=DOJI_BODY_RANGE):
+    """price.py's Doji: tiny body relative to close and range, both shadows longer than the body."""
+    body, rng, upper, lower = _parts(o, h, l, c)
+    return (rng > 0) & (_ratio(body, c) < threshold) & (_ratio(body, rng) < body_range) & (upper > body) & (lower > body)
+
+def simple_doji(o, h, l, c, body_range=DOJI_BODY_RANGE):
+    """Loose Doji (price_analyzer.py): body under `body_range` of the range, shadows not checked."""
+    body, rng, _, _ = _parts(o, h, l, c)
+    return _ratio(body, rng) < body_range
+
+def dragonfly_doji(o, h, l, c, body_range=DOJI_BODY_RANGE, small=SMALL_SHADOW):
+    body, rng, upper, lower = _parts(o, h, l, c)
+    return simple_doji(o, h, l, c, body_range) & (_ratio(upper, rng) < small) & (lower > body)
+
+def gravestone_doji(o, h, l, c, body_range=DOJI_BODY_RANGE, small=SMALL_SHADOW):
+    body, rng, upper, lower = _parts(o, h, l, c)
+    return simple_doji(o, h, l, c, body_range) & (_ratio(lower, rng) < small) & (upper > body)
+
+def doji_codes(o, h, l, c, threshold=DOJI_THRESHOLD):
+    """Index into DOJI_NAMES: Bull after a red candle, Bear after a green one, else Neutral."""
+    is_doji = doji(o, h, l, c, threshold)
+    codes = np.zeros(len(o), dtype=np.int8)
+    codes[is_doji] = 1
+    prev_red = _prev(c < o)
+    prev_green = _prev(c > o)
+    codes[is_doji & prev_red] = 2
+    codes[is_doji & prev_green] = 3
+    return codes
+
+def bullish(o, c, is_doji):
+    return (c > o) & ~is_doji
+
+def bearish(o, c, is_doji):
+    return (c < o) & ~is_doji
+
+def bullish_engulfing(o, h, l, c):
+    po, pc = np.roll(o, 1), np.roll(c, 1)
+    mask = (c > o) & (pc < po) & (o < pc) & (c > po)
+    mask[:1] = False
+    return mask
+
+def bearish_engulfing(o, h, l, c):
+    po, pc = np.roll(o, 1), np.roll(c, 1)
+    mask = (c < o) & (pc > po) & (o > pc) & (c < po)
+    mask[:1] = False
+    return mask
+
+def hammer(o, h, l, c, ratio=SHADOW_RATIO, small=SMALL_SHADOW):
+    body, rng, upper, lower = _parts(o, h, l, c)
+    return (body > 0) & (lower >= ratio * body) & (_ratio(upper, rng) < small)
+
+def shooting_star(o, h, l, c, ratio=SHADOW_RATIO, small=SMALL_SHADOW):
+    body, rng, upper, lower = _parts(o, h, l, c)
+    return (body > 0) & (upper >= ratio * body) & (_ratio(lower, rng) < small)
+
+PATTERNS = {
+    'doji': doji,
+    'simple_doji': simple_doji,
+    'dragonfly_doji': dragonfly_doji,
+    'gravestone_doji': gravestone_doji,
+    'bullish_engulfing': bullish_engulfing,
+    'bearish_engulfing': bearish_engulfing,
+    'hammer': hammer,
+    'shooting_star': shooting_star,
+}
+
+def detect_all(o, h, l, c, names=None):
+    return {name: PATTERNS[name](o, h, l, c) for name in (names or PATTERNS)}
+
+def classify_last(o, h, l, c, names=None):
+    """Patterns for the newest candle only; every detector looks back at most one candle."""
+    tail = [np.asarray(a[-2:], dtype=np.float64) for a in (o, h, l, c)]
+    return {name: bool(mask[-1]) for name, mask in detect_all(*tail, names=names).items()}
+
+def doji_type(candle, previous=None, threshold=DOJI_THRESHOLD):
+    """Doji name for one candle dict given the previous one, as stored in candles.doji_type."""
+    rows = [previous, candle] if previous is not None else [candle]
+    return str(DOJI_NAMES[doji_codes(*ohlc_arrays(rows), threshold=threshold)[-1]])
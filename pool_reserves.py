@@ -0,0 +1,217 @@
+import json
+import time
+import queue
+import base64
+import struct
+import asyncio
+import logging
+import threading
+import requests
+import websockets
+
+# Raydium AMM v4 pool price straight from account data: one getMultipleAccounts call for the
+# AMM state and both vaults per sample, no Node process and no Raydium.load.
+
+WSOL_MINT = "So11111111111111111111111111111111111111112"
+RPC_TIMEOUT = 5
+WS_RECONNECT_DELAY = 2
+
+# liquidityStateV4Layout (raydium/src/raydium/liquidity/layout.ts): 32 u64 fields, then the
+# swap counters (u128, u128, u64, u128, u128, u64), then the pubkeys.
+AMM_V4_SIZE = 752
+AMM_BASE_DECIMAL_OFFSET = 4 * 8
+AMM_QUOTE_DECIMAL_OFFSET = 5 * 8
+AMM_BASE_NEED_TAKE_PNL_OFFSET = 24 * 8
+AMM_QUOTE_NEED_TAKE_PNL_OFFSET = 25 * 8
+AMM_BASE_VAULT_OFFSET = 336
+AMM_QUOTE_VAULT_OFFSET = 368
+AMM_BASE_MINT_OFFSET = 400
+AMM_QUOTE_MINT_OFFSET = 432
+# SPL token account: mint (32), owner (32), amount (u64)
+TOKEN_AMOUNT_OFFSET = 64
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+def b58encode(raw):
+    n = int.from_bytes(raw, "big")
+    out = ""
+    while n:
+        n, rem = divmod(n, 58)
+        out = B58_ALPHABET[rem] + out
+    pad = len(raw) - len(raw.lstrip(b"\0"))
+    return "1" * pad + out
+
+def decode_amm_v4(data):
+    if len(data) < AMM_V4_SIZE:
+        raise ValueError(f"AMM v4 account too short: {len(data)} bytes")
+    u64 = lambda offset: struct.unpack_from("<Q", data, offset)[0]
+    key = lambda offset: b58encode(data[offset:offset + 32])
+    return {
+        "base_decimal": u64(AMM_BASE_DECIMAL_OFFSET),
+        "quote_decimal": u64(AMM_QUOTE_DECIMAL_OFFSET),
+        "base_need_take_pnl": u64(AMM_BASE_NEED_TAKE_PNL_OFFSET),
+        "quote_need_take_pnl": u64(AMM_QUOTE_NEED_TAKE_PNL_OFFSET),
+        "base_vault": key(AMM_BASE_VAULT_OFFSET),
+        "quote_vault": key(AMM_QUOTE_VAULT_OFFSET),
+        "base_mint": key(AMM_BASE_MINT_OFFSET),
+        "quote_mint": key(AMM_QUOTE_MINT_OFFSET),
+    }
+
+def decode_token_amount(data):
+    return struct.unpack_from("<Q", data, TOKEN_AMOUNT_OFFSET)[0]
+
+def price_in_sol(amm, base_vault_amount, quote_vault_amount):
+    """SOL per token for a token/WSOL pool, using the same reserves the SDK uses (vault - needTakePnl)."""
+    base = (base_vault_amount - amm["base_need_take_pnl"]) / 10 ** amm["base_decimal"]
+    quote = (quote_vault_amount - amm["quote_need_take_pnl"]) / 10 ** amm["quote_decimal"]
+    if base <= 0 or quote <= 0:
+        return 0.0
+    if amm["base_mint"] == WSOL_MINT:
+        return base / quote
+    if amm["quote_mint"] == WSOL_MINT:
+        return quote / base
+    raise ValueError(f"Pool has no WSOL side: {amm['base_mint']}/{amm['quote_mint']}")
+
+class PoolReserveReader:
+    def __init__(self, rpc_url, pool_address, session=None):
+        self.rpc_url = rpc_url
+        self.pool_address = pool_address
+        self.session = session or requests.Session()
+        self.amm = None
+        self.rpc_calls = 0
+
+    def _get_multiple_accounts(self, addresses):
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "getMultipleAccounts",
+            "params": [addresses, {"encoding": "base64", "commitment": "confirmed"}]
+        }
+        self.rpc_calls += 1
+        response = self.session.post(self.rpc_url, json=payload, timeout=RPC_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        if "result" not in data:
+            raise RuntimeError(f"getMultipleAccounts failed: {data.get('error', 'Unknown error')}")
+        accounts = data["result"]["value"]
+        missing = [a for a, acc in zip(addresses, accounts) if acc is None]
+        if missing:
+            raise RuntimeError(f"Accounts not found: {missing}")
+        return [base64.b64decode(acc["data"][0]) for acc in accounts]
+
+    def load_keys(self):
+        (amm_data,) = self._get_multiple_accounts([self.pool_address])
+        self.amm = decode_amm_v4(amm_data)
+        logging.info(f"Loaded pool {self.pool_address}: base={self.amm['base_mint']} quote={self.amm['quote_mint']}")
+        return self.amm
+
+    def snapshot(self):
+        """One RPC round-trip: AMM state (for needTakePnl) and both raw vault balances."""
+        if self.amm is None:
+            self.load_keys()
+        amm_data, base_data, quote_data = self._get_multiple_accounts(
+            [self.pool_address, self.amm["base_vault"], self.amm["quote_vault"]]
+        )
+        self.amm = decode_amm_v4(amm_data)
+        return self.amm, decode_token_amount(base_data), decode_token_amount(quote_data)
+
+    def sample(self):
+        return price_in_sol(*self.snapshot())
+
+def stream_prices(rpc_url, pool_address, interval=0.5, session=None):
+    """Yield (unix_time, price_in_sol) at most every `interval` seconds, skipping failed samples."""
+    reader = PoolReserveReader(rpc_url, pool_address, session=session)
+    while True:
+        started = time.time()
+        try:
+            price = reader.sample()
+            if price > 0:
+                yield started, price
+        except (requests.exceptions.RequestException, RuntimeError, ValueError) as e:
+            logging.error(f"Pool reserve sample failed for {pool_address}: {e}")
+        time.sleep(max(0.0, interval - (time.time() - started)))
+
+async def subscribe_prices(ws_url, rpc_url, pool_address):
+    """Yield (unix_time, price_in_sol) on every AMM/vault account change pushed over accountSubscribe.
+
+    The vault balances are seeded with one getMultipleAccounts call; after that no RPC request is
+    made per sample. Only changes that move the price are yielded.
+    """
+    amm, base_amount, quote_amount = PoolReserveReader(rpc_url, pool_address).snapshot()
+    accounts = {"amm": pool_address, "base": amm["base_vault"], "quote": amm["quote_vault"]}
+    last_price = None
+    async with websockets.connect(ws_url, ping_interval=20, ping_timeout=60) as ws:
+        pending = {}
+        for request_id, (role, address) in enumerate(accounts.items(), start=1):
+            pending[request_id] = role
+            await ws.send(json.dumps({
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": "accountSubscribe",
+                "params": [address, {"encoding": "base64", "commitment": "confirmed"}]
+            }))
+        subscriptions = {}
+        async for message in ws:
+            msg = json.loads(message)
+            if "id" in msg:
+                if "result" not in msg:
+                    raise RuntimeError(f"accountSubscribe failed: {msg.get('error')}")
+                subscriptions[msg["result"]] = pending.pop(msg["id"])
+                continue
+            if msg.get("method") != "accountNotification":
+                continue
+            role = subscriptions.get(msg["params"]["subscription"])
+            data = base64.b64decode(msg["params"]["result"]["value"]["data"][0])
+            if role == "amm":
+                amm = decode_amm_v4(data)
+            elif role == "base":
+                base_amount = decode_token_amount(data)
+            elif role == "quote":
+                quote_amount = decode_token_amount(data)
+            else:
+                continue
+            price = price_in_sol(amm, base_amount, quote_amount)
+            if price > 0 and price != last_price:
+                last_price = price
+                yield time.time(), price
+
+def iter_subscribed_prices(ws_url, rpc_url, pool_address, heartbeat=None):
+    """Blocking iterator over subscribe_prices(), run on a background event loop with reconnects.
+
+    If `heartbeat` is set, the last price is repeated after that many quiet seconds so consumers
+    that bucket samples by time still see a sample per bucket on an idle pool.
+    """
+    samples = queue.Queue(maxsize=10000)
+    stop = threading.Event()
+
+    async def pump():
+        while not stop.is_set():
+            try:
+                async for sample in subscribe_prices(ws_url, rpc_url, pool_address):
+                    try:
+                        samples.put_nowait(sample)
+                    except queue.Full:
+                        logging.warning("Price sample queue full, dropping sample")
+            except Exception as e:
+                logging.error(f"Pool subscription for {pool_address} dropped: {e}")
+            await asyncio.sleep(WS_RECONNECT_DELAY)
+
+    async def run():
+        task = asyncio.create_task(pump())
+        while not stop.is_set():
+            await asyncio.sleep(1)
+        task.cancel()
+
+    threading.Thread(target=lambda: asyncio.run(run()), daemon=True).start()
+    last = None
+    try:
+        while True:
+            try:
+                last = samples.get(timeout=heartbeat)
+            except queue.Empty:
+                if last is None:
+                    continue
+                last = (time.time(), last[1])
+            yield last
+    finally:
+        stop.set()
@@ -1,11 +1,9 @@
 import os
-import subprocess
 import json
 import time
 import requests
 import logging
 import sys
-import pandas as pd
 import numpy as np
 from decimal import Decimal
 from sqlalchemy import create_engine, Column, Integer, String, Numeric, DateTime
@@ -15,16 +13,27 @@ import datetime
 import backoff
 from sqlalchemy.sql import text
 import traceback
+from pool_reserves import stream_prices, iter_subscribed_prices
+from indicators import IndicatorState
+from patterns import doji_type
+from candles import CandleBuilder, TickCheckpoint, CANDLE_INTERVALS, candle_token_pair, interval_label
 
 # Logging setup
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 # Config
-GET_PRICE_SCRIPT_PATH = "raydium/get_price.ts"
-PRICE_JSON_PATH = "raydium/price.json"
+TARGET_CONSTANTS_FILE = "target_constants.json"
+RPC_ENDPOINT = "https://mainnet.helius-rpc.com/?api-key=479f2b3d-a5e4-4fa0-b7ac-163dc4b14133"
+WS_ENDPOINT = "wss://mainnet.helius-rpc.com/?api-key=479f2b3d-a5e4-4fa0-b7ac-163dc4b14133"
+PRICE_SOURCE = os.getenv("PRICE_SOURCE", "subscribe")  # "subscribe" (accountSubscribe push) or "poll"
+PRICE_CHECKPOINT_PATH = "raydium/price_ticks.jsonl"
+PRICE_CHECKPOINT_ENABLED = os.getenv("PRICE_CHECKPOINT", "1") == "1"
+PRICE_CHECKPOINT_INTERVAL = 30  # seconds between checkpoint appends
 SOL_PRICE_JSON_PATH = "raydium/sol_price.json"
 COINGECKO_API = "https://api.coingecko.com/api/v3/simple/price?ids=solana&vs_currencies=usd"
-UPDATE_INTERVAL = 4  # seconds
+UPDATE_INTERVAL = 4  # seconds, back-off after a main loop error
+PRICE_SAMPLE_INTERVAL = 0.5  # seconds between pool reserve samples (poll mode)
+PRICE_HEARTBEAT_INTERVAL = 4  # repeat last price after this many quiet seconds (subscribe mode)
 DB_HOST = 'localhost'
 DB_PORT = '5432'
 DB_NAME = 'archon_data'
@@ -35,8 +44,14 @@ DOJI_THRESHOLD = 0.002  # 0.2% of close price
 MIN_PRICES_PER_CANDLE = 2
 PRICE_CHANGE_THRESHOLD = 0.005
 SOL_USD_CACHE_TIMEOUT = 600  # Cache SOL/USD for 10 minutes
-CANDLE_INTERVAL_1M_MINUTES = 1
-CANDLE_INTERVAL_1H_MINUTES = 60
+TICK_RETENTION_SECONDS = max(CANDLE_INTERVALS) * 60  # enough to rebuild the longest open candle
+# Rolling indicators per candle series: name -> (kind, window). ma_10/ma_50 are stored on the
+# candle row; "vwap" needs a volume on the candle, which the price feed does not provide yet.
+INDICATORS = {
+    "ma_10": ("sma", 10),
+    "ma_50": ("sma", 50),
+    "ema_20": ("ema", 20),
+}
 
 # SQLAlchemy setup
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
@@ -64,10 +79,12 @@ class Candle(Base):
 last_valid_data = {"ticker": "UNKNOWN", "price": 0.0, "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())}
 last_sol_usd = None
 last_sol_usd_time = 0
-current_candle_key_1m = None
-current_candle_key_1h = None
 db_connected = False
-cached_candlestick_data = pd.DataFrame()
+candle_ticker = None
+last_candles = {}  # token_pair -> last stored candle, for Doji detection
+indicator_states = {}  # token_pair -> IndicatorState
+candle_builder = CandleBuilder(CANDLE_INTERVALS)
+price_checkpoint = TickCheckpoint(PRICE_CHECKPOINT_PATH, PRICE_CHECKPOINT_INTERVAL, TICK_RETENTION_SECONDS) if PRICE_CHECKPOINT_ENABLED else None
 
 # Test database connection
 def test_db_connection():
@@ -82,15 +99,6 @@ def test_db_connection():
         logging.error(f"Failed to connect to database: {e}\n{traceback.format_exc()}")
         logging.info("Continuing without database operations")
 
-# Initialize price.json
-def initialize_price_json():
-    try:
-        with open(PRICE_JSON_PATH, 'w') as f:
-            json.dump({}, f)
-        logging.info(f"Initialized {PRICE_JSON_PATH}")
-    except Exception as e:
-        logging.error(f"Failed to initialize {PRICE_JSON_PATH}: {e}\n{traceback.format_exc()}")
-
 # Initialize sol_price.json
 def initialize_sol_price_json():
     try:
@@ -109,18 +117,6 @@ def initialize_doji_json():
     except Exception as e:
         logging.error(f"Failed to initialize {PROCESSED_DOJIS_FILE}: {e}\n{traceback.format_exc()}")
 
-# Load price.json
-def load_price_json():
-    try:
-        if os.path.exists(PRICE_JSON_PATH):
-            with open(PRICE_JSON_PATH, 'r') as f:
-                data = json.load(f)
-                return data if isinstance(data, dict) else {}
-        return {}
-    except Exception as e:
-        logging.error(f"Failed to load {PRICE_JSON_PATH}: {e}\n{traceback.format_exc()}")
-        return {}
-
 # Load sol_price.json
 def load_sol_price_json():
     try:
@@ -133,33 +129,6 @@ def load_sol_price_json():
         logging.error(f"Failed to load {SOL_PRICE_JSON_PATH}: {e}\n{traceback.format_exc()}")
         return {"sol_usd": 0.0, "timestamp": ""}
 
-# Save price to price.json
-def save_price_to_json(ticker, price_usd, timestamp):
-    try:
-        price_data = load_price_json()
-        candle_key_1m = datetime.datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
-        candle_key_1m = candle_key_1m.replace(second=0)
-        candle_key_1m = candle_key_1m.strftime("%Y-%m-%d %H:%M:00")
-        
-        if candle_key_1m not in price_data:
-            price_data[candle_key_1m] = []
-        price_data[candle_key_1m].append({
-            "token_pair": f"{ticker}/USD",
-            "timestamp": timestamp,
-            "price": float(price_usd)
-        })
-        last_price = last_valid_data.get("price", 0.0)
-        if last_price > 0 and abs(price_usd - last_price) / last_price > PRICE_CHANGE_THRESHOLD:
-            logging.info(f"Whale alert! Price change: ${last_price:.8f} -> ${price_usd:.8f}")
-        
-        with open(PRICE_JSON_PATH, 'w') as f:
-            json.dump(price_data, f, indent=4)
-        logging.debug(f"Saved price: {ticker}, ${price_usd:.8f}, {timestamp}")
-        return candle_key_1m
-    except Exception as e:
-        logging.error(f"Failed to save price to {PRICE_JSON_PATH}: {e}\n{traceback.format_exc()}")
-        return None
-
 # Save SOL/USD price to sol_price.json
 def save_sol_price_to_json(sol_usd, timestamp):
     try:
@@ -173,20 +142,6 @@ def save_sol_price_to_json(sol_usd, timestamp):
     except Exception as e:
         logging.error(f"Failed to save SOL/USD price to {SOL_PRICE_JSON_PATH}: {e}\n{traceback.format_exc()}")
 
-# Clean up old price data
-def cleanup_price_json():
-    try:
-        price_data = load_price_json()
-        current_time = datetime.datetime.utcnow()
-        cutoff = current_time - datetime.timedelta(minutes=CANDLE_INTERVAL_1H_MINUTES * 2)
-        cutoff_str = cutoff.strftime("%Y-%m-%d %H:%M:00")
-        price_data = {k: v for k, v in price_data.items() if k >= cutoff_str}
-        with open(PRICE_JSON_PATH, 'w') as f:
-            json.dump(price_data, f, indent=4)
-        logging.debug(f"Cleaned up {PRICE_JSON_PATH}, kept after {cutoff_str}")
-    except Exception as e:
-        logging.error(f"Failed to clean up {PRICE_JSON_PATH}: {e}\n{traceback.format_exc()}")
-
 # Load processed Doji candles
 def load_processed_dojis():
     try:
@@ -220,281 +175,166 @@ def save_processed_dojis(processed_dojis):
     except Exception as e:
         logging.error(f"Error saving Doji records: {e}\n{traceback.format_exc()}")
 
-# Calculate moving averages from database
-def calculate_moving_averages_from_db(token_pair, timestamp, session):
+# Load the most recent stored candles, oldest first, to seed indicator state
+def load_recent_candles(token_pair, limit, session):
     try:
-        query = session.query(Candle).filter(
-            Candle.token_pair == token_pair,
-            Candle.timestamp <= timestamp
-        ).order_by(Candle.timestamp.desc()).limit(50)
-        candles = query.all()
-        
-        if not candles:
-            return None, None
-        
-        close_prices = [float(candle.close) for candle in candles]
-        ma_10 = sum(close_prices[:10]) / len(close_prices[:10]) if len(close_prices) >= 10 else None
-        ma_50 = sum(close_prices[:50]) / len(close_prices[:50]) if len(close_prices) >= 50 else None
-        
-        return ma_10, ma_50
+        candles = session.query(Candle).filter(
+            Candle.token_pair == token_pair
+        ).order_by(Candle.timestamp.desc()).limit(limit).all()
+        return [{'open': float(c.open), 'high': float(c.high), 'low': float(c.low), 'close': float(c.close)} for c in reversed(candles)]
     except SQLAlchemyError as e:
-        logging.error(f"Error querying candles for MA: {e}\n{traceback.format_exc()}")
-        return None, None
+        session.rollback()
+        logging.error(f"Error querying candles to seed indicators: {e}\n{traceback.format_exc()}")
+        return []
+
+# Rolling indicator state per token pair, seeded from the database the first time the pair closes a candle
+def get_indicator_state(token_pair):
+    state = indicator_states.get(token_pair)
+    if state is None:
+        state = IndicatorState(INDICATORS)
+        seed = load_recent_candles(token_pair, state.lookback, session)
+        state.seed(seed)
+        indicator_states[token_pair] = state
+        logging.info(f"Seeded indicators for {token_pair} from {len(seed)} stored candles")
+    return state
 
 # Detect Doji candles
 def detect_doji_type(current_candle, previous_candle=None):
-    open_price = float(current_candle['open'])
-    close_price = float(current_candle['close'])
-    high_price = float(current_candle['high'])
-    low_price = float(current_candle['low'])
-    
-    body_size = abs(open_price - close_price)
-    range_size = high_price - low_price
-    if range_size == 0:
-        return 'None'
-    
-    if (body_size / close_price < DOJI_THRESHOLD and 
-        body_size / range_size < 0.1 and
-        abs(high_price - max(open_price, close_price)) > body_size and
-        abs(min(open_price, close_price) - low_price) > body_size):
-        if previous_candle is None:
-            return 'Neutral Doji'
-        prev_open = float(previous_candle['open'])
-        prev_close = float(previous_candle['close'])
-        return 'Bull Doji' if prev_close < prev_open else 'Bear Doji' if prev_close > prev_open else 'Neutral Doji'
-    return 'None'
-
-# Process and store candlestick for 1-minute and 1-hour intervals
-def process_and_store_candlestick(candle_key, interval_minutes):
+    return doji_type(current_candle, previous_candle, threshold=DOJI_THRESHOLD)
+
+# Describe a stored candle for the log
+def describe_candle(token_pair, candle_key, new_candle, ma_10, ma_50, doji_type):
+    if doji_type != 'None':
+        emoji = "⚪"
+        candle_type = f"Doji candle ({doji_type})"
+    elif new_candle['close'] > new_candle['open']:
+        emoji = "🟢"
+        candle_type = "Green candle"
+    elif new_candle['close'] < new_candle['open']:
+        emoji = "🔴"
+        candle_type = "Red candle"
+    else:
+        emoji = "⚪"
+        candle_type = "Neutral candle"
+
+    return (
+        f"{emoji} {candle_type} created! "
+        f"Token Pair: {token_pair}, "
+        f"Timestamp: {candle_key}, "
+        f"Open: {new_candle['open']:.8f}, "
+        f"High: {new_candle['high']:.8f}, "
+        f"Low: {new_candle['low']:.8f}, "
+        f"Close: {new_candle['close']:.8f}, "
+        f"MA_10: {'None' if ma_10 is None else f'{ma_10:.8f}'}, "
+        f"MA_50: {'None' if ma_50 is None else f'{ma_50:.8f}'}, "
+        f"Doji Type: {doji_type}"
+    )
+
+# Store every candle closed by one tick in a single transaction
+def store_candles(closed):
     if not db_connected:
-        logging.warning(f"Database not connected, skipping {candle_key} ({interval_minutes}m)")
+        logging.warning(f"Database not connected, skipping {len(closed)} closed candles")
         return
+    ticker = candle_ticker
+    rows = []
+    new_dojis = []
     try:
-        price_data = load_price_json()
-        if candle_key not in price_data or len(price_data[candle_key]) < MIN_PRICES_PER_CANDLE:
-            logging.debug(f"Skipping {candle_key} ({interval_minutes}m): insufficient prices ({len(price_data.get(candle_key, []))})")
+        for interval_minutes, candle in closed:
+            candle_key = candle.key
+            if candle.count < MIN_PRICES_PER_CANDLE:
+                logging.debug(f"Skipping {candle_key} ({interval_minutes}m): insufficient prices ({candle.count})")
+                continue
+
+            token_pair = candle_token_pair(ticker, interval_minutes)
+            new_candle = {'token_pair': token_pair, **candle.as_dict()}
+            logging.debug(f"New candle data: {new_candle}")
+
+            # Indicators over the previous candles, then roll this candle in
+            indicators = get_indicator_state(token_pair)
+            values = indicators.snapshot()
+            indicators.update(new_candle)
+            ma_10, ma_50 = values['ma_10'], values['ma_50']
+            logging.debug(f"Indicators for {token_pair} at {candle_key}: {values}")
+
+            # Detect Doji against the previous candle of the same pair
+            doji_type = detect_doji_type(new_candle, last_candles.get(token_pair))
+            last_candles[token_pair] = new_candle
+
+            rows.append(Candle(
+                token_pair=token_pair,
+                timestamp=new_candle['timestamp'],
+                open=float(new_candle['open']),
+                high=float(new_candle['high']),
+                low=float(new_candle['low']),
+                close=float(new_candle['close']),
+                ma_10=ma_10,
+                ma_50=ma_50,
+                doji_type=doji_type
+            ))
+            logging.info(describe_candle(token_pair, candle_key, new_candle, ma_10, ma_50, doji_type))
+            if doji_type != 'None':
+                new_dojis.append({
+                    'timestamp': candle_key,
+                    'token_pair': token_pair,
+                    'doji_type': doji_type,
+                    'close': float(new_candle['close'])
+                })
+
+        if not rows:
             return
-
-        prices = [p['price'] for p in price_data[candle_key]]
-        token_pair_base = price_data[candle_key][0]['token_pair']
-        token_pair = token_pair_base if interval_minutes == 1 else f"{token_pair_base}_1h"
-        logging.info(f"Processing {interval_minutes}-min candle for {candle_key}, {len(prices)} prices: {prices}")
-
-        new_candle = {
-            'token_pair': token_pair,
-            'timestamp': datetime.datetime.strptime(candle_key, "%Y-%m-%d %H:%M:00"),
-            'open': prices[0],
-            'high': max(prices),
-            'low': min(prices),
-            'close': prices[-1]
-        }
-        logging.debug(f"New candle data: {new_candle}")
-
-        # Calculate MAs from database
-        ma_10, ma_50 = calculate_moving_averages_from_db(token_pair, new_candle['timestamp'], session)
-
-        # Detect Doji or candle type
-        doji_type = 'None'
-        global cached_candlestick_data
-        cached_candlestick_data = pd.concat([cached_candlestick_data, pd.DataFrame([new_candle])], ignore_index=True)
-        current_candle = cached_candlestick_data.iloc[-1]
-        previous_candle = cached_candlestick_data.iloc[-2] if len(cached_candlestick_data) >= 2 else None  # Fixed: Use cached_candlestick_data
-        doji_type = detect_doji_type(current_candle, previous_candle)
-
-        # Store candle first
-        candle = Candle(
-            token_pair=new_candle['token_pair'],
-            timestamp=new_candle['timestamp'],
-            open=float(new_candle['open']),
-            high=float(new_candle['high']),
-            low=float(new_candle['low']),
-            close=float(new_candle['close']),
-            ma_10=ma_10,
-            ma_50=ma_50,
-            doji_type=doji_type
-        )
-        session.add(candle)
+        session.add_all(rows)
         session.commit()
-        logging.info(f"Stored candle for {token_pair} at {candle_key} in database")
-
-        # Determine candle type and print detailed object
-        if doji_type != 'None':
-            emoji = "⚪"
-            candle_type = f"Doji candle ({doji_type})"
-        elif current_candle['close'] > current_candle['open']:
-            emoji = "🟢"
-            candle_type = "Green candle"
-        elif current_candle['close'] < current_candle['open']:
-            emoji = "🔴"
-            candle_type = "Red candle"
-        else:
-            emoji = "⚪"
-            candle_type = "Neutral candle"
-
-        candle_info = (
-            f"{emoji} {candle_type} created! "
-            f"Token Pair: {token_pair}, "
-            f"Timestamp: {candle_key}, "
-            f"Open: {new_candle['open']:.8f}, "
-            f"High: {new_candle['high']:.8f}, "
-            f"Low: {new_candle['low']:.8f}, "
-            f"Close: {new_candle['close']:.8f}, "
-            f"MA_10: {'None' if ma_10 is None else f'{ma_10:.8f}'}, "
-            f"MA_50: {'None' if ma_50 is None else f'{ma_50:.8f}'}, "
-            f"Doji Type: {doji_type}"
-        )
-        logging.info(candle_info)
-
-        # Save Doji to doji.json
-        processed_dojis = load_processed_dojis()
-        if doji_type != 'None' and candle_key not in [d['timestamp'] for d in processed_dojis]:
-            processed_dojis.append({
-                'timestamp': candle_key,
-                'token_pair': token_pair,
-                'doji_type': doji_type,
-                'close': float(new_candle['close'])
-            })
-            save_processed_dojis(processed_dojis)
-
-        # Verify insertion
-        result = session.query(Candle).filter_by(token_pair=token_pair, timestamp=new_candle['timestamp']).first()
-        if result:
-            logging.debug(f"Verified candle in database: {result.__dict__}")
-        else:
-            logging.error(f"Failed to verify candle in database for {token_pair} at {candle_key}")
-
-        if interval_minutes == 1:
-            del price_data[candle_key]
-            with open(PRICE_JSON_PATH, 'w') as f:
-                json.dump(price_data, f, indent=4)
-            logging.debug(f"Removed {candle_key} from {PRICE_JSON_PATH}")
-    except SQLAlchemyError as e:
-        session.rollback()
-        logging.error(f"Error storing candle for {candle_key} ({interval_minutes}m): {e}\n{traceback.format_exc()}")
-    except Exception as e:
-        logging.error(f"Unexpected error for {candle_key} ({interval_minutes}m): {e}\n{traceback.format_exc()}")
-
-# Aggregate 1-minute candles into 1-hour candles
-def aggregate_1h_candles():
-    try:
-        price_data = load_price_json()
-        current_time = datetime.datetime.utcnow()
-        cutoff = current_time - datetime.timedelta(minutes=CANDLE_INTERVAL_1H_MINUTES)
-        candle_keys_1m = sorted([k for k in price_data.keys() if datetime.datetime.strptime(k, "%Y-%m-%d %H:%M:00") <= cutoff])
-        
-        if not candle_keys_1m:
-            return None
-
-        prices_1h = []
-        token_pair_base = None
-        for key in candle_keys_1m:
-            if price_data[key]:
-                token_pair_base = price_data[key][0]['token_pair']
-                prices_1h.extend([p['price'] for p in price_data[key]])
-        
-        if not prices_1h or not token_pair_base:
-            return None
-
-        candle_key_1h = current_time.replace(minute=0, second=0).strftime("%Y-%m-%d %H:00:00")
-        token_pair_1h = f"{token_pair_base}_1h"
-
-        new_candle = {
-            'token_pair': token_pair_1h,
-            'timestamp': datetime.datetime.strptime(candle_key_1h, "%Y-%m-%d %H:00:00"),
-            'open': prices_1h[0],
-            'high': max(prices_1h),
-            'low': min(prices_1h),
-            'close': prices_1h[-1]
-        }
+        logging.info(f"Stored {len(rows)} candles ({', '.join(r.token_pair for r in rows)}) in database")
 
-        # Calculate MAs from database
-        ma_10, ma_50 = calculate_moving_averages_from_db(token_pair_1h, new_candle['timestamp'], session)
-
-        global cached_candlestick_data
-        cached_candlestick_data = pd.concat([cached_candlestick_data, pd.DataFrame([new_candle])], ignore_index=True)
-        
-        doji_type = 'None'
-        current_candle = cached_candlestick_data.iloc[-1]
-        previous_candle = cached_candlestick_data.iloc[-2] if len(cached_candlestick_data) >= 2 else None
-        doji_type = detect_doji_type(current_candle, previous_candle)
-
-        # Store candle first
-        candle = Candle(
-            token_pair=new_candle['token_pair'],
-            timestamp=new_candle['timestamp'],
-            open=float(new_candle['open']),
-            high=float(new_candle['high']),
-            low=float(new_candle['low']),
-            close=float(new_candle['close']),
-            ma_10=ma_10,
-            ma_50=ma_50,
-            doji_type=doji_type
-        )
-        session.add(candle)
-        session.commit()
-        logging.info(f"Stored 1-hour candle for {token_pair_1h} at {candle_key_1h}")
-
-        # Determine candle type and print detailed object
-        if doji_type != 'None':
-            emoji = "⚪"
-            candle_type = f"Doji candle ({doji_type})"
-        elif current_candle['close'] > current_candle['open']:
-            emoji = "🟢"
-            candle_type = "Green candle"
-        elif current_candle['close'] < current_candle['open']:
-            emoji = "🔴"
-            candle_type = "Red candle"
-        else:
-            emoji = "⚪"
-            candle_type = "Neutral candle"
-
-        candle_info = (
-            f"{emoji} {candle_type} created! "
-            f"Token Pair: {token_pair_1h}, "
-            f"Timestamp: {candle_key_1h}, "
-            f"Open: {new_candle['open']:.8f}, "
-            f"High: {new_candle['high']:.8f}, "
-            f"Low: {new_candle['low']:.8f}, "
-            f"Close: {new_candle['close']:.8f}, "
-            f"MA_10: {'None' if ma_10 is None else f'{ma_10:.8f}'}, "
-            f"MA_50: {'None' if ma_50 is None else f'{ma_50:.8f}'}, "
-            f"Doji Type: {doji_type}"
-        )
-        logging.info(candle_info)
-
-        processed_dojis = load_processed_dojis()
-        if doji_type != 'None' and candle_key_1h not in [d['timestamp'] for d in processed_dojis]:
-            processed_dojis.append({
-                'timestamp': candle_key_1h,
-                'token_pair': token_pair_1h,
-                'doji_type': doji_type,
-                'close': float(new_candle['close'])
-            })
+        # Save Dojis to doji.json
+        if new_dojis:
+            processed_dojis = load_processed_dojis()
+            seen = {(d['timestamp'], d.get('token_pair')) for d in processed_dojis}
+            processed_dojis.extend(d for d in new_dojis if (d['timestamp'], d['token_pair']) not in seen)
             save_processed_dojis(processed_dojis)
-
-        return candle_key_1h
     except SQLAlchemyError as e:
         session.rollback()
-        logging.error(f"Error aggregating 1-hour candle: {e}\n{traceback.format_exc()}")
-        return None
+        logging.error(f"Error storing {len(rows)} candles: {e}\n{traceback.format_exc()}")
     except Exception as e:
-        logging.error(f"Unexpected error aggregating 1-hour candle: {e}\n{traceback.format_exc()}")
-        return None
-
-# Load last valid price
+        logging.error(f"Unexpected error storing candles: {e}\n{traceback.format_exc()}")
+
+# Record a tick: checkpoint and open candles; closed candles go to the on_close listeners
+def record_tick(ticker, price_usd, ts):
+    global candle_ticker
+    if ticker != candle_ticker:
+        if candle_ticker is not None:
+            logging.info(f"Target switched {candle_ticker} -> {ticker}, discarding open candles")
+        candle_builder.open.clear()
+        candle_ticker = ticker
+
+    last_price = last_valid_data.get("price", 0.0)
+    if last_price > 0 and abs(price_usd - last_price) / last_price > PRICE_CHANGE_THRESHOLD:
+        logging.info(f"Whale alert! Price change: ${last_price:.8f} -> ${price_usd:.8f}")
+    last_valid_data.update({"ticker": ticker, "price": price_usd, "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts))})
+
+    if price_checkpoint:
+        price_checkpoint.record(f"{ticker}/USD", ts, price_usd)
+    return candle_builder.add_tick(ts, price_usd)
+
+# Restore the open candles from the checkpoint after a restart
 def load_last_valid_price():
-    global last_valid_data
+    global candle_ticker
+    if not price_checkpoint:
+        return
     try:
-        price_data = load_price_json()
-        for minute, prices in sorted(price_data.items(), reverse=True):
-            if prices and isinstance(prices, list) and prices[0].get("price", 0.0) > 0:
-                last_valid_data = {
-                    "ticker": prices[0]["token_pair"].split("/")[0],
-                    "price": prices[0]["price"],
-                    "timestamp": prices[0]["timestamp"]
-                }
-                logging.info(f"Loaded last valid price: ${last_valid_data['price']:.8f} for {last_valid_data['ticker']}")
-                break
+        ticks = price_checkpoint.load()
+        if not ticks:
+            return
+        token_pair = ticks[-1]["token_pair"]
+        candle_ticker = token_pair.split("/")[0]
+        recovered = 0
+        for tick in ticks:
+            if tick["token_pair"] == token_pair:
+                candle_builder.add_tick(tick["ts"], tick["price"])
+                recovered += 1
+        last_valid_data.update({"ticker": candle_ticker, "price": ticks[-1]["price"], "timestamp": ticks[-1]["timestamp"]})
+        price_checkpoint.compact()
+        logging.info(f"Recovered {recovered} ticks from {PRICE_CHECKPOINT_PATH}, last price ${last_valid_data['price']:.8f} for {candle_ticker}")
     except Exception as e:
         logging.error(f"Failed to load last valid price: {e}\n{traceback.format_exc()}")
 
@@ -522,66 +362,63 @@ def get_sol_usd_price():
             return last_sol_usd
         raise Exception("No cached SOL/USD price available")
 
-# Fetch token price in USD
-def get_price_in_usd():
-    try:
-        result = subprocess.run(
-            ["ts-node", GET_PRICE_SCRIPT_PATH],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        price_data = json.loads(result.stdout.strip())
-        ticker = price_data["ticker"]
-        token_price_in_sol = 1 / price_data["priceInSol"] if price_data["priceInSol"] > 0 else 0
-        sol_usd = get_sol_usd_price()
-        token_price_in_usd = token_price_in_sol * sol_usd
-        logging.info(f"Price: {ticker} = {token_price_in_sol:.8f} SOL, ${token_price_in_usd:.8f} USD")
-        return ticker, token_price_in_usd
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Raydium price fetch failed: {e.stderr}\n{traceback.format_exc()}")
-        return None, None
-    except Exception as e:
-        logging.error(f"Price fetch error: {e}\n{traceback.format_exc()}")
-        return None, None
+# Load target token from target_constants.json
+def load_target_token():
+    with open(TARGET_CONSTANTS_FILE, 'r') as f:
+        return json.load(f)["target_token"]
+
+# Stream (ticker, USD price, observation time) from pool reserves, restarting on a target switch
+def price_stream():
+    while True:
+        token = load_target_token()
+        constants_mtime = os.path.getmtime(TARGET_CONSTANTS_FILE)
+        ticker = token["ticker"]
+        if PRICE_SOURCE == "subscribe":
+            logging.info(f"Subscribing to {ticker} pool {token['pair_address']} reserves via {WS_ENDPOINT.split('?')[0]}")
+            samples = iter_subscribed_prices(WS_ENDPOINT, RPC_ENDPOINT, token["pair_address"], heartbeat=PRICE_HEARTBEAT_INTERVAL)
+        else:
+            logging.info(f"Polling {ticker} pool {token['pair_address']} reserves every {PRICE_SAMPLE_INTERVAL}s")
+            samples = stream_prices(RPC_ENDPOINT, token["pair_address"], PRICE_SAMPLE_INTERVAL)
+        for sample_ts, token_price_in_sol in samples:
+            try:
+                sol_usd = get_sol_usd_price()
+            except Exception as e:
+                logging.error(f"SOL/USD unavailable, dropping sample: {e}")
+                continue
+            token_price_in_usd = token_price_in_sol * sol_usd
+            logging.debug(f"Price: {ticker} = {token_price_in_sol:.8f} SOL, ${token_price_in_usd:.8f} USD")
+            yield ticker, token_price_in_usd, sample_ts
+            if os.path.getmtime(TARGET_CONSTANTS_FILE) != constants_mtime:
+                logging.info("target_constants.json changed, reloading target token")
+                samples.close()
+                break
 
 # Main loop
 def save_price_and_process_candlesticks():
-    global current_candle_key_1m, current_candle_key_1h
-    logging.info("Starting price fetcher for 1-min and 1-hour candles")
-    initialize_price_json()
+    logging.info(f"Starting price fetcher for {', '.join(interval_label(i) for i in CANDLE_INTERVALS)} candles")
     initialize_sol_price_json()
     initialize_doji_json()
     load_last_valid_price()
     test_db_connection()
+    if db_connected and candle_ticker:
+        for interval_minutes in CANDLE_INTERVALS:
+            get_indicator_state(candle_token_pair(candle_ticker, interval_minutes))
+    candle_builder.on_close(store_candles)
 
     while True:
         try:
-            ticker, price_usd = get_price_in_usd()
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
-            if ticker and price_usd and price_usd > 0:
-                candle_key_1m = save_price_to_json(ticker, price_usd, timestamp)
-                if candle_key_1m:
-                    new_candle_key_1m = datetime.datetime.utcnow().replace(second=0).strftime("%Y-%m-%d %H:%M:00")
-                    new_candle_key_1h = datetime.datetime.utcnow().replace(minute=0, second=0).strftime("%Y-%m-%d %H:00:00")
-                    
-                    if current_candle_key_1m and current_candle_key_1m != new_candle_key_1m:
-                        logging.info(f"New 1-min candle: {new_candle_key_1m}. Processing {current_candle_key_1m}")
-                        process_and_store_candlestick(current_candle_key_1m, CANDLE_INTERVAL_1M_MINUTES)
-                    
-                    if current_candle_key_1h and current_candle_key_1h != new_candle_key_1h:
-                        logging.info(f"New 1-hour candle: {new_candle_key_1h}. Aggregating 1-min candles")
-                        aggregate_1h_candles()
-                    
-                    current_candle_key_1m = new_candle_key_1m
-                    current_candle_key_1h = new_candle_key_1h
-                cleanup_price_json()
-            else:
-                logging.warning(f"Invalid price data: ticker={ticker}, price={price_usd}")
-            time.sleep(UPDATE_INTERVAL)
+            for ticker, price_usd, ts in price_stream():
+                if ticker and price_usd and price_usd > 0:
+                    # Bucket by when the reserves were observed, not when this loop got to them
+                    record_tick(ticker, price_usd, ts)
+                else:
+                    logging.warning(f"Invalid price data: ticker={ticker}, price={price_usd}")
         except Exception as e:
             logging.error(f"Error in main loop: {e}\n{traceback.format_exc()}")
             time.sleep(UPDATE_INTERVAL)
+        finally:
+            if price_checkpoint:
+                price_checkpoint.flush()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,123 @@
+import base64
+import binascii
+import struct
+from collections import namedtuple
+import numpy as np
+from pool_reserves import WSOL_MINT, decode_amm_v4
+
+# Raydium AMM v4 writes a "ray_log" line per instruction: base64 of a packed little-endian
+# struct whose first byte is the event type (raydium-amm program/src/log.rs). The swap events
+# carry the exact amounts in and out, the direction and the pool reserves the swap was priced
+# against, so trades and the post-swap price come from one log line instead of diffing the
+# transaction's token balances.
+
+RAY_LOG_PREFIX = "Program log: ray_log: "
+LOG_SWAP_BASE_IN = 3  # amount_in, minimum_out, direction, user_source, pool_coin, pool_pc, out_amount
+LOG_SWAP_BASE_OUT = 4  # max_in, amount_out, direction, user_source, pool_coin, pool_pc, deduct_in
+SWAP_LOG_TYPES = (LOG_SWAP_BASE_IN, LOG_SWAP_BASE_OUT)
+DIRECTION_PC_TO_COIN = 1
+DIRECTION_COIN_TO_PC = 2
+
+SWAP_LOG = struct.Struct("<B7Q")
+SWAP_DTYPE = np.dtype([("log_type", "u1"), ("a", "<u8"), ("b", "<u8"), ("direction", "<u8"), ("user_source", "<u8"),
+                       ("pool_coin", "<u8"), ("pool_pc", "<u8"), ("c", "<u8")])
+
+class SwapEvent(namedtuple("SwapEvent", "log_type amount_in amount_out direction pool_coin pool_pc")):
+    """One decoded swap; pool_coin/pool_pc are the reserves before it (take-PnL excluded)."""
+
+    @property
+    def coin_to_pc(self):
+        return self.direction == DIRECTION_COIN_TO_PC
+
+    def reserves_after(self):
+        if self.coin_to_pc:
+            return self.pool_coin + self.amount_in, self.pool_pc - self.amount_out
+        return self.pool_coin - self.amount_out, self.pool_pc + self.amount_in
+
+def _swap_from_fields(log_type, a, b, direction, pool_coin, pool_pc, c):
+    if log_type == LOG_SWAP_BASE_IN:
+        return SwapEvent(log_type, a, c, direction, pool_coin, pool_pc)
+    return SwapEvent(log_type, c, b, direction, pool_coin, pool_pc)
+
+def decode_swap(payload):
+    """SwapEvent for a ray_log payload (the base64 after the prefix), None if it is not a swap."""
+    try:
+        raw = base64.b64decode(payload)
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) < SWAP_LOG.size or raw[0] not in SWAP_LOG_TYPES:
+        return None
+    log_type, a, b, direction, _, pool_coin, pool_pc, c = SWAP_LOG.unpack_from(raw)
+    return _swap_from_fields(log_type, a, b, direction, pool_coin, pool_pc, c)
+
+def swap_events(logs):
+    """Every swap event in a transaction's log messages, in order."""
+    events = []
+    for log in logs:
+        if log.startswith(RAY_LOG_PREFIX):
+            event = decode_swap(log[len(RAY_LOG_PREFIX):])
+            if event is not None:
+                events.append(event)
+    return events
+
+def decode_swaps(payloads):
+    """Vectorised decode of many ray_log payloads; non-swaps are skipped.
+
+    Returns a dict of equal-length NumPy arrays (log_type, amount_in, amount_out, direction,
+    pool_coin, pool_pc) and "index", the position of each swap in `payloads`.
+    """
+    raws, index = [], []
+    for i, payload in enumerate(payloads):
+        try:
+            raw = base64.b64decode(payload)
+        except (binascii.Error, ValueError):
+            continue
+        if len(raw) >= SWAP_LOG.size and raw[0] in SWAP_LOG_TYPES:
+            raws.append(raw[:SWAP_LOG.size])
+            index.append(i)
+    records = np.frombuffer(b"".join(raws), dtype=SWAP_DTYPE)
+    base_in = records["log_type"] == LOG_SWAP_BASE_IN
+    return {
+        "index": np.array(index, dtype=np.int64),
+        "log_type": records["log_type"],
+        "amount_in": np.where(base_in, records["a"], records["c"]),
+        "amount_out": np.where(base_in, records["c"], records["b"]),
+        "direction": records["direction"],
+        "pool_coin": records["pool_coin"],
+        "pool_pc": records["pool_pc"],
+    }
+
+class SwapPool:
+    """Which side of a token/WSOL AMM v4 pool is the token, and the decimals of both sides."""
+
+    def __init__(self, amm, token_mint):
+        if amm["base_mint"] == token_mint and amm["quote_mint"] == WSOL_MINT:
+            self.token_is_coin = True
+        elif amm["quote_mint"] == token_mint and amm["base_mint"] == WSOL_MINT:
+            self.token_is_coin = False
+        else:
+            raise ValueError(f"Pool {amm['base_mint']}/{amm['quote_mint']} is not {token_mint}/WSOL")
+        self.token_mint = token_mint
+        coin_decimals, pc_decimals = amm["base_decimal"], amm["quote_decimal"]
+        self.token_scale = 10 ** (coin_decimals if self.token_is_coin else pc_decimals)
+        self.sol_scale = 10 ** (pc_decimals if self.token_is_coin else coin_decimals)
+
+    def trade(self, event):
+        """(trade_type, token_amount, sol_amount, price_after) with price in SOL per token."""
+        coin_after, pc_after = event.reserves_after()
+        if self.token_is_coin:
+            buy = not event.coin_to_pc
+            token_reserve, sol_reserve = coin_after, pc_after
+        else:
+            buy = event.coin_to_pc
+            token_reserve, sol_reserve = pc_after, coin_after
+        token_raw, sol_raw = (event.amount_out, event.amount_in) if buy else (event.amount_in, event.amount_out)
+        price = (sol_reserve / self.sol_scale) / (token_reserve / self.token_scale) if token_reserve > 0 else 0.0
+        return ("buy" if buy else "sell"), token_raw / self.token_scale, sol_raw / self.sol_scale, price
+
+async def fetch_pool(rpc, pool_address, token_mint):
+    """SwapPool for `pool_address` via a solana_rpc.SolanaRpc client."""
+    result = await rpc.call("getAccountInfo", [pool_address, {"encoding": "base64"}])
+    if not result or not result.get("value"):
+        raise ValueError(f"Pool account {pool_address} not found")
+    return SwapPool(decode_amm_v4(base64.b64decode(result["value"]["data"][0])), token_mint)
@@ -0,0 +1,256 @@
+import { Raydium, TxVersion } from '@raydium-io/raydium-sdk-v2';
+import { Connection, Keypair, LAMPORTS_PER_SOL, PublicKey } from '@solana/web3.js';
+import BN from 'bn.js';
+import fs from 'fs';
+import path from 'path';
+import readline from 'readline';
+
+// Resident swap worker: loads the Raydium SDK, connection, wallet and pool state once and then
+// serves newline-delimited JSON requests on stdin, one JSON response per line on stdout.
+//
+//   -> {"id": 1, "op": "swap", "amount": 0.01, "is_buy": true, "mint": "...", "slippage": 0.005}
+//   <- {"id": 1, "ok": true, "txid": "...", "price": 0.0123, "expected_out": ..., "timings": {...}}
+//
+// Supported ops: ping, quote (build but do not send), swap, refresh (force a pool refetch).
+// A swap with "confirm": false returns as soon as the transaction is sent, with the
+// blockhash's last_valid_block_height, and leaves confirmation to the caller.
+
+// Config
+const RPC_ENDPOINT = 'https://mainnet.helius-rpc.com/?api-key=479f2b3d-a5e4-4fa0-b7ac-163dc4b14133';
+const TARGET_CONSTANTS_PATH = path.resolve(__dirname, '../target_constants.json');
+const WALLET_PATH = path.resolve(__dirname, '../wallet.json');
+const COMMITMENT = 'confirmed';
+const WSOL_MINT = 'So11111111111111111111111111111111111111112';
+const POOL_REFRESH_MS = 1000;
+const POOL_MAX_AGE_MS = 3000;
+
+// Everything the SDK (or anything else) prints goes to stderr so stdout stays a clean protocol channel.
+console.log = console.error;
+console.info = console.error;
+console.debug = console.error;
+
+interface TargetConstants {
+    target_token: {
+        pair_address: string;
+        mint_address: string;
+        ticker: string;
+    };
+}
+
+interface PoolState {
+    poolId: string;
+    poolInfo: any;
+    poolKeys: any;
+    fetchedAt: number;
+}
+
+interface WorkerRequest {
+    id?: number | string;
+    op: string;
+    amount?: number;
+    is_buy?: boolean;
+    mint?: string;
+    slippage?: number;
+    confirm?: boolean;
+}
+
+let constants: TargetConstants;
+let constantsMtime = 0;
+let connection: Connection;
+let wallet: Keypair;
+let raydium: Raydium;
+let pool: PoolState | undefined;
+let poolRefresh: Promise<PoolState> | undefined;
+
+function send(message: object): void {
+    process.stdout.write(`${JSON.stringify(message)}\n`);
+}
+
+function loadConstants(): TargetConstants {
+    const mtime = fs.statSync(TARGET_CONSTANTS_PATH).mtimeMs;
+    if (constants && mtime === constantsMtime) return constants;
+    const data = JSON.parse(fs.readFileSync(TARGET_CONSTANTS_PATH, 'utf8')) as TargetConstants;
+    if (!data.target_token?.pair_address || !data.target_token?.mint_address || !data.target_token?.ticker) {
+        throw new Error('Missing required fields in target_constants.json');
+    }
+    constants = data;
+    constantsMtime = mtime;
+    return constants;
+}
+
+function loadWallet(): Keypair {
+    const secretKey = Buffer.from(JSON.parse(fs.readFileSync(WALLET_PATH, 'utf8')));
+    return Keypair.fromSecretKey(secretKey);
+}
+
+async function fetchPool(poolId: string): Promise<PoolState> {
+    const { poolInfo, poolKeys } = await raydium.liquidity.getPoolInfoFromRpc({ poolId });
+    pool = { poolId, poolInfo, poolKeys, fetchedAt: Date.now() };
+    return pool;
+}
+
+// Collapse concurrent refreshes (background timer + request) into a single RPC round-trip.
+function refreshPool(poolId: string): Promise<PoolState> {
+    if (!poolRefresh) {
+        poolRefresh = fetchPool(poolId).finally(() => {
+            poolRefresh = undefined;
+        });
+    }
+    return poolRefresh;
+}
+
+async function currentPool(): Promise<PoolState> {
+    const poolId = loadConstants().target_token.pair_address;
+    if (!pool || pool.poolId !== poolId || Date.now() - pool.fetchedAt > POOL_MAX_AGE_MS) {
+        return refreshPool(poolId);
+    }
+    return pool;
+}
+
+async function getTokenBalance(mint: string): Promise<number> {
+    const tokenAccounts = await connection.getTokenAccountsByOwner(wallet.publicKey, { mint: new PublicKey(mint) });
+    if (tokenAccounts.value.length === 0) return 0;
+    const accountInfo = await connection.getTokenAccountBalance(tokenAccounts.value[0].pubkey);
+    return accountInfo.value.uiAmount || 0;
+}
+
+async function buildSwap(req: WorkerRequest) {
+    const { target_token } = loadConstants();
+    const amountIn = Number(req.amount);
+    const isBuy = Boolean(req.is_buy);
+    const slippage = req.slippage ?? 0.005;
+    if (!(amountIn > 0)) throw new Error(`Invalid amount: ${req.amount}`);
+    if (req.mint && req.mint !== target_token.mint_address) {
+        throw new Error(`Token mint mismatch: expected ${target_token.mint_address}, got ${req.mint}`);
+    }
+
+    const t0 = Date.now();
+    const { poolInfo, poolKeys, fetchedAt } = await currentPool();
+    const t1 = Date.now();
+
+    const inputMint = isBuy ? WSOL_MINT : target_token.mint_address;
+    const decimalsIn = isBuy ? 9 : 6; // SOL: 9, token: 6
+    const decimalsOut = isBuy ? 6 : 9;
+    const amountInLamports = new BN(Math.floor(amountIn * Math.pow(10, decimalsIn)));
+    // Price in token/SOL for consistency with the Python side
+    const poolPrice = isBuy ? poolInfo.price : 1 / poolInfo.price;
+    const expectedOut = amountIn * poolPrice;
+    const minAmountOutRaw = expectedOut * (1 - slippage);
+    const minAmountOut = new BN(minAmountOutRaw > 0 ? Math.floor(minAmountOutRaw * Math.pow(10, decimalsOut)) : 0);
+
+    const { transaction } = await raydium.liquidity.swap({
+        poolInfo,
+        poolKeys,
+        inputMint,
+        amountIn: amountInLamports,
+        amountOut: minAmountOut,
+        fixedSide: 'in',
+        txVersion: TxVersion.LEGACY,
+    });
+    const t2 = Date.now();
+
+    return {
+        transaction,
+        isBuy,
+        amountIn,
+        inputMint,
+        result: {
+            ticker: target_token.ticker,
+            price: poolInfo.price,
+            pool_age_ms: t1 - fetchedAt,
+            expected_out: expectedOut,
+            min_out: minAmountOut.toString(),
+            pool: { id: poolInfo.id, mintA: poolInfo.mintA?.address, mintB: poolInfo.mintB?.address, price: poolInfo.price },
+            timings: { pool_ms: t1 - t0, build_ms: t2 - t1 },
+        },
+    };
+}
+
+async function handleSwap(req: WorkerRequest, dryRun: boolean) {
+    const built = await buildSwap(req);
+    if (dryRun) return built.result;
+
+    // Balance check
+    if (built.isBuy) {
+        const solBalance = (await connection.getBalance(wallet.publicKey)) / LAMPORTS_PER_SOL;
+        if (solBalance < built.amountIn) throw new Error(`Insufficient SOL balance: ${solBalance} < ${built.amountIn}`);
+    } else {
+        const tokenBalance = await getTokenBalance(built.inputMint);
+        if (tokenBalance < built.amountIn) {
+            throw new Error(`Insufficient token balance: ${tokenBalance} < ${built.amountIn}`);
+        }
+    }
+
+    const t0 = Date.now();
+    const { blockhash, lastValidBlockHeight } = await connection.getLatestBlockhash(COMMITMENT);
+    const transaction = built.transaction;
+    transaction.recentBlockhash = blockhash;
+    transaction.sign(wallet);
+    const txid = await connection.sendRawTransaction(transaction.serialize(), {
+        skipPreflight: false,
+        preflightCommitment: COMMITMENT,
+    });
+    const t1 = Date.now();
+    if (req.confirm === false) {
+        return { ...built.result, txid, last_valid_block_height: lastValidBlockHeight, timings: { ...built.result.timings, send_ms: t1 - t0 } };
+    }
+    await connection.confirmTransaction({ signature: txid, blockhash, lastValidBlockHeight }, COMMITMENT);
+    const t2 = Date.now();
+
+    return { ...built.result, txid, timings: { ...built.result.timings, send_ms: t1 - t0, confirm_ms: t2 - t1 } };
+}
+
+async function handle(req: WorkerRequest): Promise<object> {
+    switch (req.op) {
+        case 'ping':
+            return { pool_age_ms: pool ? Date.now() - pool.fetchedAt : null };
+        case 'refresh': {
+            const { poolInfo } = await refreshPool(loadConstants().target_token.pair_address);
+            return { price: poolInfo.price };
+        }
+        case 'quote':
+            return handleSwap(req, true);
+        case 'swap':
+            return handleSwap(req, false);
+        default:
+            throw new Error(`Unknown op: ${req.op}`);
+    }
+}
+
+async function main(): Promise<void> {
+    const t0 = Date.now();
+    const { target_token } = loadConstants();
+    connection = new Connection(RPC_ENDPOINT, COMMITMENT);
+    wallet = loadWallet();
+    raydium = await Raydium.load({ connection, owner: wallet, cluster: 'mainnet' });
+    await refreshPool(target_token.pair_address);
+
+    // Keep reserves warm so a swap never waits on a cold pool fetch.
+    setInterval(() => {
+        refreshPool(loadConstants().target_token.pair_address).catch((e) => console.error(`Pool refresh failed: ${e}`));
+    }, POOL_REFRESH_MS).unref();
+
+    send({ event: 'ready', ticker: target_token.ticker, wallet: wallet.publicKey.toBase58(), startup_ms: Date.now() - t0 });
+
+    const rl = readline.createInterface({ input: process.stdin, terminal: false });
+    rl.on('line', (line) => {
+        if (!line.trim()) return;
+        let req: WorkerRequest;
+        try {
+            req = JSON.parse(line);
+        } catch (e) {
+            send({ ok: false, error: `Invalid request: ${e}` });
+            return;
+        }
+        const started = Date.now();
+        handle(req)
+            .then((result) => send({ id: req.id, ok: true, ...result, elapsed_ms: Date.now() - started }))
+            .catch((error) => send({ id: req.id, ok: false, error: String(error?.message ?? error), elapsed_ms: Date.now() - started }));
+    });
+    rl.on('close', () => process.exit(0));
+}
+
+main().catch((error) => {
+    send({ event: 'fatal', error: String(error?.message ?? error) });
+    process.exit(1);
+});
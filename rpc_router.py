@@ -0,0 +1,225 @@
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+
+# JSON-RPC router over several Solana endpoints. Every endpoint keeps a rolling latency and
+# error/429 record and a token-bucket rate budget; each call goes to the healthiest endpoint
+# with budget left and fails over to the next one on errors. Latency-critical calls can be
+# hedged: if the first endpoint has not answered within its usual latency, the same request
+# goes to the runner-up and the first answer wins.
+
+RPC_TIMEOUT = 5
+OUTCOME_WINDOW = 50  # recent calls kept per endpoint for the error and 429 rates
+LATENCY_WINDOW = 20  # recent successful latencies; the median is robust to a slow tail
+LATENCY_MIN_SAMPLES = 3  # endpoints with fewer samples rank as unmeasured and get tried first
+PROBE_INTERVAL = 5.0  # an endpoint idle this long gets the next call, so its stats stay current
+ERROR_PENALTY = 10.0  # score = latency * (1 + ERROR_PENALTY * error_rate)
+RATE_LIMIT_COOLDOWN_MIN = 1.0
+RATE_LIMIT_COOLDOWN_MAX = 30.0
+HEDGE_DELAY_FACTOR = 1.5  # hedge once the primary is this many times slower than its median
+HEDGE_DELAY_MIN = 0.02
+HEDGE_DELAY_MAX = 0.5
+
+class RpcError(Exception):
+    pass
+
+class RateLimited(RpcError):
+    pass
+
+class TokenBucket:
+    """`rate` tokens per second, up to `burst` banked. Thread-safe; usable from sync or async code."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _fill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, count=1):
+        with self.lock:
+            self._fill(time.monotonic())
+            if self.tokens >= count:
+                self.tokens -= count
+                return True
+            return False
+
+    def delay(self, count=1):
+        """Seconds until `count` tokens are available (0 if they are available now)."""
+        with self.lock:
+            self._fill(time.monotonic())
+            return 0.0 if self.tokens >= count else (count - self.tokens) / self.rate
+
+class Endpoint:
+    def __init__(self, url, rate=10.0, burst=None, name=None):
+        self.url = url
+        self.name = name or url.split("//")[-1].split("/")[0].split("?")[0]
+        self.budget = TokenBucket(rate, burst)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.last_used = 0.0
+        self.outcomes = deque(maxlen=OUTCOME_WINDOW)  # "ok" | "error" | "429"
+        self.cooldown_until = 0.0
+        self.cooldown = RATE_LIMIT_COOLDOWN_MIN
+        self.calls = 0
+        self.hedged_wins = 0
+        self.lock = threading.Lock()
+
+    def record(self, outcome, elapsed=None):
+        with self.lock:
+            self.calls += 1
+            self.last_used = time.monotonic()
+            self.outcomes.append(outcome)
+            if outcome == "ok":
+                self.latencies.append(elapsed)
+                self.cooldown = RATE_LIMIT_COOLDOWN_MIN
+            elif outcome == "429":
+                # Back off this endpoint with jitter so a shared limit is not hit in lockstep
+                self.cooldown_until = time.monotonic() + self.cooldown * random.uniform(0.5, 1.0)
+                self.cooldown = min(self.cooldown * 2, RATE_LIMIT_COOLDOWN_MAX)
+
+    @property
+    def latency(self):
+        """Median of the recent successful calls in seconds, None before the first one."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[len(ordered) // 2]
+
+    def rate(self, outcome):
+        return self.outcomes.count(outcome) / len(self.outcomes) if self.outcomes else 0.0
+
+    def score(self):
+        # Unmeasured endpoints look fast so each gets a few tries early
+        latency = self.latency if len(self.latencies) >= LATENCY_MIN_SAMPLES else 0.0
+        return latency * (1 + ERROR_PENALTY * (self.rate("error") + self.rate("429")))
+
+    def available(self, now):
+        return now >= self.cooldown_until
+
+    def snapshot(self):
+        return {
+            "calls": self.calls,
+            "latency_ms": round(self.latency * 1000, 2) if self.latency is not None else None,
+            "error_rate": round(self.rate("error"), 3),
+            "rate_limited": round(self.rate("429"), 3),
+            "cooling_down": not self.available(time.monotonic()),
+            "hedged_wins": self.hedged_wins
+        }
+
+class RpcRouter:
+    def __init__(self, endpoints, timeout=RPC_TIMEOUT):
+        self.endpoints = [e if isinstance(e, Endpoint) else Endpoint(e) for e in endpoints]
+        if not self.endpoints:
+            raise ValueError("RpcRouter needs at least one endpoint")
+        self.timeout = timeout
+        self.local = threading.local()  # one keep-alive session per thread
+        self.hedge_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rpc-hedge")
+        self.hedges = 0
+
+    def _session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def ranked(self):
+        """Endpoints best-first: available ones by score, then those cooling down after a 429.
+
+        An available endpoint that has not been used for PROBE_INTERVAL goes first once, so a
+        recovered or once-slow endpoint gets a chance to win its traffic back.
+        """
+        now = time.monotonic()
+        return sorted(self.endpoints, key=lambda e: (not e.available(now), now - e.last_used < PROBE_INTERVAL, e.score()))
+
+    def _send(self, endpoint, payload):
+        started = time.monotonic()
+        try:
+            response = self._session().post(endpoint.url, json=payload, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            endpoint.record("error")
+            raise RpcError(f"{endpoint.name}: {e}")
+        if response.status_code == 429:
+            endpoint.record("429")
+            raise RateLimited(f"{endpoint.name}: 429 Too Many Requests")
+        if response.status_code >= 500:
+            endpoint.record("error")
+            raise RpcError(f"{endpoint.name}: HTTP {response.status_code}")
+        try:
+            data = response.json()
+        except ValueError as e:
+            endpoint.record("error")
+            raise RpcError(f"{endpoint.name}: invalid JSON: {e}")
+        if isinstance(data, dict) and data.get("error", {}).get("code") == 429:
+            endpoint.record("429")
+            raise RateLimited(f"{endpoint.name}: {data['error'].get('message')}")
+        endpoint.record("ok", time.monotonic() - started)
+        return data
+
+    def _acquire(self, candidates):
+        """First candidate with budget left, waiting for the soonest token if all are spent."""
+        while True:
+            for endpoint in candidates:
+                if endpoint.budget.try_acquire():
+                    return endpoint
+            time.sleep(min(e.budget.delay() for e in candidates))
+
+    def _post_failover(self, payload, skip=None):
+        errors = []
+        candidates = [e for e in self.ranked() if e is not skip] or self.ranked()
+        while candidates:
+            endpoint = self._acquire(candidates)
+            candidates.remove(endpoint)
+            try:
+                return endpoint, self._send(endpoint, payload)
+            except RpcError as e:
+                errors.append(str(e))
+        raise RpcError(f"All RPC endpoints failed: {'; '.join(errors)}")
+
+    def _post_hedged(self, payload):
+        primary = self._acquire(self.ranked())
+        first = self.hedge_pool.submit(self._send, primary, payload)
+        delay = min(HEDGE_DELAY_MAX, max(HEDGE_DELAY_MIN, (primary.latency or HEDGE_DELAY_MAX) * HEDGE_DELAY_FACTOR))
+        done, _ = wait([first], timeout=delay)
+        if done and first.exception() is None:
+            return first.result()
+        # Primary is slow or failed: race the rest of the endpoints against it
+        self.hedges += 1
+        second = self.hedge_pool.submit(self._post_failover, payload, primary)
+        pending = {first, second}
+        errors = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    errors.append(str(future.exception()))
+                elif future is first:
+                    return future.result()
+                else:
+                    endpoint, data = future.result()
+                    endpoint.hedged_wins += 1
+                    return data
+        raise RpcError(f"Hedged RPC call failed: {'; '.join(errors)}")
+
+    def post(self, payload, hedge=False):
+        """Send a JSON-RPC request object or batch array and return the decoded response."""
+        if hedge and len(self.endpoints) > 1:
+            return self._post_hedged(payload)
+        return self._post_failover(payload)[1]
+
+    def call(self, method, params=None, hedge=False):
+        data = self.post({"jsonrpc": "2.0", "id": 1, "method": method, "params": params or []}, hedge=hedge)
+        if "result" not in data:
+            raise RpcError(f"{method} failed: {data.get('error', 'Unknown error')}")
+        return data["result"]
+
+    def best(self):
+        return self.ranked()[0]
+
+    def stats_snapshot(self):
+        return {"hedges": self.hedges, "endpoints": {e.name: e.snapshot() for e in self.endpoints}}
@@ -0,0 +1,165 @@
+import json
+import heapq
+from bisect import bisect_right
+from datetime import datetime, timedelta
+import psycopg2
+from trade_writer import TradeWriter, WHALE_DETECTOR
+
+# Sea-life size classes for trades and the rolling per-class buy/sell counts the ingesters
+# publish to {TICKER}_sea_life.json. Each trade is classified once, when it is ingested, with a
+# binary search over the sorted thresholds; the window counts are kept incrementally (added on
+# arrival, subtracted when the trade's block_time leaves the window) instead of re-reading and
+# re-classifying the whole window from validator every cycle. SeaLifeProcessor is the ingesters'
+# side of it: the window, the whale_detector rows for stored trades and the JSON file.
+
+SEA_LIFE_CLASSES = [
+    ('🐋', 1000000000), ('🐳', 1000000), ('🦈', 100000), ('🐙', 50000), ('🐬', 10000),
+    ('🦑', 5000), ('🐟', 1000), ('🐡', 500), ('🦭', 250), ('🦞', 100),
+    ('🦀', 50), ('🐢', 25), ('🦐', 10), ('🐚', 5), ('🦪', 1),
+    ('🪸', 0.5), ('🐠', 0.1), ('🐌', 0.01), ('🌊', 0)
+]
+NO_CLASS = '🌊'
+WINDOW_SECONDS = 120
+WHALE_AMOUNT_SCALE = 1000000  # whale_detector.amount is the trade amount times this
+
+_THRESHOLDS = [thresh for _, thresh in reversed(SEA_LIFE_CLASSES)]
+_EMOJIS = [emoji for emoji, _ in reversed(SEA_LIFE_CLASSES)]
+
+def classify(amount):
+    """Emoji of the largest class whose threshold `amount` reaches."""
+    i = bisect_right(_THRESHOLDS, amount) - 1
+    return _EMOJIS[i] if i >= 0 else NO_CLASS
+
+def classification_sql(expr):
+    """SQL CASE giving the same emoji as classify() for the numeric SQL expression `expr`."""
+    whens = " ".join(f"WHEN {expr} >= {thresh} THEN '{emoji}'" for emoji, thresh in SEA_LIFE_CLASSES if emoji != NO_CLASS)
+    return f"CASE {whens} ELSE '{NO_CLASS}' END"
+
+def empty_counts():
+    return {'buy': {emoji: 0 for emoji, _ in SEA_LIFE_CLASSES},
+            'sell': {emoji: 0 for emoji, _ in SEA_LIFE_CLASSES}}
+
+class SeaLifeWindow:
+    """Per-class buy/sell counts of the distinct trades whose block_time is within the window."""
+
+    def __init__(self, window_seconds=WINDOW_SECONDS):
+        self.window = timedelta(seconds=window_seconds)
+        self.counts = empty_counts()
+        self.total_trades = {'buy': 0, 'sell': 0}
+        self.live = {}  # transaction_hash -> (block_time, trade_type, classification)
+        self.expiry = []  # heap of (block_time, transaction_hash)
+        self.version = 0  # bumped whenever counts change
+
+    def add(self, transaction_hash, block_time, trade_type, classification, now):
+        """Count one trade; False if it is a repeat, not a buy/sell, or already outside the window."""
+        if transaction_hash in self.live or trade_type not in self.total_trades or block_time < now - self.window:
+            return False
+        self.live[transaction_hash] = (block_time, trade_type, classification)
+        heapq.heappush(self.expiry, (block_time, transaction_hash))
+        self._count(trade_type, classification, 1)
+        return True
+
+    def expire(self, now):
+        """Drop trades that fell out of the window ending at `now`."""
+        cutoff = now - self.window
+        while self.expiry and self.expiry[0][0] < cutoff:
+            _, transaction_hash = heapq.heappop(self.expiry)
+            _, trade_type, classification = self.live.pop(transaction_hash)
+            self._count(trade_type, classification, -1)
+
+    def _count(self, trade_type, classification, delta):
+        self.total_trades[trade_type] += delta
+        if classification != NO_CLASS:
+            self.counts[trade_type][classification] += delta
+            self.version += 1
+
+    def clear(self):
+        if self.live:
+            self.version += 1
+        self.counts = empty_counts()
+        self.total_trades = {'buy': 0, 'sell': 0}
+        self.live.clear()
+        self.expiry.clear()
+
+class SeaLifeProcessor:
+    """Sea life window and whale_detector writes for one ingester.
+
+    seed(token, path) at startup and on every target switch; ingest() trades once they are
+    stored in validator; process_cycle() once per loop cycle. `log_prefix` starts every line
+    printed (sig_loop3 passes its process id).
+    """
+
+    def __init__(self, conn, log_prefix=""):
+        self.conn = conn
+        self.log_prefix = log_prefix
+        self.token = None
+        self.path = None
+        self.whale_writer = TradeWriter(conn, WHALE_DETECTOR)
+        self.window = SeaLifeWindow()
+        self.written = None  # (path, window version) last written
+
+    @property
+    def sea_life_counts(self):
+        return self.window.counts
+
+    @property
+    def total_trades(self):
+        return self.window.total_trades
+
+    def log(self, message):
+        print(f"{self.log_prefix}{message}")
+
+    def seed(self, token, path):
+        """Target `token`, publishing to `path`, and fill the window from validator."""
+        self.token = token
+        self.path = path
+        self.window.clear()
+        now = datetime.now()
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT transaction_hash, block_time, trade_type, post_balance
+                    FROM validator
+                    WHERE token_mint = %s AND block_time >= %s
+                    """,
+                    (token, now - self.window.window)
+                )
+                rows = cur.fetchall()
+            self.conn.commit()
+        except psycopg2.Error as e:
+            self.log(f"Sea life seed error: {e}")
+            self.conn.rollback()
+            return
+        for transaction_hash, block_time, trade_type, post_balance in rows:
+            self.window.add(transaction_hash, block_time, trade_type, classify(post_balance), now)
+        self.log(f"Seeded sea life window with {len(self.window.live)} trades")
+
+    def ingest(self, trades):
+        """Classify freshly stored trades once: queue their whale_detector rows and count them."""
+        now = datetime.now()
+        for trade in trades:
+            block_time = datetime.fromisoformat(trade['timestamp'])
+            classification = classify(trade['amount'])
+            self.whale_writer.add((trade['wallet_address'], block_time, trade['amount'] * WHALE_AMOUNT_SCALE, self.token,
+                                   trade['trade_type'], classification, trade['transaction_id']))
+            self.window.add(trade['transaction_id'], block_time, trade['trade_type'], classification, now)
+
+    async def process_cycle(self, cycle_start):
+        self.window.expire(cycle_start)
+        try:
+            inserted = self.whale_writer.flush()
+            if inserted:
+                self.log(f"Inserted {inserted} trades into whale_detector")
+        except psycopg2.Error as e:
+            self.log(f"Sea life processing error: {e}")
+        if (self.path, self.window.version) != self.written:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.sea_life_counts, f, indent=4, ensure_ascii=False)
+            self.written = (self.path, self.window.version)
+        buy_display = ', '.join(f"{k}: {v}" for k, v in self.sea_life_counts['buy'].items())
+        sell_display = ', '.join(f"{k}: {v}" for k, v in self.sea_life_counts['sell'].items())
+        self.log(f"Sea Life Counts: {{buy: {{{buy_display}}}, sell: {{{sell_display}}}}}")
+        self.log(f"Total Trades Processed: Buys: {self.total_trades['buy']}, Sells: {self.total_trades['sell']}")
+        if not self.window.live:
+            self.log(f"No trades in the last {self.window.window.seconds} seconds")
@@ -1,19 +1,26 @@
 import asyncio
-import aiohttp
 import json
 import time
 import psycopg2
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 import traceback
-import random
+from solana_rpc import SolanaRpc, RpcError, SIGNATURES_PAGE_LIMIT
+from ingest_cursor import IngestCursor, RecentSet
+from ray_log import swap_events, fetch_pool
+from trade_writer import TradeWriter, VALIDATOR, validator_row
+from sea_life import SeaLifeProcessor
 
 # Constants
 TARGET_CONSTANTS_FILE = "./target_constants.json"
 MIN_TRADE_AMOUNT = 0.5
 API_ENDPOINT = "https://api.mainnet-beta.solana.com"
 MAX_RETRIES = 5
+RPC_RATE = 4  # mainnet-beta allows 40 calls per 10s per method and IP
 INTERVAL = 5
+CURSOR_CONSUMER = "sig_loop"
+DETAIL_CHUNK = 400  # signatures fetched (as concurrent batch arrays) and stored per step
+MAX_NULL_MISSES = 12  # cycles a signature's getTransaction may come back null before the checkpoint skips it
 
 db_params = {
     'dbname': 'archon_data',
@@ -36,62 +43,91 @@ OUTPUT_FILE = f"json_data/{TICKER}_loop.json"
 TRADE_OUTPUT_DIR = f"json_data/{TICKER}_trade_loop/"
 SEA_LIFE_FILE = f"json_data/{TICKER}_sea_life.json"
 
-async def fetch_transactions(pair_address, limit=1, until=None):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getSignaturesForAddress",
-        "params": [pair_address, {"limit": limit}]
-    }
-    if until:
-        payload["params"][1]["until"] = until
-    async with aiohttp.ClientSession() as session:
-        for attempt in range(MAX_RETRIES):
-            try:
-                async with session.post(API_ENDPOINT, json=payload, headers={"Content-Type": "application/json"}) as resp:
-                    if resp.status == 429:
-                        delay = (2 ** attempt) + random.uniform(0, 1)
-                        print(f"429 Too Many Requests for signatures, retrying in {delay:.2f}s ({attempt + 1}/{MAX_RETRIES})")
-                        await asyncio.sleep(delay)
-                        continue
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    if "result" not in data:
-                        print(f"Error fetching signatures: {data.get('error', 'Unknown error')}")
-                        return []
-                    return data["result"]
-            except aiohttp.ClientError as e:
-                print(f"Failed to fetch transactions: {e}")
-                return []
-        print(f"Gave up on fetching signatures after {MAX_RETRIES} retries")
-        return []
+rpc = SolanaRpc(API_ENDPOINT, rate=RPC_RATE, max_retries=MAX_RETRIES)
+
+async def fetch_transactions(pair_address, limit=SIGNATURES_PAGE_LIMIT, until=None, before=None):
+    try:
+        return await rpc.get_signatures(pair_address, limit, before=before, until=until)
+    except RpcError as e:
+        print(f"Failed to fetch transactions: {e}")
+        return None
+
+async def fetch_new_signatures(pair_address, until=None, until_slot=None):
+    """Every signature newer than `until`, oldest first, paging back with `before`.
+
+    Without `until` (first run or target switch) only the newest page is taken. Paging also
+    stops below `until_slot`, in case the node no longer knows the `until` signature. Returns
+    None if a page fails, so a partial list never moves the checkpoint past a gap.
+    """
+    signatures, before = [], None
+    while True:
+        page = await fetch_transactions(pair_address, SIGNATURES_PAGE_LIMIT, until=until, before=before)
+        if page is None:
+            return None
+        if until_slot is not None:
+            page = [sig for sig in page if sig.get("slot", until_slot) >= until_slot]
+        signatures.extend(page)
+        if len(page) < SIGNATURES_PAGE_LIMIT or until is None:
+            break
+        before = page[-1]["signature"]
+    signatures.reverse()
+    return signatures
 
 async def fetch_transaction_details(signature):
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getTransaction",
-        "params": [signature, {"encoding": "json", "maxSupportedTransactionVersion": 0}]
-    }
-    async with aiohttp.ClientSession() as session:
-        for attempt in range(MAX_RETRIES):
-            try:
-                async with session.post(API_ENDPOINT, json=payload, headers={"Content-Type": "application/json"}) as resp:
-                    if resp.status == 429:
-                        delay = (2 ** attempt) + random.uniform(0, 1)
-                        print(f"429 Too Many Requests for {signature}, retrying in {delay:.2f}s ({attempt + 1}/{MAX_RETRIES})")
-                        await asyncio.sleep(delay)
-                        continue
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    return data.get("result")
-            except aiohttp.ClientError as e:
-                print(f"Error fetching transaction details for {signature}: {e}")
-                return None
-        print(f"Gave up on {signature} after {MAX_RETRIES} retries")
+    try:
+        return await rpc.get_transaction(signature)
+    except RpcError as e:
+        print(f"Error fetching transaction details for {signature}: {e}")
+        return None
+
+async def fetch_details_chunk(signatures):
+    """Transactions for `signatures` in order; anything missing gets one more try.
+
+    A signature the node returned null for stays None; one whose call or batch failed is its RpcError.
+    """
+    try:
+        details = await rpc.get_transactions(signatures, errors=True)
+    except RpcError as e:
+        print(f"Error fetching transaction details: {e}")
+        details = [e] * len(signatures)
+    missing = [i for i, tx in enumerate(details) if tx is None or isinstance(tx, RpcError)]
+    if missing:
+        try:
+            for i, tx in zip(missing, await rpc.get_transactions([signatures[i] for i in missing], errors=True)):
+                # A null on the refetch does not hide that the first try failed, and vice versa
+                if not (tx is None and isinstance(details[i], RpcError)):
+                    details[i] = tx
+        except RpcError as e:
+            print(f"Error refetching {len(missing)} transactions: {e}")
+    return details
+
+async def load_pool(pair_address):
+    """Token side and decimals of the pair's Raydium pool, or None (trades then come from balance diffs)."""
+    try:
+        return await fetch_pool(rpc, pair_address, TOKEN_MINT)
+    except (RpcError, ValueError) as e:
+        print(f"Could not load pool {pair_address}, falling back to balance diffs: {e}")
         return None
 
-async def process_transaction(tx_data):
+def swap_trade(signature, timestamp, block_time, wallet, event, pool):
+    trade_type, amount, sol_amount, price = pool.trade(event)
+    if amount < MIN_TRADE_AMOUNT:
+        print(f"Trade amount {amount} below threshold {MIN_TRADE_AMOUNT} for {wallet} in {signature}")
+        return []
+    return [{
+        'transaction_id': signature,
+        'timestamp': timestamp,
+        'wallet_address': wallet,
+        'amount': amount,
+        'trade_type': trade_type,
+        'emoji': '🟢' if trade_type == "buy" else '🔴',
+        'block_time': block_time,
+        'sol_amount': sol_amount,
+        'price': price,
+        'failed': False
+    }]
+
+async def process_transaction(tx_data, pool=None):
     if not tx_data:
         print("No transaction data to process")
         return None
@@ -106,6 +142,12 @@ async def process_transaction(tx_data):
     logs = meta.get("logMessages", [])
     err = meta.get("err")
 
+    # A single Raydium swap carries its exact amounts in its ray_log and the signer is the
+    # trader. ray_log does not name the pool, so multi-swap routes use the balance diff below.
+    events = swap_events(logs) if pool is not None and err is None else []
+    if len(events) == 1 and account_keys:
+        return swap_trade(signature, timestamp, block_time, account_keys[0], events[0], pool)
+
     dex_programs = [
         "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8",  # Raydium
         "JUP6LkbZbjS1jKKwapdHNy74zcZ3tLUZoi5QNyVTaV4",   # Jupiter
@@ -118,7 +160,7 @@ async def process_transaction(tx_data):
         any(program in log for program in dex_programs) or 
         any(keyword in log for keyword in ["Swap", "ray_log", "Transfer", "TransferChecked", "Burn", "Mint"])
         for log in logs
-    ) or TOKEN_MINT in str(tx_data)
+    ) or any(b.get("mint") == TOKEN_MINT for b in pre_balances + post_balances)
 
     print(f"Checking trade activity in {signature}, has_trade: {has_trade}, TOKEN_MINT: {TOKEN_MINT}, logs (first 5): {logs[:5]}")
     if not has_trade:
@@ -130,12 +172,13 @@ async def process_transaction(tx_data):
     print(f"Balances for {signature} - pre: {len(pre_balances)}, post: {len(post_balances)}")
     for pre in pre_balances + [{}]:
         if pre.get("mint") == TOKEN_MINT:
-            wallet = account_keys[pre.get("accountIndex")] if pre.get("accountIndex") < len(account_keys) else f"Unknown_{signature}"
+            # The balance's owner, i.e. the trader, as the ray_log path records the signer
+            wallet = pre.get("owner") or (account_keys[pre.get("accountIndex")] if pre.get("accountIndex") < len(account_keys) else f"Unknown_{signature}")
             wallet_balances[wallet] = wallet_balances.get(wallet, {'pre': 0, 'post': 0})
             wallet_balances[wallet]['pre'] = pre.get("uiTokenAmount", {}).get("uiAmount", 0) or 0
     for post in post_balances + [{}]:
         if post.get("mint") == TOKEN_MINT:
-            wallet = account_keys[post.get("accountIndex")] if post.get("accountIndex") < len(account_keys) else f"Unknown_{signature}"
+            wallet = post.get("owner") or (account_keys[post.get("accountIndex")] if post.get("accountIndex") < len(account_keys) else f"Unknown_{signature}")
             wallet_balances[wallet] = wallet_balances.get(wallet, {'pre': 0, 'post': 0})
             wallet_balances[wallet]['post'] = post.get("uiTokenAmount", {}).get("uiAmount", 0) or 0
 
@@ -170,116 +213,35 @@ async def process_transaction(tx_data):
         print(f"No valid trades found in {signature} after balance check")
     return trades
 
-async def validate_trades(trades, conn):
-    if not trades:
+async def validate_trades(trades, writer, checkpoint=None):
+    """Store `trades` in validator through `writer`; `checkpoint(cur)` runs in the same transaction. True once committed."""
+    if not trades and checkpoint is None:
         print("No trades to validate")
-        return
+        return True
+    writer.extend(validator_row(trade, TICKER) for trade in trades)
     try:
-        with conn.cursor() as cur:
-            for trade in trades:
-                timestamp = datetime.fromisoformat(trade['timestamp'])
-                cur.execute(
-                    """
-                    INSERT INTO validator (transaction_hash, wallet_address, block_time, token_mint, pre_balance, post_balance, trade_type, transaction_emoji)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (transaction_hash) DO UPDATE SET
-                        wallet_address = EXCLUDED.wallet_address,
-                        block_time = EXCLUDED.block_time,
-                        token_mint = EXCLUDED.token_mint,
-                        pre_balance = EXCLUDED.pre_balance,
-                        post_balance = EXCLUDED.post_balance,
-                        trade_type = EXCLUDED.trade_type,
-                        transaction_emoji = EXCLUDED.transaction_emoji
-                    """,
-                    (trade['transaction_id'], trade['wallet_address'], timestamp, TICKER, 0.0, trade['amount'], 
-                     trade['trade_type'], trade['emoji'])
-                )
-            conn.commit()
-            print(f"Validated and stored {len(trades)} trades in validator table")
+        stored = writer.flush(checkpoint)
+        print(f"Validated and stored {stored} trades in validator table")
+        return True
     except psycopg2.Error as e:
         print(f"Validation error: {e}")
-        conn.rollback()
-
-class SeaLifeProcessor:
-    def __init__(self, conn):
-        self.conn = conn
-        self.sea_life_classes = [
-            ('🐋', 1000000000), ('🐳', 1000000), ('🦈', 100000), ('🐙', 50000), ('🐬', 10000),
-            ('🦑', 5000), ('🐟', 1000), ('🐡', 500), ('🦭', 250), ('🦞', 100),
-            ('🦀', 50), ('🐢', 25), ('🦐', 10), ('🐚', 5), ('🦪', 1),
-            ('🪸', 0.5), ('🐠', 0.1), ('🐌', 0.01), ('🌊', 0)
-        ]
-        self.sea_life_counts = {'buy': {emoji: 0 for emoji, _ in self.sea_life_classes}, 
-                              'sell': {emoji: 0 for emoji, _ in self.sea_life_classes}}
-        self.total_trades = {'buy': 0, 'sell': 0}
-
-    async def process_cycle(self, cycle_start):
-        with self.conn.cursor() as cur:
-            try:
-                window_start = cycle_start - timedelta(seconds=120)
-                print(f"Querying validator table from {window_start} to {cycle_start + timedelta(seconds=INTERVAL)}")
-                cur.execute(
-                    """
-                    SELECT post_balance, trade_type, wallet_address, block_time, transaction_hash
-                    FROM validator
-                    WHERE block_time >= %s AND block_time < %s
-                    """,
-                    (window_start, cycle_start + timedelta(seconds=INTERVAL))
-                )
-                trades = cur.fetchall()
-                self.sea_life_counts = {'buy': {emoji: 0 for emoji, _ in self.sea_life_classes}, 
-                                      'sell': {emoji: 0 for emoji, _ in self.sea_life_classes}}
-                self.total_trades = {'buy': 0, 'sell': 0}
-                processed_hashes = set()
-
-                for post_balance, trade_type, wallet_address, block_time, transaction_hash in trades:
-                    if transaction_hash in processed_hashes or trade_type not in ['buy', 'sell']:
-                        continue
-                    processed_hashes.add(transaction_hash)
-                    self.total_trades[trade_type] += 1
-                    print(f"Classifying trade {transaction_hash}: type={trade_type}, amount={post_balance}")
-                    classification = next((emoji for emoji, thresh in self.sea_life_classes if post_balance >= thresh), '🌊')
-                    if classification != '🌊':
-                        self.sea_life_counts[trade_type][classification] += 1
-                    
-                    amount_lamports = post_balance * 1000000
-                    cur.execute(
-                        """
-                        INSERT INTO whale_detector (whale_wallet, detected_time, amount, token, trade_type, classification, transaction_hash)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (transaction_hash) DO UPDATE SET
-                            whale_wallet = EXCLUDED.whale_wallet,
-                            detected_time = EXCLUDED.detected_time,
-                            amount = EXCLUDED.amount,
-                            token = EXCLUDED.token,
-                            trade_type = EXCLUDED.trade_type,
-                            classification = EXCLUDED.classification
-                        """,
-                        (wallet_address, block_time, amount_lamports, TICKER, trade_type, classification, transaction_hash)
-                    )
-                
-                self.conn.commit()
-                with open(SEA_LIFE_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(self.sea_life_counts, f, indent=4, ensure_ascii=False)
-                buy_display = ', '.join(f"{k}: {v}" for k, v in self.sea_life_counts['buy'].items())
-                sell_display = ', '.join(f"{k}: {v}" for k, v in self.sea_life_counts['sell'].items())
-                print(f"Sea Life Counts: {{buy: {{{buy_display}}}, sell: {{{sell_display}}}}}")
-                print(f"Total Trades Processed: Buys: {self.total_trades['buy']}, Sells: {self.total_trades['sell']}")
-                if not trades:
-                    print("No new trades in the last 120 seconds")
-                else:
-                    print(f"Inserted {len(processed_hashes)} trades into whale_detector")
-            except psycopg2.Error as e:
-                print(f"Sea life processing error: {e}")
-                self.conn.rollback()
+        return False
 
 async def main_loop(pair_address, output_file, trade_output_dir, interval=5):
     global market_address, TICKER, TOKEN_MINT, OUTPUT_FILE, TRADE_OUTPUT_DIR, SEA_LIFE_FILE
     
     conn = psycopg2.connect(**db_params)
+    validator_writer = TradeWriter(conn, VALIDATOR)
     sea_life_processor = SeaLifeProcessor(conn)
-    existing_signatures = set()
-    latest_signature = None
+    sea_life_processor.seed(TICKER, SEA_LIFE_FILE)
+    IngestCursor.ensure_table(conn)
+    ingest_cursor = IngestCursor(conn, CURSOR_CONSUMER, pair_address)
+    ingest_cursor.load()
+    pool = await load_pool(pair_address)
+    if ingest_cursor.signature:
+        print(f"Resuming {pair_address} from slot {ingest_cursor.slot} ({ingest_cursor.signature})")
+    existing_signatures = RecentSet()
+    null_misses = {}  # signature -> cycles its getTransaction came back null
 
     while True:
         try:
@@ -303,30 +265,67 @@ async def main_loop(pair_address, output_file, trade_output_dir, interval=5):
                 TRADE_OUTPUT_DIR = new_TRADE_OUTPUT_DIR
                 SEA_LIFE_FILE = new_SEA_LIFE_FILE
                 existing_signatures.clear()
-                latest_signature = None
+                null_misses.clear()
+                sea_life_processor.seed(TICKER, SEA_LIFE_FILE)
+                ingest_cursor = IngestCursor(conn, CURSOR_CONSUMER, pair_address)
+                ingest_cursor.load()
+                pool = await load_pool(pair_address)
 
             cycle_start = datetime.now()
-            print(f"\nFetching latest transaction for {TICKER} pair {pair_address} at {cycle_start.strftime('%Y-%m-%d %H:%M:%S')}")
+            print(f"\nFetching new transactions for {TICKER} pair {pair_address} at {cycle_start.strftime('%Y-%m-%d %H:%M:%S')}")
 
-            signatures = await fetch_transactions(pair_address, 1, until=latest_signature)
+            signatures = await fetch_new_signatures(pair_address, until=ingest_cursor.signature, until_slot=ingest_cursor.slot)
             if not signatures:
                 print("No new signatures fetched")
             else:
-                signature = signatures[0]["signature"]
-                if signature not in existing_signatures:
-                    print(f"Processing new transaction: {signature}")
-                    tx_details = await fetch_transaction_details(signature)
-                    if tx_details:
-                        trades = await process_transaction(tx_details)
-                        if trades:
-                            print(f"Parsed trades for {signature}:")
-                            for trade in trades:
-                                print(f"  - {trade['emoji']} {trade['trade_type']} {trade['amount']} by {trade['wallet_address']} at {trade['timestamp']}")
-                            await validate_trades(trades, conn)
+                print(f"Processing {len(signatures)} new signatures")
+                # Oldest first; each chunk's trades and the checkpoint commit together, and the
+                # checkpoint stops before any signature whose details could not be fetched. A
+                # failed call is retried every cycle; a null result only for MAX_NULL_MISSES cycles.
+                stalled = False
+                for i in range(0, len(signatures), DETAIL_CHUNK):
+                    chunk = signatures[i:i + DETAIL_CHUNK]
+                    pending = [sig["signature"] for sig in chunk if sig["signature"] not in existing_signatures]
+                    details = dict(zip(pending, await fetch_details_chunk(pending))) if pending else {}
+                    chunk_trades, parsed, checkpoint = [], [], None
+                    for entry in chunk:
+                        signature = entry["signature"]
+                        if signature in details:
+                            tx_details = details[signature]
+                            if isinstance(tx_details, RpcError):
+                                print(f"Fetching {signature} failed ({tx_details}), will retry next cycle")
+                                stalled = True
+                                continue
+                            if not tx_details:
+                                misses = null_misses.get(signature, 0) + 1
+                                if misses < MAX_NULL_MISSES:
+                                    null_misses[signature] = misses
+                                    print(f"No details for {signature} ({misses}/{MAX_NULL_MISSES}), will retry next cycle")
+                                    stalled = True
+                                    continue
+                                print(f"⚠️ Skipping {signature} at slot {entry.get('slot')}: no details after {misses} cycles")
+                            null_misses.pop(signature, None)
+                            trades = await process_transaction(tx_details, pool) if tx_details else None
+                            if trades:
+                                print(f"Parsed trades for {signature}:")
+                                for trade in trades:
+                                    print(f"  - {trade['emoji']} {trade['trade_type']} {trade['amount']} by {trade['wallet_address']} at {trade['timestamp']}")
+                                chunk_trades.extend(trades)
+                            parsed.append(signature)
+                        if not stalled:
+                            checkpoint = entry
+                    if checkpoint is None:
+                        stored = await validate_trades(chunk_trades, validator_writer)
+                    else:
+                        stored = await validate_trades(chunk_trades, validator_writer, lambda cur: ingest_cursor.save(cur, checkpoint["slot"], checkpoint["signature"]))
+                        if stored:
+                            ingest_cursor.moved(checkpoint["slot"], checkpoint["signature"])
+                    if not stored:
+                        # Nothing in this chunk is marked seen, so the next cycle re-reads it from the unmoved cursor
+                        break
+                    for signature in parsed:
                         existing_signatures.add(signature)
-                        latest_signature = signature
-                else:
-                    print(f"Transaction {signature} already processed")
+                    sea_life_processor.ingest(chunk_trades)
 
             await sea_life_processor.process_cycle(cycle_start)
 
@@ -341,6 +340,7 @@ async def main_loop(pair_address, output_file, trade_output_dir, interval=5):
             await asyncio.sleep(interval)
 
     conn.close()
+    await rpc.close()
     print("Shutting down")
 
 if __name__ == "__main__":
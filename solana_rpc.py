@@ -0,0 +1,186 @@
+import random
+import asyncio
+import threading
+import aiohttp
+from rpc_router import RpcError, RateLimited, TokenBucket
+
+# Shared async Solana JSON-RPC client for the ingesters (sig_loop and the mev/data loops). One
+# keep-alive aiohttp session per client instead of one per call, JSON-RPC batch arrays for bulk
+# reads, a token-bucket budget counted per RPC call (a batch of 50 getTransaction calls spends
+# 50 tokens, which is how providers meter them) and jittered exponential backoff on 429s and
+# transient errors.
+
+RPC_TIMEOUT = 10
+RPC_RATE = 10.0  # calls per second; endpoints override this with their own limit
+BATCH_SIZE = 50  # calls per batch array
+MAX_CONNECTIONS = 8  # concurrent HTTP requests per client
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 8.0
+SIGNATURES_PAGE_LIMIT = 1000  # getSignaturesForAddress maximum
+TRANSACTION_OPTIONS = {"encoding": "json", "maxSupportedTransactionVersion": 0}
+
+class BadRequest(RpcError):
+    """4xx other than 429: retrying the same request will not help."""
+
+class SolanaRpc:
+    def __init__(self, url, rate=RPC_RATE, burst=None, batch_size=BATCH_SIZE, connections=MAX_CONNECTIONS,
+                 max_retries=MAX_RETRIES, timeout=RPC_TIMEOUT):
+        self.url = url
+        self.budget = TokenBucket(rate, max(burst or rate, batch_size))
+        self.batch_size = batch_size
+        self.connections = connections
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = None  # created on first use, on the loop that uses the client
+        self.slots = None  # bounds in-flight requests, so queued calls do not eat into their timeout
+        self.requests = 0
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def _session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Content-Type": "application/json"}
+            )
+            self.slots = asyncio.Semaphore(self.connections)
+        return self.session
+
+    async def _acquire(self, count):
+        while not self.budget.try_acquire(count):
+            await asyncio.sleep(self.budget.delay(count))
+
+    def _backoff(self, attempt):
+        # Jittered so clients sharing a rate limit do not retry in lockstep
+        return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def _send(self, payload):
+        session = self._session()
+        async with self.slots, session.post(self.url, json=payload) as resp:
+            if resp.status == 429:
+                raise RateLimited(f"{self.url}: 429 Too Many Requests")
+            if resp.status >= 500:
+                raise RpcError(f"{self.url}: HTTP {resp.status}")
+            if resp.status >= 400:
+                raise BadRequest(f"{self.url}: HTTP {resp.status}: {await resp.text()}")
+            data = await resp.json(content_type=None)
+        if isinstance(data, dict) and data.get("error", {}).get("code") == 429:
+            raise RateLimited(f"{self.url}: {data['error'].get('message')}")
+        return data
+
+    async def post(self, payload):
+        """Send a request object or batch array; retries 429s, 5xx and connection errors with backoff."""
+        count = len(payload) if isinstance(payload, list) else 1
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(count)
+            self.requests += 1
+            self.calls += count
+            try:
+                return await self._send(payload)
+            except BadRequest:
+                self.errors += 1
+                raise
+            except RateLimited as e:
+                self.rate_limited += 1
+                error = e
+            except RpcError as e:
+                self.errors += 1
+                error = e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.errors += 1
+                error = RpcError(f"{self.url}: {e!r}")
+            if attempt == self.max_retries:
+                break
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt))
+        raise error
+
+    async def call(self, method, params=None):
+        data = await self.post({"jsonrpc": "2.0", "id": 1, "method": method, "params": params or []})
+        if "result" not in data:
+            raise RpcError(f"{method} failed: {data.get('error', 'Unknown error')}")
+        return data["result"]
+
+    async def _batch_chunk(self, calls, offset):
+        payload = [{"jsonrpc": "2.0", "id": offset + i, "method": method, "params": params}
+                   for i, (method, params) in enumerate(calls)]
+        try:
+            data = await self.post(payload)
+        except RpcError as e:
+            print(f"⚠️ RPC batch of {len(calls)} failed: {e}")
+            return [e] * len(calls)
+        by_id = {r.get("id"): r for r in data} if isinstance(data, list) else {}
+        results = []
+        for i, (method, _) in enumerate(calls):
+            response = by_id.get(offset + i)
+            if response is None:
+                results.append(RpcError(f"{method}: no response in batch"))
+            elif "result" not in response:
+                results.append(RpcError(f"{method} failed: {response.get('error', 'Unknown error')}"))
+            else:
+                results.append(response["result"])
+        return results
+
+    async def batch(self, calls, errors=False):
+        """Run [(method, params), ...] as batch arrays of `batch_size`, concurrently.
+
+        Returns results in call order. An item that errored (or whose batch gave up) is None, or
+        its RpcError with `errors=True`, so callers can tell a failed call from a null result.
+        """
+        chunks = [self._batch_chunk(calls[i:i + self.batch_size], i) for i in range(0, len(calls), self.batch_size)]
+        results = []
+        for chunk in await asyncio.gather(*chunks):
+            results.extend(chunk)
+        if not errors:
+            results = [None if isinstance(r, RpcError) else r for r in results]
+        return results
+
+    async def get_signatures(self, address, limit=SIGNATURES_PAGE_LIMIT, before=None, until=None, commitment=None):
+        options = {"limit": limit}
+        if before:
+            options["before"] = before
+        if until:
+            options["until"] = until
+        if commitment:
+            options["commitment"] = commitment
+        return await self.call("getSignaturesForAddress", [address, options])
+
+    async def get_transaction(self, signature, options=TRANSACTION_OPTIONS):
+        return await self.call("getTransaction", [signature, options])
+
+    async def get_transactions(self, signatures, options=TRANSACTION_OPTIONS, errors=False):
+        """Transactions for `signatures` in order (None where the node had none; see batch for failed calls)."""
+        return await self.batch([("getTransaction", [sig, options]) for sig in signatures], errors)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def stats_snapshot(self):
+        return {"requests": self.requests, "calls": self.calls, "retries": self.retries,
+                "rate_limited": self.rate_limited, "errors": self.errors}
+
+class RpcThread:
+    """Runs a SolanaRpc on its own event-loop thread so synchronous scripts keep one session across calls.
+
+    Coroutine methods of the client become blocking calls: RpcThread(client).get_transactions(sigs).
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="solana-rpc", daemon=True).start()
+
+    def run(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if asyncio.iscoroutinefunction(attr):
+            return lambda *args, **kwargs: self.run(attr(*args, **kwargs))
+        return attr
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import queue
+import logging
+import itertools
+import threading
+import subprocess
+
+# Config
+SWAP_WORKER_PATH = "/home/safe-pump/archon/raydium/swap_worker.ts"
+WORKER_STARTUP_TIMEOUT = 90.0
+WORKER_REQUEST_TIMEOUT = 90.0
+
+class SwapWorkerError(Exception):
+    pass
+
+class SwapOutcomeUnknown(SwapWorkerError):
+    """The request reached the worker but no answer came back: a swap may or may not have been sent.
+
+    The worker has been killed so it cannot send late; check the wallet or the chain before resending.
+    """
+
+class SwapWorker:
+    """Client for the resident raydium/swap_worker.ts process.
+
+    The worker is started lazily on the first request and restarted if it dies, so callers
+    only ever see one warm SDK/connection/pool per bot process.
+    """
+
+    def __init__(self, script_path=SWAP_WORKER_PATH, cwd=None, startup_timeout=WORKER_STARTUP_TIMEOUT, request_timeout=WORKER_REQUEST_TIMEOUT):
+        self.script_path = script_path
+        self.cwd = cwd or os.path.dirname(os.path.dirname(os.path.abspath(script_path)))
+        self.startup_timeout = startup_timeout
+        self.request_timeout = request_timeout
+        self.proc = None
+        self.ready_info = None
+        self._responses = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _read_stdout(self, proc, responses):
+        for line in proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                responses.put(json.loads(line))
+            except json.JSONDecodeError:
+                logging.debug(f"Swap worker stdout (non-JSON): {line}")
+        responses.put(None)
+
+    def _read_stderr(self, proc):
+        for line in proc.stderr:
+            logging.debug(f"Swap worker stderr: {line.rstrip()}")
+
+    def _next_message(self, timeout):
+        try:
+            message = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            raise SwapWorkerError(f"Swap worker did not answer within {timeout:.0f}s")
+        if message is None:
+            self.proc = None
+            raise SwapWorkerError("Swap worker exited")
+        return message
+
+    def start(self):
+        if self.proc and self.proc.poll() is None:
+            return
+        started = time.time()
+        logging.info(f"🔧 Starting swap worker: {self.script_path}")
+        self.proc = subprocess.Popen(
+            ["ts-node", self.script_path],
+            cwd=self.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        self._responses = queue.Queue()
+        threading.Thread(target=self._read_stdout, args=(self.proc, self._responses), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(self.proc,), daemon=True).start()
+        message = self._next_message(self.startup_timeout)
+        if message.get("event") != "ready":
+            self.close()
+            raise SwapWorkerError(f"Swap worker failed to start: {message.get('error', message)}")
+        self.ready_info = message
+        logging.info(f"🔧 Swap worker ready in {time.time() - started:.2f}s (SDK load {message.get('startup_ms')}ms)")
+
+    def request(self, op, timeout=None, **params):
+        with self._lock:
+            self.start()
+            request_id = next(self._ids)
+            try:
+                self.proc.stdin.write(json.dumps({"id": request_id, "op": op, **params}) + "\n")
+                self.proc.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                self.proc = None
+                raise SwapWorkerError(f"Swap worker pipe closed: {e}")
+            deadline = time.time() + (timeout or self.request_timeout)
+            while True:
+                try:
+                    message = self._next_message(max(0.0, deadline - time.time()))
+                except SwapWorkerError as e:
+                    # Killed rather than left running, so a late send cannot land after the caller gave up;
+                    # the next request starts a fresh worker
+                    self.kill()
+                    raise SwapOutcomeUnknown(f"{op} request {request_id}: {e}") from e
+                if message.get("id") == request_id:
+                    return message
+                logging.debug(f"Swap worker: dropping stale message {message}")
+
+    def swap(self, amount, is_buy, token_mint, slippage, confirm=True):
+        """confirm=False returns right after the send; track the txid with tx_confirm instead."""
+        return self.request("swap", amount=amount, is_buy=is_buy, mint=str(token_mint), slippage=slippage, confirm=confirm)
+
+    def quote(self, amount, is_buy, token_mint, slippage):
+        return self.request("quote", amount=amount, is_buy=is_buy, mint=str(token_mint), slippage=slippage)
+
+    def kill(self):
+        proc, self.proc = self.proc, None
+        if proc and proc.poll() is None:
+            logging.warning("🔧 Killing swap worker")
+            proc.kill()
+            proc.wait()
+
+    def close(self):
+        proc, self.proc = self.proc, None
+        if not proc:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
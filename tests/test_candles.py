@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from candles import CandleBuilder, TickCheckpoint, bucket_start, candle_token_pair, read_last_tick
+
+START = 1767268800  # 2026-01-01 12:00:00 UTC, on every interval's boundary
+
+def test_ohlc_within_a_bucket():
+    builder = CandleBuilder([1])
+    for i, price in enumerate([1.0, 1.4, 0.8, 1.1]):
+        assert builder.add_tick(START + i, price) == []
+    candle = builder.current(1)
+    assert (candle.open, candle.high, candle.low, candle.close, candle.count) == (1.0, 1.4, 0.8, 1.1, 4)
+    assert candle.as_dict()["timestamp"] == datetime(2026, 1, 1, 12, 0)
+
+def test_close_on_next_bucket():
+    builder = CandleBuilder([1, 5])
+    builder.add_tick(START, 1.0)
+    builder.add_tick(START + 59, 2.0)
+    closed = builder.add_tick(START + 60, 3.0)
+    # Only the 1m candle closes; the 5m one is still open and has seen all three ticks
+    assert [(interval, c.start, c.close) for interval, c in closed] == [(1, START, 2.0)]
+    assert builder.current(1).open == 3.0
+    assert (builder.current(5).high, builder.current(5).count) == (3.0, 3)
+
+def test_boundary_closes_intervals_together():
+    batches = []
+    builder = CandleBuilder([60, 1, 5])
+    builder.on_close(batches.append)
+    builder.add_tick(START + 30, 1.0)
+    closed = builder.add_tick(START + 3600, 2.0)
+    assert [interval for interval, _ in closed] == [1, 5, 60]  # oldest interval first
+    assert batches == [closed]
+
+def test_gap_skips_empty_buckets():
+    builder = CandleBuilder([1])
+    builder.add_tick(START, 1.0)
+    closed = builder.add_tick(START + 600, 2.0)
+    assert len(closed) == 1
+    assert builder.current(1).start == bucket_start(START + 600, 1)
+
+def test_candle_token_pair():
+    assert candle_token_pair("JELLY", 1) == "JELLY/USD"
+    assert candle_token_pair("JELLY", 5) == "JELLY/USD_5m"
+    assert candle_token_pair("JELLY", 240) == "JELLY/USD_4h"
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "price_ticks.jsonl")
+    checkpoint = TickCheckpoint(path, interval=3600, retention=120)
+    now = time.time()
+    checkpoint.record("JELLY/USD", now - 300, 1.0)  # past retention
+    checkpoint.record("JELLY/USD", now - 10, 2.0)
+    assert not os.path.exists(path)  # buffered until the interval passes or flush()
+    checkpoint.flush()
+    checkpoint.record("JELLY/USD", now, 3.0)
+    checkpoint.flush()
+    with open(path, 'a') as f:
+        f.write('{"token_pair": "JELLY/USD", "ts": ')  # torn last line
+    assert [t["price"] for t in checkpoint.load()] == [2.0, 3.0]
+    assert read_last_tick(path)["price"] == 3.0
+    checkpoint.compact()
+    with open(path) as f:
+        assert len(f.readlines()) == 2
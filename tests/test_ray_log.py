@@ -0,0 +1,66 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pool_reserves import WSOL_MINT
+from ray_log import RAY_LOG_PREFIX, LOG_SWAP_BASE_IN, LOG_SWAP_BASE_OUT, SwapPool, decode_swap, decode_swaps, swap_events
+
+# ray_log payloads packed in the on-chain SwapBaseIn/SwapBaseOut layout for a token/WSOL AMM v4
+# pool (token is the coin side, 6 decimals; WSOL 9) with 1,000,000 tokens and 100 SOL in
+# reserve, priced with the 0.25% swap fee.
+TOKEN_MINT = "JELLYxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx"
+# SwapBaseIn, pc -> coin: 1.5 SOL in, 14741.923962 tokens out (a buy)
+SWAP_BASE_IN = "AwAvaFkAAAAAEnjmZQMAAAABAAAAAAAAAAAvaFkAAAAAABCl1OgAAAAA6HZIFwAAAHror24DAAAA"
+# SwapBaseOut, coin -> pc: 0.5 SOL out for 5037.719928 tokens in (a sell)
+SWAP_BASE_OUT = "BGczRi8BAAAAAGXNHQAAAAACAAAAAAAAAPACi1gCAAAAABCl1OgAAAAA6HZIFwAAAHiBRSwBAAAA"
+# ray_log of an init instruction (log type 0), not a swap
+INIT_LOG = "AP8AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA"
+
+def pool(token_is_coin=True):
+    if token_is_coin:
+        return SwapPool({"base_mint": TOKEN_MINT, "quote_mint": WSOL_MINT, "base_decimal": 6, "quote_decimal": 9}, TOKEN_MINT)
+    return SwapPool({"base_mint": WSOL_MINT, "quote_mint": TOKEN_MINT, "base_decimal": 9, "quote_decimal": 6}, TOKEN_MINT)
+
+def test_swap_base_in_buy():
+    event = decode_swap(SWAP_BASE_IN)
+    assert event.log_type == LOG_SWAP_BASE_IN
+    assert (event.amount_in, event.amount_out) == (1_500_000_000, 14_741_923_962)
+    assert not event.coin_to_pc
+    assert event.reserves_after() == (1_000_000_000_000 - 14_741_923_962, 101_500_000_000)
+    trade_type, amount, sol_amount, price = pool().trade(event)
+    assert trade_type == "buy"
+    assert amount == pytest.approx(14741.923962)
+    assert sol_amount == pytest.approx(1.5)
+    assert price == pytest.approx(101.5 / 985258.076038)
+
+def test_swap_base_out_sell():
+    event = decode_swap(SWAP_BASE_OUT)
+    assert event.log_type == LOG_SWAP_BASE_OUT
+    assert (event.amount_in, event.amount_out) == (5_037_719_928, 500_000_000)
+    assert event.coin_to_pc
+    trade_type, amount, sol_amount, price = pool().trade(event)
+    assert trade_type == "sell"
+    assert amount == pytest.approx(5037.719928)
+    assert sol_amount == pytest.approx(0.5)
+    assert price == pytest.approx(99.5 / 1005037.719928)
+
+def test_direction_follows_token_side():
+    # The same pc -> coin swap sells the token when the token is the pc side
+    trade_type, amount, sol_amount, _ = pool(token_is_coin=False).trade(decode_swap(SWAP_BASE_IN))
+    assert trade_type == "sell"
+    assert amount == pytest.approx(1500.0)
+    assert sol_amount == pytest.approx(14.741923962)
+
+def test_non_swaps_are_skipped():
+    assert decode_swap(INIT_LOG) is None
+    assert decode_swap("not base64!") is None
+    logs = ["Program log: Instruction: SwapBaseIn", RAY_LOG_PREFIX + INIT_LOG, RAY_LOG_PREFIX + SWAP_BASE_IN, RAY_LOG_PREFIX + SWAP_BASE_OUT]
+    assert swap_events(logs) == [decode_swap(SWAP_BASE_IN), decode_swap(SWAP_BASE_OUT)]
+
+def test_vectorised_decode_matches():
+    decoded = decode_swaps([INIT_LOG, SWAP_BASE_IN, SWAP_BASE_OUT])
+    assert decoded["index"].tolist() == [1, 2]
+    assert decoded["amount_in"].tolist() == [1_500_000_000, 5_037_719_928]
+    assert decoded["amount_out"].tolist() == [14_741_923_962, 500_000_000]
+    assert decoded["direction"].tolist() == [1, 2]
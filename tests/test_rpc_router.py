@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from rpc_router import TokenBucket, Endpoint, RpcRouter, LATENCY_MIN_SAMPLES, PROBE_INTERVAL
+
+def used(endpoint, latency, errors=0, calls=10):
+    """Give `endpoint` `calls` recent outcomes with `errors` errors, and mark it as just used."""
+    for i in range(calls):
+        endpoint.record("error" if i < errors else "ok", latency)
+    return endpoint
+
+def test_bucket_burst_then_refill():
+    bucket = TokenBucket(rate=10, burst=3)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.delay() == pytest.approx(0.1, abs=0.01)
+    assert bucket.delay(3) == pytest.approx(0.3, abs=0.01)
+    bucket.updated -= 0.2  # as if 0.2s had passed
+    assert bucket.try_acquire(2)
+    assert not bucket.try_acquire()
+
+def test_bucket_never_banks_past_burst():
+    bucket = TokenBucket(rate=10, burst=2)
+    bucket.updated -= 60
+    assert bucket.delay(2) == 0.0
+    assert bucket.try_acquire(2)
+    assert not bucket.try_acquire()
+
+def test_bucket_default_burst():
+    assert TokenBucket(0.5).burst == 1.0
+    assert TokenBucket(4).burst == 4
+
+def test_ranked_by_latency_and_errors():
+    fast = used(Endpoint("https://fast.example"), 0.01)
+    slow = used(Endpoint("https://slow.example"), 0.05)
+    flaky = used(Endpoint("https://flaky.example"), 0.01, errors=5)
+    router = RpcRouter([slow, flaky, fast])
+    assert router.ranked() == [fast, slow, flaky]
+    assert router.best() is fast
+
+def test_ranked_puts_cooling_down_last():
+    fast = used(Endpoint("https://fast.example"), 0.01)
+    slow = used(Endpoint("https://slow.example"), 0.05)
+    fast.record("429")
+    assert RpcRouter([fast, slow]).ranked() == [slow, fast]
+
+def test_ranked_probes_unmeasured_and_idle_endpoints():
+    measured = used(Endpoint("https://measured.example"), 0.01)
+    new = used(Endpoint("https://new.example"), 0.5, calls=LATENCY_MIN_SAMPLES - 1)
+    # Too few samples to trust its latency, so it ranks as fast until it has them
+    assert RpcRouter([measured, new]).ranked() == [new, measured]
+
+    slow = used(Endpoint("https://slow.example"), 0.05)
+    router = RpcRouter([measured, slow])
+    assert router.ranked() == [measured, slow]
+    slow.last_used = time.monotonic() - PROBE_INTERVAL - 1
+    assert router.ranked() == [slow, measured]
@@ -0,0 +1,66 @@
+import os
+import sys
+import sqlite3
+from datetime import datetime, timedelta
+import pytest
+
+pytest.importorskip("psycopg2")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sea_life import SEA_LIFE_CLASSES, NO_CLASS, SeaLifeWindow, classify, classification_sql
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+# Every threshold, just below and just above it, plus negatives and very large amounts
+AMOUNTS = sorted({a for _, t in SEA_LIFE_CLASSES for a in (t, t - 1e-9, t + 1e-9, t * 0.999)} | {-5, 1e15})
+
+def test_classify_boundaries():
+    classes = [emoji for emoji, _ in SEA_LIFE_CLASSES]
+    for i, (emoji, threshold) in enumerate(SEA_LIFE_CLASSES):
+        # A threshold belongs to its own class; anything below it to the next one down
+        assert classify(threshold) == emoji
+        if i + 1 < len(classes):
+            assert classify(threshold * 0.999 if threshold else -1e-9) == classes[i + 1]
+    assert classify(1e15) == '🐋'
+    assert classify(-5) == NO_CLASS
+
+def test_classification_sql_matches_classify():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE trades (amount REAL)")
+    conn.executemany("INSERT INTO trades VALUES (?)", [(a,) for a in AMOUNTS])
+    rows = conn.execute(f"SELECT amount, {classification_sql('amount')} FROM trades ORDER BY amount").fetchall()
+    assert [emoji for _, emoji in rows] == [classify(amount) for amount, _ in rows]
+
+def test_classification_sql_expression_is_used_as_given():
+    conn = sqlite3.connect(":memory:")
+    emoji = conn.execute(f"SELECT {classification_sql('ABS(post - pre)')} FROM (SELECT 0 AS post, 2000 AS pre)").fetchone()[0]
+    assert emoji == classify(2000)
+
+def test_window_counts_and_expiry():
+    window = SeaLifeWindow(window_seconds=120)
+    assert window.add("a", NOW - timedelta(seconds=100), "buy", '🐟', NOW)
+    assert window.add("b", NOW - timedelta(seconds=10), "sell", NO_CLASS, NOW)
+    assert not window.add("a", NOW, "buy", '🐟', NOW)  # repeat
+    assert not window.add("c", NOW, "hold", '🐟', NOW)  # not a buy/sell
+    assert not window.add("d", NOW - timedelta(seconds=121), "buy", '🐟', NOW)  # already outside
+    assert window.total_trades == {'buy': 1, 'sell': 1}
+    assert window.counts['buy']['🐟'] == 1
+    # The unclassified sell counts as a trade but not in any class
+    assert sum(window.counts['sell'].values()) == 0
+
+    window.expire(NOW + timedelta(seconds=20))  # "a" is exactly at the cutoff and stays
+    assert window.total_trades == {'buy': 1, 'sell': 1}
+    window.expire(NOW + timedelta(seconds=21))
+    assert window.total_trades == {'buy': 0, 'sell': 1}
+    assert window.counts['buy']['🐟'] == 0
+    assert set(window.live) == {"b"}
+    window.expire(NOW + timedelta(seconds=200))
+    assert window.total_trades == {'buy': 0, 'sell': 0}
+    assert not window.live and not window.expiry
+
+def test_window_version_tracks_count_changes():
+    window = SeaLifeWindow(window_seconds=120)
+    window.add("a", NOW, "sell", NO_CLASS, NOW)
+    assert window.version == 0
+    window.add("b", NOW, "buy", '🦈', NOW)
+    assert window.version == 1
+    window.clear()
+    assert window.version == 2 and window.total_trades == {'buy': 0, 'sell': 0}
@@ -1,8 +1,12 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import os
+import sys
 import json
+import hashlib
+import orjson
 from datetime import datetime, timedelta, timezone
 import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -12,6 +16,12 @@ import pandas as pd
 import numpy as np
 from decimal import Decimal
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from candles import read_last_tick
+from patterns import ohlc_arrays, bullish, bearish
+from db_pool import ConnectionPool
+from trade_flow import summarize_trade_flow
+
 app = FastAPI()
 
 # Database Connection Parameters
@@ -26,9 +36,27 @@ DB_PARAMS = {
 # File Paths
 TARGET_CONSTANTS_FILE = "/home/safe-pump/archon/target_constants.json"
 DOJI_JSON_PATH = "/home/safe-pump/archon/doji.json"
-PRICE_JSON_PATH = "/home/safe-pump/archon/raydium/price.json"
-
-# In-memory cache
+PRICE_CHECKPOINT_PATH = "/home/safe-pump/archon/raydium/price_ticks.jsonl"
+
+# Change feed: price.py and the trade ingesters commit rows, triggers NOTIFY, and the cache
+# refreshes only the aggregate that changed. Timers remain as a slow safety net (the 15-minute
+# windows also slide at idle) and take over at the old pace while the feed is down. The NOTIFY
+# triggers live in archon_schema.sql (change_feed.sql for existing databases); the API only LISTENs.
+CHANGE_CHANNEL = "archon_changes"
+CHANGE_DEBOUNCE = 0.05  # seconds to coalesce a burst of notifications into one refresh
+CHANGE_RETRY_INTERVAL = 5
+FALLBACK_REFRESH_INTERVAL = 60
+CANDLE_POLL_INTERVAL = 10
+TRADE_POLL_INTERVAL = 5
+
+# Push stream: /stream is Server-Sent Events, a full snapshot on connect and then one delta
+# (only the top-level fields that changed) per refresh. Slow subscribers are resynced with a
+# fresh snapshot instead of buffering without bound.
+STREAM_HEARTBEAT = 15.0
+STREAM_QUEUE_SIZE = 64
+
+# In-memory cache. /data serves pre-serialized bytes that are rebuilt only when a refresh
+# job changes data_cache or the target token changes, so pollers get a constant-time response.
 data_cache = {
     "price": 0.0,
     "buys": 0,
@@ -36,6 +64,7 @@ data_cache = {
     "holds": 0,
     "classifications": {},
     "whale_trade": None,
+    "sea_life_score": 0.0,
     "last_updated": None,
     "token": None,
     "last_trade_time": None,
@@ -45,22 +74,46 @@ data_cache = {
     "trend_stats": {},
     "trade_trend": []
 }
+response_cache = {"token": None, "body": None, "etag": None}
+constants_cache = {"mtime": None, "value": None}
+refresh_locks = {"candles": asyncio.Lock(), "trades": asyncio.Lock()}
+
+# Database Connection Pool (hot queries are PREPAREd once per connection)
+DB_STATEMENTS = {
+    "api_candles": """
+        SELECT id, token_pair, timestamp, open, high, low, close, ma_10, ma_50, doji_type
+        FROM public.candles
+        WHERE token_pair = $1 AND timestamp >= $2
+        ORDER BY timestamp DESC
+    """,
+    "api_trades_by_minute": """
+        SELECT minute, trade_type, trades as count, volume as total_amount, classification
+        FROM public.trade_flow_1m
+        WHERE token = $1 AND minute >= DATE_TRUNC('minute', $2::timestamp)
+        ORDER BY minute DESC
+    """,
+    "api_latest_whale": """
+        SELECT whale_wallet, token, trade_type, classification, amount, detected_time
+        FROM public.whale_detector
+        WHERE token = $1
+        AND detected_time >= $2
+        AND classification IN ('🐋', '🐳', '🦈')
+        AND trade_type IN ('buy', 'sell')
+        ORDER BY detected_time DESC
+        LIMIT 1
+    """
+}
+db = ConnectionPool(minconn=4, maxconn=4, statements=DB_STATEMENTS, cursor_factory=RealDictCursor, **DB_PARAMS)
 
-# Database Connection
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(**DB_PARAMS, cursor_factory=RealDictCursor)
-        print("🚀 Database connection successful 📊")
-        return conn
-    except Exception as e:
-        print(f"🚨 Database connection failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
-
-# Load Constants
+# Load Constants (re-read only when target_constants.json changes)
 def load_constants():
     try:
-        with open(TARGET_CONSTANTS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)['target_token']
+        mtime = os.stat(TARGET_CONSTANTS_FILE).st_mtime_ns
+        if constants_cache["mtime"] != mtime:
+            with open(TARGET_CONSTANTS_FILE, 'r', encoding='utf-8') as f:
+                constants_cache["value"] = json.load(f)['target_token']
+            constants_cache["mtime"] = mtime
+        return constants_cache["value"]
     except Exception as e:
         print(f"🚨 Failed to load constants: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to load constants: {str(e)}")
@@ -98,21 +151,10 @@ def load_doji_data():
 # Fetch Candlestick Data
 def fetch_candlestick_data(token):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
         query_time = (datetime.now(timezone.utc) - timedelta(minutes=15)).strftime("%Y-%m-%d %H:%M:00")
-        cur.execute(
-            """
-            SELECT id, token_pair, timestamp, open, high, low, close, ma_10, ma_50, doji_type
-            FROM public.candles
-            WHERE token_pair = %s AND timestamp >= %s
-            ORDER BY timestamp DESC
-            """,
-            (f"{token}/USD", query_time)
-        )
-        candles = cur.fetchall()
-        cur.close()
-        conn.close()
+        with db.cursor() as cur:
+            db.execute_prepared(cur, "api_candles", (f"{token}/USD", query_time))
+            candles = cur.fetchall()
         print(f"📊 Fetched {len(candles)} candlestick rows for {token}/USD (last 15min, query time >= {query_time})")
         if len(candles) == 0:
             print(f"⚠️ No candles found. Check price.py or database table 'candles'.")
@@ -138,15 +180,19 @@ def fetch_candlestick_data(token):
             return pd.DataFrame(), {}, []
 
         # Use price.py's doji_type for classification
-        df['is_doji'] = df['doji_type'] != 'None'
-        df['is_bullish'] = (df['close'] > df['open']) & (~df['is_doji'])
-        df['is_bearish'] = (df['close'] < df['open']) & (~df['is_doji'])
+        o, h, l, c = ohlc_arrays(df)
+        doji_types = df['doji_type'].to_numpy()
+        is_doji = doji_types != 'None'
+        df['is_doji'] = is_doji
+        df['is_bullish'] = bullish(o, c, is_doji)
+        df['is_bearish'] = bearish(o, c, is_doji)
 
         # Calculate trend stats
-        bullish_candles = len(df[df['is_bullish']])
-        bearish_candles = len(df[df['is_bearish']])
-        doji_candles = len(df[df['is_doji']])
-        doji_counts = df[df['is_doji']]['doji_type'].value_counts().to_dict()
+        bullish_candles = int(np.count_nonzero(df['is_bullish'].to_numpy()))
+        bearish_candles = int(np.count_nonzero(df['is_bearish'].to_numpy()))
+        doji_candles = int(np.count_nonzero(is_doji))
+        names, counts = np.unique(doji_types[is_doji], return_counts=True)
+        doji_counts = {str(name): int(count) for name, count in zip(names, counts)}
 
         trend_stats = {
             "bullish_candles": bullish_candles,
@@ -178,81 +224,21 @@ def fetch_candlestick_data(token):
         print(f"🚨 Error fetching candlestick data: {str(e)}")
         return pd.DataFrame(), {}, []
 
-# Fetch Aggregated Trades (unchanged)
+# Fetch Aggregated Trades
 def fetch_recent_trades(token):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT 
-                DATE_TRUNC('minute', detected_time) as minute,
-                trade_type,
-                COUNT(*) as count,
-                SUM(amount) as total_amount,
-                classification
-            FROM public.whale_detector
-            WHERE token = %s AND detected_time >= %s
-            GROUP BY DATE_TRUNC('minute', detected_time), trade_type, classification
-            ORDER BY minute DESC
-            """,
-            (token, datetime.now(timezone.utc) - timedelta(minutes=15))
-        )
-        trade_results = cur.fetchall()
-        print(f"🐳 Fetched {len(trade_results)} aggregated trade rows for token {token}")
-        cur.execute(
-            """
-            SELECT whale_wallet, token, trade_type, classification, amount, detected_time
-            FROM public.whale_detector
-            WHERE token = %s 
-            AND detected_time >= %s
-            AND classification IN ('🐋', '🐳', '🦈')
-            AND trade_type IN ('buy', 'sell')
-            ORDER BY detected_time DESC
-            LIMIT 1
-            """,
-            (token, datetime.now(timezone.utc) - timedelta(minutes=15, seconds=5))
-        )
-        latest_trade = cur.fetchone()
-        print(f"🐳 Latest whale trade query result: {latest_trade}")
-        cur.close()
-        conn.close()
-
-        buys = 0
-        sells = 0
-        holds = 0
-        classifications = {}
-        total_volume = 0.0
+        with db.cursor() as cur:
+            db.execute_prepared(cur, "api_trades_by_minute", (token, datetime.now(timezone.utc) - timedelta(minutes=15)))
+            trade_results = cur.fetchall()
+            print(f"🐳 Fetched {len(trade_results)} aggregated trade rows for token {token}")
+            db.execute_prepared(cur, "api_latest_whale", (token, datetime.now(timezone.utc) - timedelta(minutes=15, seconds=5)))
+            latest_trade = cur.fetchone()
+            print(f"🐳 Latest whale trade query result: {latest_trade}")
+
+        # Pre-aggregated by trade_flow_1m's triggers: one row per minute, trade type and class
+        buys, sells, holds, classifications, total_volume, trade_trend = summarize_trade_flow(trade_results)
         latest_time = None
-        trade_trend = []
-
         if trade_results:
-            df_trades = pd.DataFrame(trade_results)
-            for minute, group in df_trades.groupby('minute'):
-                minute_buys = group[group['trade_type'] == 'buy']['count'].sum()
-                minute_sells = group[group['trade_type'] == 'sell']['count'].sum()
-                minute_holds = group[group['trade_type'] == 'hold']['count'].sum()
-                trade_trend.append({
-                    "minute": minute.isoformat(),
-                    "buys": int(minute_buys),
-                    "sells": int(minute_sells),
-                    "holds": int(minute_holds)
-                })
-            for row in trade_results:
-                trade_type = row['trade_type']
-                count = row['count']
-                cls = row['classification']
-                amount = float(row['total_amount']) / 1_000_000_000
-                if trade_type == 'buy':
-                    buys += count
-                    total_volume += amount
-                elif trade_type == 'sell':
-                    sells += count
-                    total_volume += amount
-                elif trade_type == 'hold':
-                    holds += count
-                if cls:
-                    classifications[cls] = classifications.get(cls, 0) + count
             print(f"🐳 Processed: {buys} buys, {sells} sells, {holds} holds, volume: {total_volume:.2f} SOL, classifications: {classifications}")
 
         if latest_trade:
@@ -277,24 +263,22 @@ def calculate_sea_life_score(classifications, total_volume):
     return score * (1 + volume_factor)
 
 # Background Tasks
+# Background Tasks (psycopg2, pandas and file reads run in the default executor so the
+# event loop keeps serving /data while a refresh is in flight)
 async def update_price_and_trends():
     constants = load_constants()
     token = constants['ticker']
-    candlestick_data, trend_stats, raw_candles = fetch_candlestick_data(token)
-    doji_data = load_doji_data()
+    loop = asyncio.get_running_loop()
+    candlestick_data, trend_stats, raw_candles = await loop.run_in_executor(None, fetch_candlestick_data, token)
+    doji_data = await loop.run_in_executor(None, load_doji_data)
 
     if candlestick_data.empty:
-        print("⚠️ No candlestick data available, fetching latest price from price.json")
+        print("⚠️ No candlestick data available, fetching latest price from the price checkpoint")
         try:
-            with open(PRICE_JSON_PATH, 'r', encoding='utf-8') as f:
-                price_data = json.load(f)
-                latest_key = max(price_data.keys(), default=None)
-                if latest_key and price_data[latest_key]:
-                    price = float(price_data[latest_key][-1]['price'])
-                else:
-                    price = 0.0
+            tick = await loop.run_in_executor(None, read_last_tick, PRICE_CHECKPOINT_PATH)
+            price = float(tick['price']) if tick else 0.0
         except Exception as e:
-            print(f"🚨 Failed to load price from {PRICE_JSON_PATH}: {str(e)}")
+            print(f"🚨 Failed to load price from {PRICE_CHECKPOINT_PATH}: {str(e)}")
             price = 0.0
         data_cache["price"] = price
         data_cache["trends"] = {}
@@ -320,13 +304,14 @@ async def update_price_and_trends():
 
     data_cache["last_updated"] = datetime.now(timezone.utc).isoformat()
     data_cache["token"] = token
+    render_data(token)
     print(f"🤑 Price updated: ${data_cache['price']:.8f} at {data_cache['last_updated']} for {token}")
 
 async def update_trades():
     constants = load_constants()
     token = constants['ticker']
     try:
-        buys, sells, holds, classifications, whale_trade, latest_time, total_volume, trade_trend = fetch_recent_trades(token)
+        buys, sells, holds, classifications, whale_trade, latest_time, total_volume, trade_trend = await asyncio.get_running_loop().run_in_executor(None, fetch_recent_trades, token)
         data_cache["buys"] = buys
         data_cache["sells"] = sells
         data_cache["holds"] = holds
@@ -337,31 +322,132 @@ async def update_trades():
         data_cache["last_trade_time"] = latest_time
         data_cache["sea_life_score"] = calculate_sea_life_score(classifications, total_volume)
         data_cache["trade_trend"] = trade_trend
+        render_data(token)
         print(f"🐳 Trades updated at {data_cache['last_updated']}: {buys} buys, {sells} sells, {holds} holds, score: {data_cache['sea_life_score']:.2f}, activity: {classifications}")
     except Exception as e:
         print(f"🚨 Trade update failed: {str(e)}")
 
+# Refresh bookkeeping for the change feed
+last_refresh = {"candles": 0.0, "trades": 0.0}
+refresh_dirty = {"candles": False, "trades": False}
+refresh_jobs = {"candles": update_price_and_trends, "trades": update_trades}
+
+async def refresh(kind):
+    # A request arriving mid-refresh may have missed that refresh's read: mark the kind dirty
+    # and let the running refresh go once more instead of stacking executor work
+    if refresh_locks[kind].locked():
+        refresh_dirty[kind] = True
+        return
+    async with refresh_locks[kind]:
+        while True:
+            refresh_dirty[kind] = False
+            last_refresh[kind] = asyncio.get_running_loop().time()
+            await refresh_jobs[kind]()
+            if not refresh_dirty[kind]:
+                break
+
+class ChangeFeed:
+    """LISTEN on CHANGE_CHANNEL over a dedicated connection, driven by the event loop's reader."""
+
+    def __init__(self):
+        self.conn = None
+        self.loop = None
+        self.pending = set()
+        self.notifications = 0
+
+    @property
+    def connected(self):
+        return self.conn is not None and not self.conn.closed
+
+    def start(self, loop):
+        self.loop = loop
+        try:
+            conn = psycopg2.connect(**DB_PARAMS)
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANGE_CHANNEL}")
+            self.conn = conn
+            loop.add_reader(conn.fileno(), self._on_readable)
+            print(f"📡 Listening for {CHANGE_CHANNEL} notifications")
+        except Exception as e:
+            print(f"🚨 Change feed unavailable, polling every {TRADE_POLL_INTERVAL}-{CANDLE_POLL_INTERVAL}s: {str(e)}")
+            self.loop.call_later(CHANGE_RETRY_INTERVAL, self.start, loop)
+
+    def _on_readable(self):
+        try:
+            self.conn.poll()
+        except Exception as e:
+            print(f"🚨 Change feed dropped: {str(e)}")
+            self.close()
+            self.loop.call_later(CHANGE_RETRY_INTERVAL, self.start, self.loop)
+            return
+        try:
+            token = load_constants()['ticker']
+        except HTTPException:
+            token = None
+        for notify in self.conn.notifies:
+            self.notifications += 1
+            table, _, key = notify.payload.partition(":")
+            if table == "candles" and (token is None or key == f"{token}/USD"):
+                self.schedule("candles")
+            elif table == "whale_detector" and (token is None or key == token):
+                self.schedule("trades")
+        self.conn.notifies.clear()
+
+    def schedule(self, kind):
+        if kind in self.pending:
+            return
+        self.pending.add(kind)
+        self.loop.call_later(CHANGE_DEBOUNCE, self._run, kind)
+
+    def _run(self, kind):
+        self.pending.discard(kind)
+        asyncio.ensure_future(refresh(kind))
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.loop.remove_reader(self.conn.fileno())
+            except Exception:
+                pass
+            self.conn.close()
+        self.conn = None
+
+change_feed = ChangeFeed()
+
+async def poll(kind):
+    # Safety net: slow while the change feed is up, the old pace while it is down
+    if change_feed.connected and asyncio.get_running_loop().time() - last_refresh[kind] < FALLBACK_REFRESH_INTERVAL:
+        return
+    await refresh(kind)
+
 # Lifespan Handler
 scheduler = AsyncIOScheduler()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    scheduler.add_job(update_price_and_trends, IntervalTrigger(seconds=10))
-    scheduler.add_job(update_trades, IntervalTrigger(seconds=5))
+    change_feed.start(asyncio.get_running_loop())
+    scheduler.add_job(poll, IntervalTrigger(seconds=CANDLE_POLL_INTERVAL), args=["candles"])
+    scheduler.add_job(poll, IntervalTrigger(seconds=TRADE_POLL_INTERVAL), args=["trades"])
     scheduler.start()
-    await update_price_and_trends()
-    await update_trades()
+    await refresh("candles")
+    await refresh("trades")
     yield
     scheduler.shutdown()
+    change_feed.close()
+    db.close()
 
 app = FastAPI(lifespan=lifespan)
 
-# Single Endpoint
-@app.get("/data")
-def get_data():
-    constants = load_constants()
-    token = constants['ticker']
-    
+# Response Rendering
+def _json_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError
+
+def build_payload(token):
     if data_cache["token"] != token or not data_cache["last_updated"]:
         return {
             "token": token,
@@ -386,10 +472,10 @@ def get_data():
             "last_trade_time": None,
             "message": "No recent data available yet"
         }
-    
+
     whale_trade = data_cache["whale_trade"]
     if whale_trade:
-        whale_trade["amount_sol"] = float(whale_trade["amount"]) / 1_000_000_000
+        whale_trade = {**whale_trade, "amount_sol": float(whale_trade["amount"]) / 1_000_000_000}
 
     return {
         "token": token,
@@ -409,6 +495,96 @@ def get_data():
         "last_trade_time": data_cache["last_trade_time"]
     }
 
+def render_data(token):
+    payload = build_payload(token)
+    body = orjson.dumps(payload, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    response_cache["token"] = token
+    response_cache["body"] = body
+    response_cache["etag"] = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    data_stream.publish(payload, body)
+    return response_cache
+
+class DeltaStream:
+    def __init__(self):
+        self.subscribers = set()
+        self.last = {}
+        self.snapshot_body = None
+        self.seq = 0
+        self.deltas = 0
+        self.resyncs = 0
+
+    def _event(self, event, body):
+        return b"id: %d\nevent: %s\ndata: %s\n\n" % (self.seq, event.encode(), body)
+
+    def publish(self, payload, body):
+        delta = {k: v for k, v in payload.items() if k != "timestamp" and self.last.get(k, object()) != v}
+        self.last = payload
+        self.snapshot_body = body
+        if not delta:
+            return
+        delta["timestamp"] = payload["timestamp"]
+        self.seq += 1
+        self.deltas += 1
+        message = self._event("delta", orjson.dumps(delta, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY))
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Subscriber fell behind: drop its backlog, the snapshot carries everything
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._event("snapshot", body))
+                self.resyncs += 1
+
+    async def events(self, request):
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        print(f"📡 Stream subscriber connected ({len(self.subscribers)} total)")
+        try:
+            yield self._event("snapshot", self.snapshot_body)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    message = b": keepalive\n\n"
+                yield message
+        finally:
+            self.subscribers.discard(queue)
+            print(f"📡 Stream subscriber left ({len(self.subscribers)} total)")
+
+data_stream = DeltaStream()
+
+# Single Endpoint
+@app.get("/data")
+async def get_data(request: Request):
+    token = load_constants()['ticker']
+    cached = response_cache if response_cache["token"] == token else render_data(token)
+    headers = {"ETag": cached["etag"], "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == cached["etag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached["body"], media_type="application/json", headers=headers)
+
+@app.get("/stream")
+async def stream_data(request: Request):
+    token = load_constants()['ticker']
+    if response_cache["token"] != token:
+        render_data(token)
+    return StreamingResponse(
+        data_stream.events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/metrics")
+def get_metrics():
+    return {
+        "db_pool": db.stats_snapshot(),
+        "change_feed": {"connected": change_feed.connected, "notifications": change_feed.notifications},
+        "stream": {"subscribers": len(data_stream.subscribers), "seq": data_stream.seq, "deltas": data_stream.deltas, "resyncs": data_stream.resyncs}
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
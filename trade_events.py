@@ -0,0 +1,132 @@
+import json
+import time
+import base64
+import asyncio
+import logging
+from collections import deque
+import websockets
+
+# Wake-up sources for the bot's decision loop. Producers post event kinds ("tick", "candle",
+# "whale", "balance", ...) from any thread; the loop takes them in debounced batches, so a burst
+# (a whale trade updating sea_life_score, trade_trend and the whale row at once) costs one
+# evaluation. Each batch remembers when its first event arrived so the loop can report
+# event-to-decision latency.
+
+EVENT_DEBOUNCE = 0.05  # seconds to coalesce a burst into one evaluation
+LATENCY_WINDOW = 1000  # decisions kept for the latency percentiles
+WS_RECONNECT_DELAY = 2
+
+# /data fields the trade logic reads, and the event they represent. Anything else in a stream
+# delta (timestamp, last_trade_time, holds) does not wake the loop.
+STREAM_EVENT_FIELDS = {
+    "token": "tick",
+    "price": "tick",
+    "trends": "tick",
+    "candle_trend": "candle",
+    "trend_stats": "candle",
+    "doji_signal": "candle",
+    "whale_trade": "whale",
+    "trade_trend": "whale",
+    "sea_life_score": "whale",
+    "classifications": "whale",
+    "buys": "whale",
+    "sells": "whale",
+}
+
+def stream_event_kinds(changed_fields):
+    return {STREAM_EVENT_FIELDS[f] for f in changed_fields if f in STREAM_EVENT_FIELDS}
+
+class TradeEvents:
+    def __init__(self, debounce=EVENT_DEBOUNCE):
+        self.debounce = debounce
+        self.pending = {}  # kind -> monotonic time of its first unhandled event
+        self.wakeup = asyncio.Event()
+        self.loop = None
+        self.posted = 0
+        self.coalesced = 0
+
+    def bind(self, loop):
+        self.loop = loop
+        return self
+
+    def post(self, kind, at=None):
+        """Record an event; call on the loop thread (see post_threadsafe)."""
+        self.posted += 1
+        if kind in self.pending:
+            self.coalesced += 1
+        else:
+            self.pending[kind] = at if at is not None else time.monotonic()
+        self.wakeup.set()
+
+    def post_threadsafe(self, kind):
+        self.loop.call_soon_threadsafe(self.post, kind, time.monotonic())
+
+    async def next_batch(self, timeout):
+        """{kind: first event time} once events arrive (after the debounce window), {} on timeout."""
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        await asyncio.sleep(self.debounce)
+        batch, self.pending = self.pending, {}
+        self.wakeup.clear()
+        return batch
+
+class LatencyStats:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def snapshot(self):
+        if not self.samples:
+            return {"count": self.count}
+        ordered = sorted(self.samples)
+        pick = lambda pct: ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+        return {
+            "count": self.count,
+            "p50_ms": round(pick(0.50) * 1000, 2),
+            "p99_ms": round(pick(0.99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2)
+        }
+
+async def watch_accounts(ws_url, addresses, on_change, commitment="confirmed"):
+    """accountSubscribe to `addresses` and call on_change(address, lamports, data) per notification.
+
+    Reconnects forever; cancel the task to stop.
+    """
+    while True:
+        try:
+            async with websockets.connect(ws_url, ping_interval=20, ping_timeout=60) as ws:
+                pending = {}
+                for request_id, address in enumerate(addresses, start=1):
+                    pending[request_id] = address
+                    await ws.send(json.dumps({
+                        "jsonrpc": "2.0",
+                        "id": request_id,
+                        "method": "accountSubscribe",
+                        "params": [address, {"encoding": "base64", "commitment": commitment}]
+                    }))
+                subscriptions = {}
+                async for message in ws:
+                    msg = json.loads(message)
+                    if "id" in msg:
+                        if "result" not in msg:
+                            raise RuntimeError(f"accountSubscribe failed: {msg.get('error')}")
+                        subscriptions[msg["result"]] = pending.pop(msg["id"])
+                        continue
+                    if msg.get("method") != "accountNotification":
+                        continue
+                    address = subscriptions.get(msg["params"]["subscription"])
+                    if address is None:
+                        continue
+                    value = msg["params"]["result"]["value"]
+                    on_change(address, value["lamports"], base64.b64decode(value["data"][0]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"🚨 Account subscription dropped: {e}")
+        await asyncio.sleep(WS_RECONNECT_DELAY)
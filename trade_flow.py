@@ -0,0 +1,133 @@
+import logging
+import psycopg2
+from db_pool import DB_PARAMS
+
+# Per-minute trade flow rollup behind /data. trade_flow_1m keeps one row per (token, minute,
+# trade_type, classification) with the trade count and summed amount, maintained by
+# statement-level triggers on whale_detector: each INSERT, UPDATE or DELETE statement folds its
+# transition table in as one grouped upsert (old rows subtracted, new rows added), so bulk
+# merges pay one aggregate per statement rather than per row. Partition drops bypass the
+# triggers; partitions.py trims the rollup to the same retention.
+#
+#   python trade_flow.py   # one-off: create the rollup and its triggers, fill it from whale_detector
+
+TRADE_FLOW_SQL = """
+CREATE TABLE IF NOT EXISTS {schema}.trade_flow_1m (
+    token text NOT NULL,
+    minute timestamp without time zone NOT NULL,
+    trade_type text NOT NULL,
+    classification text NOT NULL,
+    trades bigint NOT NULL,
+    volume numeric NOT NULL,
+    PRIMARY KEY (token, minute, trade_type, classification)
+);
+
+CREATE OR REPLACE FUNCTION {schema}.trade_flow_1m_apply() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO {schema}.trade_flow_1m AS f (token, minute, trade_type, classification, trades, volume)
+        SELECT coalesce(token, ''), date_trunc('minute', detected_time), coalesce(trade_type, ''), coalesce(classification, ''),
+               -count(*), -coalesce(sum(amount), 0)
+        FROM old_rows
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (token, minute, trade_type, classification) DO UPDATE
+            SET trades = f.trades + EXCLUDED.trades, volume = f.volume + EXCLUDED.volume;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO {schema}.trade_flow_1m AS f (token, minute, trade_type, classification, trades, volume)
+        SELECT coalesce(token, ''), date_trunc('minute', detected_time), coalesce(trade_type, ''), coalesce(classification, ''),
+               count(*), coalesce(sum(amount), 0)
+        FROM new_rows
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT (token, minute, trade_type, classification) DO UPDATE
+            SET trades = f.trades + EXCLUDED.trades, volume = f.volume + EXCLUDED.volume;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM {schema}.trade_flow_1m f
+        USING (SELECT DISTINCT coalesce(token, '') AS token, date_trunc('minute', detected_time) AS minute,
+                      coalesce(trade_type, '') AS trade_type, coalesce(classification, '') AS classification
+               FROM old_rows) o
+        WHERE f.token = o.token AND f.minute = o.minute AND f.trade_type = o.trade_type
+          AND f.classification = o.classification AND f.trades <= 0;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trade_flow_1m_insert ON {schema}.whale_detector;
+DROP TRIGGER IF EXISTS trade_flow_1m_update ON {schema}.whale_detector;
+DROP TRIGGER IF EXISTS trade_flow_1m_delete ON {schema}.whale_detector;
+CREATE TRIGGER trade_flow_1m_insert AFTER INSERT ON {schema}.whale_detector
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {schema}.trade_flow_1m_apply();
+CREATE TRIGGER trade_flow_1m_update AFTER UPDATE ON {schema}.whale_detector
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {schema}.trade_flow_1m_apply();
+CREATE TRIGGER trade_flow_1m_delete AFTER DELETE ON {schema}.whale_detector
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION {schema}.trade_flow_1m_apply();
+"""
+
+REBUILD_SQL = """
+TRUNCATE {schema}.trade_flow_1m;
+INSERT INTO {schema}.trade_flow_1m (token, minute, trade_type, classification, trades, volume)
+SELECT coalesce(token, ''), date_trunc('minute', detected_time), coalesce(trade_type, ''), coalesce(classification, ''),
+       count(*), coalesce(sum(amount), 0)
+FROM {schema}.whale_detector
+GROUP BY 1, 2, 3, 4;
+"""
+
+def ensure_rollup(conn, schema="public"):
+    """Create trade_flow_1m and its triggers, and rebuild it from whale_detector.
+
+    whale_detector is locked against writes meanwhile, so no trade is counted twice or missed.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"LOCK TABLE {schema}.whale_detector IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute(TRADE_FLOW_SQL.format(schema=schema))
+        cur.execute(REBUILD_SQL.format(schema=schema))
+        cur.execute(f"SELECT count(*) FROM {schema}.trade_flow_1m")
+        rows = cur.fetchone()[0]
+    conn.commit()
+    logging.info(f"📈 trade_flow_1m rebuilt: {rows} rows")
+    return rows
+
+def summarize_trade_flow(rows):
+    """Totals and per-minute trend from trade_flow_1m rows (minute, trade_type, count, total_amount, classification).
+
+    Returns (buys, sells, holds, classifications, total_volume, trade_trend); volume is in SOL
+    and trade_trend is oldest minute first.
+    """
+    buys = sells = holds = 0
+    classifications = {}
+    total_volume = 0.0
+    minutes = {}
+    for row in rows:
+        trade_type = row['trade_type']
+        count = int(row['count'])
+        cls = row['classification']
+        trend = minutes.setdefault(row['minute'], {"buys": 0, "sells": 0, "holds": 0})
+        if trade_type == 'buy':
+            buys += count
+            trend["buys"] += count
+            total_volume += float(row['total_amount']) / 1_000_000_000
+        elif trade_type == 'sell':
+            sells += count
+            trend["sells"] += count
+            total_volume += float(row['total_amount']) / 1_000_000_000
+        elif trade_type == 'hold':
+            holds += count
+            trend["holds"] += count
+        if cls:
+            classifications[cls] = classifications.get(cls, 0) + count
+    trade_trend = [{"minute": minute.isoformat(), **counts} for minute, counts in sorted(minutes.items())]
+    return buys, sells, holds, classifications, total_volume, trade_trend
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    conn = psycopg2.connect(**DB_PARAMS)
+    try:
+        ensure_rollup(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,156 @@
+import io
+import time
+from datetime import datetime
+import psycopg2
+from psycopg2.extras import execute_values
+
+# Bulk writes for the ingesters' validator and whale_detector upserts. Rows are buffered
+# (last write per key wins) and flushed when the buffer reaches flush_rows or its oldest row
+# is flush_interval old: COPY into a per-connection temp staging table, then one set-based
+# INSERT ... SELECT ... ON CONFLICT merge. method="values" uses execute_values pages instead.
+# Rows whose values did not change are skipped by the merge, so re-upserting is cheap, and a
+# failed flush keeps its rows buffered for the next one.
+
+FLUSH_ROWS = 1000
+FLUSH_INTERVAL = 1.0  # seconds a buffered row may wait for a flush
+VALUES_PAGE_SIZE = 500
+
+class TableSpec:
+    def __init__(self, table, columns, key, update=None, bump=None):
+        self.table = table
+        self.columns = columns
+        self.key = key
+        self.update = update if update is not None else [c for c in columns if c not in key]
+        self.bump = bump  # column reset to its DEFAULT whenever a row actually changes
+        self.stage = f"{table}_stage"
+        self.key_index = [columns.index(c) for c in key]
+
+    def row_key(self, row):
+        return tuple(row[i] for i in self.key_index)
+
+    def merge_sql(self, source):
+        """INSERT from `source` (a SELECT, or VALUES %s), updating only rows that actually changed."""
+        sets = ", ".join([f"{c} = EXCLUDED.{c}" for c in self.update] + ([f"{self.bump} = DEFAULT"] if self.bump else []))
+        current = ", ".join(f"{self.table}.{c}" for c in self.update)
+        incoming = ", ".join(f"EXCLUDED.{c}" for c in self.update)
+        return (f"INSERT INTO {self.table} ({', '.join(self.columns)}) {source} "
+                f"ON CONFLICT ({', '.join(self.key)}) DO UPDATE SET {sets} "
+                f"WHERE ({current}) IS DISTINCT FROM ({incoming})")
+
+VALIDATOR = TableSpec(
+    "validator",
+    ["transaction_hash", "wallet_address", "block_time", "token_mint", "pre_balance", "post_balance", "trade_type", "transaction_emoji"],
+    ["transaction_hash", "block_time"],  # unique keys of a partitioned table include its partition column
+    bump="ingest_id"  # so whale_detector's watermark job sees changed rows again
+)
+WHALE_DETECTOR = TableSpec(
+    "whale_detector",
+    ["whale_wallet", "detected_time", "amount", "token", "trade_type", "classification", "transaction_hash"],
+    ["transaction_hash", "detected_time"]
+)
+
+def validator_row(trade, token):
+    """VALIDATOR row for an ingester trade dict (transaction_id, wallet_address, timestamp, amount, ...)."""
+    return (trade['transaction_id'], trade['wallet_address'], datetime.fromisoformat(trade['timestamp']), token, 0.0,
+            trade['amount'], trade['trade_type'], trade['emoji'])
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+class TradeWriter:
+    def __init__(self, conn, spec, method="copy", flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL, page_size=VALUES_PAGE_SIZE):
+        if method not in ("copy", "values"):
+            raise ValueError(f"Unknown write method: {method}")
+        self.conn = conn
+        self.spec = spec
+        self.method = method
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.page_size = page_size
+        self.buffer = {}  # key -> row, so one merge never touches a row twice
+        self.oldest = None
+        self.stage_ready = False
+        self.rows_written = 0
+        self.flushes = 0
+        self.flush_time = 0.0
+
+    def add(self, row):
+        """Buffer one row (a tuple in spec.columns order)."""
+        if self.oldest is None:
+            self.oldest = time.monotonic()
+        self.buffer[self.spec.row_key(row)] = row
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def time_left(self):
+        """Seconds until the buffer is due by age, None while it is empty."""
+        if self.oldest is None:
+            return None
+        return max(0.0, self.oldest + self.flush_interval - time.monotonic())
+
+    def due(self):
+        return len(self.buffer) >= self.flush_rows or self.time_left() == 0.0
+
+    def _copy(self, cur, rows):
+        if not self.stage_ready:
+            cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {self.spec.stage} ON COMMIT DELETE ROWS AS "
+                        f"SELECT {', '.join(self.spec.columns)} FROM {self.spec.table} WITH NO DATA")
+        buf = io.StringIO()
+        for row in rows:
+            buf.write("\t".join(_copy_value(v) for v in row))
+            buf.write("\n")
+        buf.seek(0)
+        cur.copy_from(buf, self.spec.stage, columns=self.spec.columns)
+        cur.execute(self.spec.merge_sql(f"SELECT {', '.join(self.spec.columns)} FROM {self.spec.stage}"))
+
+    def _values(self, cur, rows):
+        execute_values(cur, self.spec.merge_sql("VALUES %s"), rows, page_size=self.page_size)
+
+    def flush(self, checkpoint=None):
+        """Write the buffer in one transaction; `checkpoint(cur)` runs in it before the commit.
+
+        Returns the number of rows written. On a database error the transaction is rolled back,
+        the rows go back into the buffer for the next flush (the merge is idempotent, so the retry
+        is safe; rows buffered since win) and the error is raised.
+        """
+        taken, oldest = self.buffer, self.oldest
+        rows = list(taken.values())
+        self.buffer = {}
+        self.oldest = None
+        if not rows and checkpoint is None:
+            return 0
+        started = time.perf_counter()
+        try:
+            with self.conn.cursor() as cur:
+                if rows:
+                    (self._copy if self.method == "copy" else self._values)(cur, rows)
+                if checkpoint is not None:
+                    checkpoint(cur)
+            self.conn.commit()
+        except psycopg2.Error:
+            self.conn.rollback()
+            taken.update(self.buffer)
+            self.buffer = taken
+            self.oldest = oldest if self.oldest is None else min(oldest, self.oldest)
+            raise
+        self.stage_ready = self.stage_ready or self.method == "copy"
+        self.rows_written += len(rows)
+        self.flushes += 1
+        self.flush_time += time.perf_counter() - started
+        return len(rows)
+
+    def stats_snapshot(self):
+        return {
+            "rows_written": self.rows_written,
+            "flushes": self.flushes,
+            "rows_per_second": round(self.rows_written / self.flush_time) if self.flush_time else None,
+            "buffered": len(self.buffer)
+        }
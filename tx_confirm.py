@@ -0,0 +1,167 @@
+import time
+import logging
+import threading
+import requests
+
+# Signature confirmation without fixed sleeps. One poller thread checks every pending signature
+# with a single getSignatureStatuses call (batched with getBlockHeight when a blockhash expiry
+# is known) and wakes each waiter as soon as its commitment is reached, the transaction fails,
+# or its blockhash expires. Only "expired" proves a transaction will not land; "timeout" just
+# means the wait ran out. Amounts then come from the transaction's own pre/post balances.
+
+RPC_TIMEOUT = 5
+CONFIRM_POLL_INTERVAL = 0.4  # roughly one slot
+CONFIRM_TIMEOUT = 90.0  # a blockhash is valid for ~150 blocks; give up a little after that
+MAX_SIGNATURES_PER_CALL = 256  # getSignatureStatuses limit
+TX_FETCH_ATTEMPTS = 5
+COMMITMENT_LEVELS = {"processed": 0, "confirmed": 1, "finalized": 2}
+
+class PendingSignature:
+    __slots__ = ("signature", "submitted_at", "last_valid_block_height", "done", "status", "slot", "err", "confirmed_at")
+
+    def __init__(self, signature, submitted_at, last_valid_block_height=None):
+        self.signature = signature
+        self.submitted_at = submitted_at
+        self.last_valid_block_height = last_valid_block_height
+        self.done = threading.Event()
+        self.status = "pending"
+        self.slot = None
+        self.err = None
+        self.confirmed_at = None
+
+    def resolve(self, status, slot=None, err=None):
+        self.status = status
+        self.slot = slot
+        self.err = err
+        self.confirmed_at = time.time()
+        self.done.set()
+
+class ConfirmationTracker:
+    def __init__(self, rpc_url, commitment="confirmed", poll_interval=CONFIRM_POLL_INTERVAL, session=None, router=None):
+        self.rpc_url = rpc_url
+        self.router = router  # rpc_router.RpcRouter, if set
+        self.commitment = commitment
+        self.poll_interval = poll_interval
+        self.session = session or requests.Session()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.rpc_calls = 0
+
+    def _post(self, payload):
+        self.rpc_calls += 1
+        if self.router is not None:
+            return self.router.post(payload)
+        response = self.session.post(self.rpc_url, json=payload, timeout=RPC_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def track(self, signature, submitted_at=None, last_valid_block_height=None):
+        entry = PendingSignature(signature, submitted_at or time.time(), last_valid_block_height)
+        with self.lock:
+            self.pending[signature] = entry
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="tx-confirm", daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+        return entry
+
+    def _poll(self, entries):
+        calls = [{"jsonrpc": "2.0", "id": 0, "method": "getSignatureStatuses", "params": [[e.signature for e in entries], {"searchTransactionHistory": False}]}]
+        if any(e.last_valid_block_height for e in entries):
+            calls.append({"jsonrpc": "2.0", "id": 1, "method": "getBlockHeight", "params": [{"commitment": self.commitment}]})
+        responses = {r.get("id"): r for r in self._post(calls)}
+        if "result" not in responses.get(0, {}):
+            raise RuntimeError(f"getSignatureStatuses failed: {responses.get(0, {}).get('error')}")
+        block_height = responses.get(1, {}).get("result")
+        wanted = COMMITMENT_LEVELS[self.commitment]
+        for entry, status in zip(entries, responses[0]["result"]["value"]):
+            if status is not None and status.get("err") is not None:
+                entry.resolve("failed", status.get("slot"), status["err"])
+            elif status is not None and COMMITMENT_LEVELS.get(status.get("confirmationStatus"), -1) >= wanted:
+                entry.resolve("confirmed", status.get("slot"))
+            elif status is None and block_height is not None and entry.last_valid_block_height and block_height > entry.last_valid_block_height:
+                entry.resolve("expired")
+            elif not entry.last_valid_block_height and time.time() - entry.submitted_at > CONFIRM_TIMEOUT:
+                # Without a blockhash expiry nothing proves it will not land; the caller decides what to do
+                entry.resolve("timeout")
+
+    def _run(self):
+        while True:
+            with self.lock:
+                self.pending = {sig: e for sig, e in self.pending.items() if not e.done.is_set()}
+                entries = list(self.pending.values())
+                if not entries:
+                    self.thread = None
+                    return
+            for i in range(0, len(entries), MAX_SIGNATURES_PER_CALL):
+                try:
+                    self._poll(entries[i:i + MAX_SIGNATURES_PER_CALL])
+                except Exception as e:
+                    logging.warning(f"⚠️ Signature status poll failed: {e}")
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+
+    def wait(self, entry, timeout=CONFIRM_TIMEOUT):
+        if not entry.done.wait(timeout):
+            entry.resolve("timeout")
+        return entry
+
+    def fetch_transaction(self, signature):
+        commitment = "confirmed" if self.commitment == "processed" else self.commitment
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "getTransaction",
+                   "params": [signature, {"encoding": "jsonParsed", "commitment": commitment, "maxSupportedTransactionVersion": 0}]}
+        # Some RPC nodes serve the status a moment before the transaction itself
+        for _ in range(TX_FETCH_ATTEMPTS):
+            result = self._post(payload).get("result")
+            if result is not None:
+                return result
+            time.sleep(self.poll_interval)
+        return None
+
+    def confirm(self, signature, owner, mint, submitted_at=None, last_valid_block_height=None, timeout=CONFIRM_TIMEOUT):
+        """Wait for `signature` and return its outcome with the owner's SOL/token deltas read from the transaction."""
+        entry = self.wait(self.track(signature, submitted_at, last_valid_block_height), timeout)
+        outcome = {
+            "txid": signature,
+            "status": entry.status,
+            "slot": entry.slot,
+            "err": entry.err,
+            "latency_ms": round((entry.confirmed_at - entry.submitted_at) * 1000, 1),
+            "sol_delta": None,
+            "token_delta": None,
+            "fee": None
+        }
+        if entry.status != "confirmed":
+            return outcome
+        try:
+            tx = self.fetch_transaction(signature)
+        except Exception as e:
+            logging.warning(f"⚠️ Failed to fetch transaction {signature}: {e}")
+            tx = None
+        if tx is not None:
+            outcome.update(balance_changes(tx, str(owner), str(mint)))
+        return outcome
+
+def balance_changes(tx, owner, mint):
+    """SOL and token deltas for `owner` from a jsonParsed transaction's pre/post balances (SOL includes the fee)."""
+    meta = tx["meta"]
+    keys = [k["pubkey"] if isinstance(k, dict) else k for k in tx["transaction"]["message"]["accountKeys"]]
+    sol_delta = None
+    if owner in keys:
+        index = keys.index(owner)
+        sol_delta = (meta["postBalances"][index] - meta["preBalances"][index]) / 1_000_000_000
+
+    def token_total(balances):
+        return sum(
+            int(b["uiTokenAmount"]["amount"]) / 10 ** b["uiTokenAmount"]["decimals"]
+            for b in balances or []
+            if b.get("mint") == mint and b.get("owner") == owner
+        )
+
+    return {
+        "sol_delta": sol_delta,
+        "token_delta": token_total(meta.get("postTokenBalances")) - token_total(meta.get("preTokenBalances")),
+        "fee": meta.get("fee", 0) / 1_000_000_000
+    }
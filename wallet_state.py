@@ -0,0 +1,126 @@
+import time
+import base64
+import struct
+import logging
+import threading
+import requests
+
+# Cached SOL + token balances for one wallet/mint. The token account address is looked up once;
+# after that a refresh is a single getMultipleAccounts call for the wallet and its token account
+# (plus the mint until its decimals are known). Account notifications can update the cache
+# directly, so on a websocket-fed loop most reads cost no RPC at all.
+
+RPC_TIMEOUT = 5
+BALANCE_MAX_AGE = 10.0  # seconds a cached balance may be served without a refresh
+ACCOUNT_LOOKUP_INTERVAL = 30.0  # retry finding the token account this often while there is none
+LAMPORTS_PER_SOL = 1_000_000_000
+TOKEN_AMOUNT_OFFSET = 64  # SPL token account: mint (32), owner (32), amount (u64)
+MINT_DECIMALS_OFFSET = 44  # SPL mint: mint_authority option (36), supply (u64), decimals (u8)
+
+class WalletState:
+    def __init__(self, rpc_url, owner, mint, max_age=BALANCE_MAX_AGE, session=None, router=None):
+        self.rpc_url = rpc_url
+        self.router = router  # rpc_router.RpcRouter; balance reads are hedged across endpoints
+        self.owner = str(owner)
+        self.mint = str(mint)
+        self.max_age = max_age
+        self.session = session or requests.Session()
+        self.lock = threading.Lock()
+        self.token_account = None
+        self.last_lookup = 0.0
+        self.decimals = None
+        self.sol = None
+        self.tokens = None
+        self.updated = 0.0
+        self.rpc_calls = 0
+        self.hits = 0
+        self.refreshes = 0
+        self.notifications = 0
+
+    def _rpc(self, method, params):
+        self.rpc_calls += 1
+        payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+        if self.router is not None:
+            data = self.router.post(payload, hedge=True)
+        else:
+            response = self.session.post(self.rpc_url, json=payload, timeout=RPC_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+        if "result" not in data:
+            raise RuntimeError(f"{method} failed: {data.get('error', 'Unknown error')}")
+        return data["result"]
+
+    def _lookup_token_account(self):
+        self.last_lookup = time.time()
+        result = self._rpc("getTokenAccountsByOwner", [self.owner, {"mint": self.mint}, {"encoding": "base64", "commitment": "confirmed"}])
+        if result["value"]:
+            self.token_account = result["value"][0]["pubkey"]
+            logging.info(f"💰 Token account for {self.mint}: {self.token_account}")
+
+    def _refresh(self):
+        if self.token_account is None and time.time() - self.last_lookup >= ACCOUNT_LOOKUP_INTERVAL:
+            self._lookup_token_account()
+        addresses = [self.owner]
+        if self.token_account:
+            addresses.append(self.token_account)
+        if self.decimals is None:
+            addresses.append(self.mint)
+        result = self._rpc("getMultipleAccounts", [addresses, {"encoding": "base64", "commitment": "confirmed"}])
+        accounts = dict(zip(addresses, result["value"]))
+        if self.decimals is None and accounts.get(self.mint):
+            self.decimals = base64.b64decode(accounts[self.mint]["data"][0])[MINT_DECIMALS_OFFSET]
+        owner = accounts[self.owner]
+        self.sol = owner["lamports"] / LAMPORTS_PER_SOL if owner else 0.0
+        token = accounts.get(self.token_account) if self.token_account else None
+        self.tokens = self._token_amount(base64.b64decode(token["data"][0])) if token else 0.0
+        if self.token_account and token is None:
+            # Closed account: look it up again next time
+            self.token_account = None
+        self.updated = time.time()
+        self.refreshes += 1
+
+    def _token_amount(self, data):
+        raw = struct.unpack_from("<Q", data, TOKEN_AMOUNT_OFFSET)[0]
+        return raw / 10 ** (self.decimals or 0)
+
+    def balances(self, max_age=None):
+        """(sol, tokens), refreshed with one RPC round-trip if the cache is older than `max_age`.
+
+        Concurrent callers share one in-flight refresh. max_age=0 forces a refresh and also
+        re-checks for a token account that did not exist yet (e.g. right after the first buy).
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self.lock:
+            if max_age == 0:
+                self.last_lookup = 0.0
+            if self.sol is not None and self.tokens is not None and time.time() - self.updated <= max_age:
+                self.hits += 1
+            else:
+                self._refresh()
+            return self.sol, self.tokens
+
+    def invalidate(self):
+        with self.lock:
+            self.updated = 0.0
+            self.last_lookup = 0.0
+
+    def apply_notification(self, address, lamports, data):
+        """Update the cache from an accountSubscribe notification for the wallet or its token account."""
+        with self.lock:
+            if address == self.owner:
+                self.sol = lamports / LAMPORTS_PER_SOL
+            elif address == self.token_account and self.decimals is not None and len(data) >= TOKEN_AMOUNT_OFFSET + 8:
+                self.tokens = self._token_amount(data)
+            else:
+                return
+            self.notifications += 1
+            # Without a known token account only the SOL side is live, so keep the refresh clock running
+            if self.tokens is not None and self.token_account is not None:
+                self.updated = time.time()
+
+    def watched_accounts(self):
+        with self.lock:
+            return [self.owner] + ([self.token_account] if self.token_account else [])
+
+    def stats_snapshot(self):
+        return {"rpc_calls": self.rpc_calls, "refreshes": self.refreshes, "hits": self.hits, "notifications": self.notifications}